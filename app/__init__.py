@@ -35,6 +35,10 @@ def create_app(config_name=None):
     _initialize_extensions(app)
     _initialize_database(app)
     _register_blueprints(app)
+    _start_flow_reload_watcher(app)
+    _start_session_flusher(app)
+    _start_interaction_log(app)
+    _start_flow_usage(app)
     _register_error_handlers(app)
     _register_cli_commands(app)  # Agregar comandos CLI
     
@@ -127,6 +131,50 @@ def _initialize_database(app: Flask):
     except Exception as e:
         print(f"[WARNING] Error inicializando base de datos: {e}")
 
+def _start_flow_reload_watcher(app: Flask):
+    """
+    Arranca la recompilación en segundo plano de los flujos cuando cambian en otro worker
+    """
+    try:
+        from app.services.flow_reload import start_flow_reload_watcher
+        if start_flow_reload_watcher(app):
+            print("[OK] Vigilante de recarga de flujos registrado (arranca con el primer request)")
+    except Exception as e:
+        print(f"[WARNING] Error iniciando vigilante de recarga de flujos: {e}")
+
+def _start_session_flusher(app: Flask):
+    """
+    Arranca la escritura por lotes de las variables de usuario de RiveScript
+    """
+    try:
+        from app.services.rivescript_sessions import start_session_flusher
+        if start_session_flusher(app):
+            print("[OK] Escritura diferida de sesiones RiveScript iniciada")
+    except Exception as e:
+        print(f"[WARNING] Error iniciando escritura de sesiones RiveScript: {e}")
+
+def _start_interaction_log(app: Flask):
+    """
+    Arranca la escritura por lotes de las interacciones del chatbot
+    """
+    try:
+        from app.services.interaction_log import start_interaction_log
+        if start_interaction_log(app):
+            print("[OK] Registro asíncrono de interacciones del chatbot iniciado")
+    except Exception as e:
+        print(f"[WARNING] Error iniciando registro de interacciones del chatbot: {e}")
+
+def _start_flow_usage(app: Flask):
+    """
+    Arranca la escritura periódica del uso de los flujos
+    """
+    try:
+        from app.services.flow_usage import start_flow_usage
+        if start_flow_usage(app):
+            print("[OK] Contadores de uso de flujos en memoria iniciados")
+    except Exception as e:
+        print(f"[WARNING] Error iniciando contadores de uso de flujos: {e}")
+
 def _register_blueprints(app: Flask):
     """
     Registra blueprints y namespaces de la API
@@ -231,6 +279,16 @@ def _register_blueprints(app: Flask):
     except Exception as e:
         print(f"[WARNING] Error registrando editor RiveScript: {e}")
     
+    # Métricas de SQL agregadas por endpoint y webhook (incluyen sentencias SQL: requieren API key)
+    from app.private.auth import require_api_key
+
+    @app.route('/metrics/sql')
+    @require_api_key
+    def sql_metrics():
+        """Consultas, tiempo de base de datos, N+1 y consultas lentas por endpoint"""
+        from database.query_stats import get_query_metrics
+        return get_query_metrics()
+    
     # Health check mejorado con más información
     @app.route('/health')
     def health_check():
@@ -256,12 +314,27 @@ def _register_blueprints(app: Flask):
         except:
             redis_status = 'not_configured'
         
+        # Métricas del pool de conexiones compartido
+        try:
+            from database.connection import get_pool_metrics
+            database_pool = get_pool_metrics()
+        except Exception:
+            database_pool = []
+        
+        try:
+            from database.replica import get_replica_status
+            database_replica = get_replica_status()
+        except Exception as e:
+            database_replica = {'configured': True, 'error': str(e)}
+        
         return {
             'status': 'healthy',
             'service': 'WhatsApp API Microservice',
             'version': '1.0.0',
             'environment': app.config.get('FLASK_ENV', 'development'),
             'database': 'connected',
+            'database_pool': database_pool,
+            'database_replica': database_replica,
             'redis': redis_status,
             'components': {
                 'messages': 'ready',
@@ -405,6 +478,144 @@ def _register_cli_commands(app: Flask):
         except Exception as e:
             click.echo(f'[ERROR] Error reseteando base de datos: {e}')
     
+    @app.cli.command('setup-search')
+    @click.option('--language', default=None, help='Configuración de text search de PostgreSQL')
+    @with_appcontext
+    def setup_search(language):
+        """Crea los índices de búsqueda de texto completo (tsvector/GIN o FTS5)"""
+        try:
+            from database.search import setup_search_indexes
+            
+            statements = setup_search_indexes(language=language)
+            click.echo(f'[OK] Índices de búsqueda listos ({len(statements)} sentencias).')
+        except Exception as e:
+            click.echo(f'[ERROR] Error creando índices de búsqueda: {e}')
+    
+    @app.cli.command('partitions-ensure')
+    @click.option('--months-ahead', type=int, default=None, help='Meses a crear por adelantado')
+    @with_appcontext
+    def partitions_ensure(months_ahead):
+        """Crea las particiones mensuales futuras de las tablas particionadas"""
+        try:
+            from database.partitions import ensure_partitions
+            
+            created = ensure_partitions(months_ahead=months_ahead)
+            click.echo(f'[OK] Particiones creadas: {", ".join(created) if created else "ninguna (ya existían)"}')
+        except Exception as e:
+            click.echo(f'[ERROR] Error creando particiones: {e}')
+    
+    @app.cli.command('partitions-retention')
+    @click.option('--mode', type=click.Choice(['detach', 'drop']), default=None, help='Separar o eliminar particiones')
+    @click.option('--dry-run', is_flag=True, help='Solo mostrar las particiones afectadas')
+    @with_appcontext
+    def partitions_retention(mode, dry_run):
+        """Aplica la retención por meses separando o eliminando particiones antiguas"""
+        try:
+            from database.partitions import apply_partition_retention
+            
+            processed = apply_partition_retention(mode=mode, dry_run=dry_run)
+            for item in processed:
+                click.echo(f"   {item['table']}: {item['partition']} ({item['month']}) -> {item['action']}")
+            prefix = '[INFO] Simulación:' if dry_run else '[OK]'
+            click.echo(f'{prefix} {len(processed)} particiones fuera de retención.')
+        except Exception as e:
+            click.echo(f'[ERROR] Error aplicando retención de particiones: {e}')
+    
+    @app.cli.command('rebuild-conversations')
+    @with_appcontext
+    def rebuild_conversations():
+        """Regenera conversation_summaries desde el historial de mensajes"""
+        try:
+            from app.repositories.conversation_summary_repository import ConversationSummaryRepository
+            
+            count = ConversationSummaryRepository().rebuild()
+            click.echo(f'[OK] {count} conversaciones reconstruidas.')
+        except Exception as e:
+            click.echo(f'[ERROR] Error reconstruyendo conversaciones: {e}')
+    
+    @app.cli.command('retention-run')
+    @click.option('--table', 'tables', multiple=True, help='Limitar a estas tablas')
+    @click.option('--chunk-size', type=int, default=None, help='Filas por sentencia DELETE')
+    @click.option('--throttle-ms', type=int, default=None, help='Pausa entre bloques (ms)')
+    @click.option('--max-rows', type=int, default=None, help='Máximo de filas por tabla')
+    @click.option('--dry-run', is_flag=True, help='Solo contar las filas fuera de retención')
+    @with_appcontext
+    def retention_run(tables, chunk_size, throttle_ms, max_rows, dry_run):
+        """Elimina en bloques las filas fuera de retención de cada tabla"""
+        from database.retention import run_retention
+        
+        results = run_retention(tables=list(tables) or None, chunk_size=chunk_size,
+                                throttle_ms=throttle_ms, max_rows=max_rows, dry_run=dry_run)
+        for item in results:
+            if 'error' in item:
+                click.echo(f"[ERROR] {item['table']}: {item['error']}")
+            elif dry_run:
+                click.echo(f"[INFO] {item['table']}: {item['expired']} filas anteriores a {item['cutoff']}")
+            else:
+                click.echo(f"[OK] {item['table']}: {item['deleted']} filas en {item['chunks']} bloques, "
+                           f"{item['elapsed_seconds']} s ({item['rows_per_second']} filas/s)")
+
+    @app.cli.command('bulk-load')
+    @click.argument('target', type=click.Choice(['contacts', 'messages', 'interactions']))
+    @click.argument('path')
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+                  help='Formato de entrada (por defecto según la extensión)')
+    @click.option('--batch-size', type=int, default=None, help='Filas por lote')
+    @with_appcontext
+    def bulk_load_command(target, path, fmt, batch_size):
+        """Carga un CSV o JSONL ('-' para stdin) con COPY en PostgreSQL o executemany en otros motores"""
+        try:
+            from database.bulk_load import bulk_load
+
+            result = bulk_load(target, path, fmt=fmt, batch_size=batch_size)
+            if result['ignored_columns']:
+                click.echo(f"[INFO] Columnas ignoradas: {', '.join(result['ignored_columns'])}")
+            click.echo(f"[OK] {result['table']} ({result['method']}): {result['loaded']} filas en "
+                       f"{result['batches']} lotes, {result['elapsed_seconds']} s "
+                       f"({result['rows_per_second']} filas/s)")
+            if target == 'messages':
+                click.echo('[INFO] Ejecute "flask rebuild-conversations" para actualizar la bandeja de entrada.')
+        except Exception as e:
+            click.echo(f'[ERROR] Error en la carga masiva: {e}')
+
+    @app.cli.command('archive-run')
+    @click.option('--table', 'tables', multiple=True, help='Limitar a estas tablas')
+    @click.option('--archive-dir', default=None, help='Directorio raíz del archivo')
+    @click.option('--chunk-size', type=int, default=None, help='Filas por bloque')
+    @click.option('--throttle-ms', type=int, default=None, help='Pausa entre bloques (ms)')
+    @click.option('--max-rows', type=int, default=None, help='Máximo de filas por tabla')
+    @click.option('--dry-run', is_flag=True, help='Solo contar las filas a archivar')
+    @with_appcontext
+    def archive_run(tables, archive_dir, chunk_size, throttle_ms, max_rows, dry_run):
+        """Mueve las filas antiguas a ficheros JSONL.gz por día y las elimina de la base de datos"""
+        from database.archive import run_archive
+
+        results = run_archive(tables=list(tables) or None, archive_dir=archive_dir, chunk_size=chunk_size,
+                              throttle_ms=throttle_ms, max_rows=max_rows, dry_run=dry_run)
+        for item in results:
+            if 'error' in item:
+                click.echo(f"[ERROR] {item['table']}: {item['error']}")
+            elif dry_run:
+                click.echo(f"[INFO] {item['table']}: {item['expired']} filas anteriores a {item['cutoff']}")
+            else:
+                click.echo(f"[OK] {item['table']}: {item['archived']} filas en {item['files']} ficheros, "
+                           f"{item['elapsed_seconds']} s ({item['rows_per_second']} filas/s)")
+
+    @app.cli.command('archive-read')
+    @click.argument('table_name')
+    @click.option('--phone', default=None, help='Filtrar por número de teléfono')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Primer día (AAAA-MM-DD)')
+    @click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Último día (AAAA-MM-DD)')
+    @click.option('--archive-dir', default=None, help='Directorio raíz del archivo')
+    def archive_read(table_name, phone, since, until, archive_dir):
+        """Imprime como JSONL las filas archivadas de una tabla"""
+        import json
+        from database.archive import iter_archive
+
+        for row in iter_archive(table_name, phone_number=phone, start=since.date() if since else None,
+                                end=until.date() if until else None, archive_dir=archive_dir):
+            click.echo(json.dumps(row, ensure_ascii=False))
+
     @app.cli.command()
     @click.option('--line-id', default='line_1', help='ID de la línea a crear')
     @click.option('--display-name', default='Línea Principal', help='Nombre a mostrar')
@@ -1375,6 +1375,8 @@ class MessageListResource(Resource):
     @messages_ns.param('message_type', 'Filtrar por tipo', enum=['text', 'image', 'location', 'contacts', 'document', 'audio', 'video'])
     @messages_ns.param('direction', 'Filtrar por dirección', enum=['inbound', 'outbound'])
     @messages_ns.param('line_id', 'Filtrar por línea de mensajería')
+    @messages_ns.param('cursor', 'Cursor de la página siguiente (next_cursor de la respuesta anterior)')
+    @messages_ns.param('include_total', 'Total de resultados', enum=['approx', 'exact', 'none'], default='approx')
     @messages_ns.response(200, 'Lista de mensajes obtenida exitosamente', message_list_response)
     @messages_ns.response(400, 'Error de validación', error_response)
     @messages_ns.response(401, 'No autorizado')
@@ -1386,12 +1388,15 @@ class MessageListResource(Resource):
         Obtiene lista de mensajes con filtros opcionales y paginación
         
         Permite filtrar mensajes por diferentes criterios como número de teléfono,
-        estado, tipo de mensaje, etc. Los resultados están paginados.
+        estado, tipo de mensaje, etc. Los resultados están paginados por cursor:
+        usar pagination.next_cursor como parámetro cursor para la página siguiente.
         """
         try:
             # Obtener parámetros de query
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
+            cursor = request.args.get('cursor')
+            include_total = request.args.get('include_total', 'approx')
             
             # Construir filtros
             filters = {}
@@ -1410,7 +1415,9 @@ class MessageListResource(Resource):
             result = message_service.get_messages(
                 filters=filters if filters else None,
                 page=page,
-                per_page=per_page
+                per_page=per_page,
+                cursor=cursor,
+                include_total=include_total
             )
             
             return result
@@ -1427,6 +1434,128 @@ class MessageListResource(Resource):
                 details=str(e)
             )
 
+@messages_ns.route('/search')
+class MessageSearchResource(Resource):
+    """
+    Endpoint de búsqueda de texto completo en mensajes e interacciones
+    """
+    
+    @messages_ns.doc('search_messages', security='ApiKeyAuth')
+    @messages_ns.param('q', 'Texto a buscar', required=True)
+    @messages_ns.param('phone_number', 'Filtrar por número de teléfono')
+    @messages_ns.param('date_from', 'Fecha mínima (ISO 8601)')
+    @messages_ns.param('date_to', 'Fecha máxima (ISO 8601; solo fecha incluye el día completo)')
+    @messages_ns.param('scope', 'Dónde buscar', enum=['messages', 'interactions', 'all'], default='messages')
+    @messages_ns.param('limit', 'Máximo de resultados', type='integer', default=20)
+    @messages_ns.param('offset', 'Resultados a omitir', type='integer', default=0)
+    @messages_ns.response(200, 'Búsqueda completada exitosamente', message_list_response)
+    @messages_ns.response(400, 'Error de validación', error_response)
+    @messages_ns.response(401, 'No autorizado')
+    @messages_ns.response(500, 'Error interno del servidor', error_response)
+    @require_api_key
+    def get(self):
+        """
+        Busca mensajes por contenido ordenados por relevancia
+        
+        Usa el índice de texto completo (tsvector/GIN en PostgreSQL, FTS5 en SQLite).
+        """
+        try:
+            return message_service.search_messages(
+                query=request.args.get('q', ''),
+                phone_number=request.args.get('phone_number'),
+                date_from=request.args.get('date_from'),
+                date_to=request.args.get('date_to'),
+                scope=request.args.get('scope', 'messages'),
+                limit=request.args.get('limit', 20, type=int),
+                offset=request.args.get('offset', 0, type=int)
+            )
+            
+        except ValidationError as e:
+            messages_ns.abort(400,
+                message=str(e),
+                error_code="VALIDATION_ERROR"
+            )
+        except Exception as e:
+            return create_error_response(
+                message="Error interno del servidor",
+                error_code="INTERNAL_ERROR",
+                details=str(e)
+            ), 500
+
+@messages_ns.route('/conversations')
+class ConversationInboxResource(Resource):
+    """
+    Bandeja de entrada: última actividad y mensajes sin leer por conversación
+    """
+    
+    @messages_ns.doc('get_inbox', security='ApiKeyAuth')
+    @messages_ns.param('line_id', 'Filtrar por línea de mensajería')
+    @messages_ns.param('unread_only', 'Solo conversaciones con mensajes sin leer', type='boolean', default=False)
+    @messages_ns.param('limit', 'Conversaciones por página', type='integer', default=20)
+    @messages_ns.param('cursor', 'Cursor de la página siguiente (next_cursor de la respuesta anterior)')
+    @messages_ns.response(200, 'Conversaciones obtenidas exitosamente')
+    @messages_ns.response(400, 'Error de validación', error_response)
+    @messages_ns.response(401, 'No autorizado')
+    @messages_ns.response(500, 'Error interno del servidor', error_response)
+    @require_api_key
+    def get(self):
+        """
+        Lista las conversaciones ordenadas por el último mensaje
+        
+        Lee la tabla de resúmenes mantenida con cada mensaje, con paginación por cursor.
+        """
+        try:
+            return message_service.get_inbox(
+                line_id=request.args.get('line_id'),
+                unread_only=request.args.get('unread_only', 'false').lower() == 'true',
+                limit=request.args.get('limit', 20, type=int),
+                cursor=request.args.get('cursor')
+            )
+            
+        except ValidationError as e:
+            messages_ns.abort(400,
+                message=str(e),
+                error_code="VALIDATION_ERROR"
+            )
+        except Exception as e:
+            return create_error_response(
+                message="Error interno del servidor",
+                error_code="INTERNAL_ERROR",
+                details=str(e)
+            ), 500
+
+@messages_ns.route('/conversations/<string:phone_number>/read')
+class ConversationReadResource(Resource):
+    """
+    Marca una conversación como leída
+    """
+    
+    @messages_ns.doc('mark_conversation_read', security='ApiKeyAuth')
+    @messages_ns.param('phone_number', 'Número del contacto')
+    @messages_ns.param('line_id', 'Línea de mensajería (opcional)')
+    @messages_ns.response(200, 'Conversación marcada como leída')
+    @messages_ns.response(400, 'Error de validación', error_response)
+    @messages_ns.response(401, 'No autorizado')
+    @require_api_key
+    def post(self, phone_number):
+        """
+        Pone a cero el contador de mensajes sin leer de la conversación
+        """
+        try:
+            return message_service.mark_conversation_read(phone_number, line_id=request.args.get('line_id'))
+            
+        except ValidationError as e:
+            messages_ns.abort(400,
+                message=str(e),
+                error_code="VALIDATION_ERROR"
+            )
+        except Exception as e:
+            return create_error_response(
+                message="Error interno del servidor",
+                error_code="INTERNAL_ERROR",
+                details=str(e)
+            ), 500
+
 @messages_ns.route('/<string:message_id>')
 class MessageResource(Resource):
     """
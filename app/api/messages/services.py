@@ -3,7 +3,7 @@ Servicios de negocio para manejo de mensajes de WhatsApp
 Implementa la lógica de negocio separada de los endpoints REST
 """
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import uuid
 import logging
 
@@ -14,7 +14,7 @@ from app.utils.exceptions import (
     ValidationError, MessageSendError, LineNotFoundError, 
     MessageNotFoundError, WhatsAppAPIError
 )
-from app.utils.helpers import create_success_response, create_error_response, paginate_results
+from app.utils.helpers import create_success_response, create_error_response, paginate_results, encode_cursor, decode_cursor
 from config.default import DefaultConfig
 
 class MessageService:
@@ -1808,13 +1808,16 @@ class MessageService:
             self.logger.info(f"[SIMULADO] Mensaje de imagen enviado a {phone_number}: {caption[:30] if caption else '[Imagen]'}...")
             return simulated_id
     
-    def get_messages(self, filters: Dict[str, Any] = None, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def get_messages(self, filters: Dict[str, Any] = None, page: int = 1, per_page: int = 10,
+                     cursor: str = None, include_total: str = 'approx') -> Dict[str, Any]:
         """
-        Obtiene lista de mensajes con filtros y paginación
+        Obtiene lista de mensajes con filtros y paginación keyset en base de datos
         Args:
             filters: Filtros a aplicar
-            page: Número de página
+            page: Número de página (solo sin cursor; usa OFFSET en la consulta)
             per_page: Elementos por página
+            cursor: Cursor devuelto como next_cursor en la página anterior
+            include_total: 'approx' (estimación), 'exact' o 'none'
         Returns:
             dict: Lista paginada de mensajes
         """
@@ -1822,6 +1825,8 @@ class MessageService:
             # Validar parámetros de paginación
             page = max(1, page)
             per_page = max(1, min(per_page, 100))  # Máximo 100 por página
+            if include_total not in ('approx', 'exact', 'none'):
+                raise ValidationError("include_total debe ser 'approx', 'exact' o 'none'")
             
             # Aplicar filtros básicos si se proporcionan
             query_filters = {}
@@ -1843,29 +1848,46 @@ class MessageService:
                 if filters.get('direction'):
                     query_filters['direction'] = filters['direction']
             
-            # Obtener mensajes filtrados
-            if query_filters:
-                messages = self.msg_repo.find_by(**query_filters)
-            else:
-                messages = self.msg_repo.get_all()
+            # Filtrar, ordenar y paginar en la base de datos (más recientes primero)
+            after = decode_cursor(cursor) if cursor else None
+            offset = (page - 1) * per_page if not cursor else None
+            messages, has_next = self.msg_repo.paginate_keyset(
+                filters=query_filters,
+                limit=per_page,
+                after=after,
+                offset=offset,
+                replica=True
+            )
             
-            # Ordenar por fecha de creación (más recientes primero)
-            messages.sort(key=lambda x: x.created_at, reverse=True)
+            next_cursor = None
+            if has_next and messages:
+                next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
             
-            # Aplicar paginación
-            paginated_result = paginate_results(
-                [self._format_message_response(msg) for msg in messages],
-                page=page,
-                per_page=per_page
-            )
+            pagination = {
+                'page': page if not cursor else None,
+                'per_page': per_page,
+                'has_next': has_next,
+                'has_prev': bool(cursor) or page > 1,
+                'next_cursor': next_cursor
+            }
             
-            # Formatear respuesta
+            if include_total != 'none':
+                total_items, is_estimate = self.msg_repo.count_filtered(
+                    query_filters, approximate=(include_total == 'approx'), replica=True
+                )
+                pagination.update({
+                    'total_items': total_items,
+                    'total_pages': (total_items + per_page - 1) // per_page,
+                    'total_is_estimate': is_estimate
+                })
+            
+            # Serializar solo la página devuelta
             response_data = {
-                'messages': paginated_result['items'],
-                'pagination': paginated_result['pagination']
+                'messages': [self._format_message_response(msg) for msg in messages],
+                'pagination': pagination
             }
             
-            self.logger.info(f"Obtenidos {len(paginated_result['items'])} mensajes (página {page})")
+            self.logger.info(f"Obtenidos {len(messages)} mensajes (página {page if not cursor else 'cursor'})")
             return create_success_response(
                 data=response_data,
                 message=f"Mensajes obtenidos exitosamente"
@@ -1878,6 +1900,151 @@ class MessageService:
             self.logger.error(f"Error obteniendo mensajes: {e}")
             raise WhatsAppAPIError(f"Error al obtener mensajes: {str(e)}")
     
+    def search_messages(self, query: str, phone_number: str = None, date_from: str = None,
+                        date_to: str = None, scope: str = 'messages', limit: int = 20,
+                        offset: int = 0) -> Dict[str, Any]:
+        """
+        Busca mensajes e interacciones del chatbot por texto completo
+        Args:
+            query: Texto a buscar
+            phone_number: Filtrar por número de teléfono (opcional)
+            date_from: Fecha ISO mínima, inclusive (opcional)
+            date_to: Fecha ISO máxima; si es solo fecha incluye ese día completo (opcional)
+            scope: 'messages', 'interactions' o 'all'
+            limit: Máximo de resultados por tipo (máximo 100)
+            offset: Resultados a omitir
+        Returns:
+            dict: Resultados ordenados por relevancia
+        """
+        try:
+            query = (query or '').strip()
+            if not query:
+                raise ValidationError("El parámetro q es requerido", field='q')
+            if scope not in ('messages', 'interactions', 'all'):
+                raise ValidationError("scope debe ser 'messages', 'interactions' o 'all'", field='scope')
+            if phone_number and not validate_phone_number(phone_number):
+                raise ValidationError("Formato de número de teléfono inválido en filtros")
+            
+            limit = max(1, min(limit, 100))
+            offset = max(0, offset)
+            start = self._parse_search_date(date_from, 'date_from')
+            end = self._parse_search_date(date_to, 'date_to', end_of_day=True)
+            
+            response_data = {'query': query, 'scope': scope}
+            
+            if scope in ('messages', 'all'):
+                results = self.msg_repo.search(query, phone_number=phone_number, date_from=start,
+                                               date_to=end, limit=limit, offset=offset)
+                response_data['messages'] = [
+                    dict(self._format_message_response(message), rank=round(rank, 6))
+                    for message, rank in results
+                ]
+            
+            if scope in ('interactions', 'all'):
+                from database.models import ChatbotInteraction
+                from database.search import search_ranked
+                
+                results = search_ranked(ChatbotInteraction, query, phone_number=phone_number,
+                                        date_from=start, date_to=end, limit=limit, offset=offset)
+                response_data['interactions'] = [
+                    dict(interaction.to_dict(), rank=round(rank, 6))
+                    for interaction, rank in results
+                ]
+            
+            self.logger.info(f"Búsqueda '{query}' ({scope}) completada")
+            return create_success_response(
+                data=response_data,
+                message="Búsqueda completada exitosamente"
+            )
+            
+        except ValidationError as e:
+            self.logger.warning(f"Error de validación en búsqueda: {e}")
+            raise e
+        except Exception as e:
+            self.logger.error(f"Error buscando mensajes: {e}")
+            raise WhatsAppAPIError(f"Error al buscar mensajes: {str(e)}")
+    
+    def get_inbox(self, line_id: str = None, unread_only: bool = False, limit: int = 20,
+                  cursor: str = None) -> Dict[str, Any]:
+        """
+        Obtiene la bandeja de entrada: última actividad por conversación y mensajes sin leer
+        Lee de conversation_summaries, sin recorrer la tabla de mensajes
+        Args:
+            line_id: Filtrar por línea de mensajería (opcional)
+            unread_only: Solo conversaciones con mensajes sin leer
+            limit: Conversaciones por página (máximo 100)
+            cursor: Cursor devuelto como next_cursor en la página anterior
+        Returns:
+            dict: Conversaciones paginadas por cursor
+        """
+        try:
+            limit = max(1, min(limit, 100))
+            after = decode_cursor(cursor) if cursor else None
+            if after and len(after) != 3:
+                raise ValidationError("Cursor de paginación inválido", field='cursor')
+            
+            conversations, has_next = self.msg_repo.summaries.list_inbox(
+                line_id=line_id, unread_only=unread_only, limit=limit, after=after
+            )
+            
+            next_cursor = None
+            if has_next and conversations:
+                last = conversations[-1]
+                next_cursor = encode_cursor(last.last_message_at, last.phone_number, last.line_id)
+            
+            return create_success_response(
+                data={
+                    'conversations': [conversation.to_dict() for conversation in conversations],
+                    'pagination': {'limit': limit, 'has_next': has_next, 'next_cursor': next_cursor}
+                },
+                message="Conversaciones obtenidas exitosamente"
+            )
+            
+        except ValidationError as e:
+            self.logger.warning(f"Error de validación obteniendo bandeja de entrada: {e}")
+            raise e
+        except Exception as e:
+            self.logger.error(f"Error obteniendo bandeja de entrada: {e}")
+            raise WhatsAppAPIError(f"Error al obtener conversaciones: {str(e)}")
+    
+    def mark_conversation_read(self, phone_number: str, line_id: str = None) -> Dict[str, Any]:
+        """
+        Marca como leídos los mensajes entrantes de una conversación
+        Args:
+            phone_number: Número del contacto
+            line_id: Línea de mensajería (opcional; sin ella todas las líneas)
+        Returns:
+            dict: Número de conversaciones actualizadas
+        """
+        if not validate_phone_number(phone_number):
+            raise ValidationError("Formato de número de teléfono inválido", field='phone_number')
+        
+        updated = self.msg_repo.summaries.mark_read(phone_number, line_id=line_id)
+        return create_success_response(
+            data={'phone_number': phone_number, 'updated': updated},
+            message="Conversación marcada como leída"
+        )
+    
+    def _parse_search_date(self, value: Optional[str], field: str, end_of_day: bool = False) -> Optional[datetime]:
+        """
+        Convierte una fecha ISO de los filtros de búsqueda
+        Args:
+            value: Fecha o fecha-hora ISO 8601
+            field: Nombre del parámetro (para el error)
+            end_of_day: Si es solo fecha, devolver el inicio del día siguiente
+        Returns:
+            datetime o None
+        """
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValidationError(f"Fecha inválida en {field}, usar formato ISO 8601", field=field)
+        if end_of_day and len(value) == 10:
+            parsed += timedelta(days=1)
+        return parsed
+    
     def get_message_by_id(self, message_id: str) -> Dict[str, Any]:
         """
         Obtiene un mensaje específico por su ID
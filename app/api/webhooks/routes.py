@@ -6,11 +6,13 @@ from flask import request, jsonify, Response
 from flask_restx import Resource, Namespace
 import logging
 
+from app.services.interaction_log import interaction_log
 from app.services.webhook_processor import WebhookProcessor
 from app.services.whatsapp_api import WhatsAppAPIService
 from app.private.auth import require_webhook_verification
 from app.utils.exceptions import WhatsAppAPIError, ValidationError
 from app.utils.helpers import create_success_response, create_error_response
+from database.unit_of_work import get_uow_stats
 
 # Crear namespace para webhooks
 webhook_ns = Namespace('webhooks', description='Endpoints de webhook de WhatsApp')
@@ -115,6 +117,9 @@ class WebhookHealthCheck(Resource):
                 'webhook_verify_token_configured': bool(whatsapp_api.config.WEBHOOK_VERIFY_TOKEN),
                 'facebook_app_secret_configured': bool(getattr(whatsapp_api.config, 'FACEBOOK_APP_SECRET', None)),
                 'access_token_configured': bool(whatsapp_api.config.WHATSAPP_ACCESS_TOKEN),
+                'read_receipts': webhook_processor.read_receipts.get_stats() if webhook_processor.read_receipts else {'deferred': False},
+                'unit_of_work': get_uow_stats(),
+                'interaction_log': interaction_log.get_stats(),
                 'timestamp': webhook_processor.logger.handlers[0].format(
                     webhook_processor.logger.makeRecord(
                         'health', 20, __file__, 0, 'Health check', (), None
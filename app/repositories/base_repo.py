@@ -2,11 +2,19 @@
 Repositorio base con operaciones CRUD comunes
 Proporciona funcionalidad común para todos los repositorios específicos
 """
-from typing import List, Optional, Dict, Any
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterable, Tuple, Union
+import json
+from sqlalchemy import insert, lambda_stmt, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from flask import has_app_context
 from database.connection import db, get_db_session, safe_commit, safe_rollback
-from app.utils.exceptions import DatabaseError
+from database.unit_of_work import get_current_uow, commit_or_defer, rollback_or_fail, unit_of_work
+from database.replica import get_read_session
+from app.utils.exceptions import DatabaseError, ValidationError
+from config.default import DefaultConfig
 import logging
 
 
@@ -23,9 +31,51 @@ class BaseRepository:
         self.logger = logging.getLogger(f'repo.{model_class.__name__.lower()}')
     
     def get_session(self) -> Session:
-        """Obtiene una sesión de base de datos"""
+        """
+        Obtiene una sesión de base de datos
+        Dentro de una unidad de trabajo devuelve su sesión compartida; con contexto
+        Flask usa db.session (la misma de las lecturas, cerrada al terminar el request)
+        """
+        uow = get_current_uow()
+        if uow is not None:
+            return uow.session
+        if has_app_context():
+            return db.session
         return get_db_session()
     
+    def get_read_session(self) -> Session:
+        """
+        Obtiene la sesión para lecturas de solo consulta (estadísticas y listados)
+        Usa la réplica si está configurada, salvo dentro de una unidad de trabajo o
+        tras una escritura en el mismo contexto; fuera de Flask usa get_session().
+        Las instancias leídas aquí no deben modificarse ni guardarse: pertenecen a
+        otra sesión. Las lecturas genéricas (get_all, find_by, get_by_*) usan el primario
+        """
+        if not has_app_context():
+            return self.get_session()
+        return get_read_session()
+    
+    def read_query(self):
+        """Consulta del modelo sobre la sesión de lectura"""
+        return self.get_read_session().query(self.model_class)
+    
+    def first_by(self, column: str, value: Any) -> Optional[Any]:
+        """
+        Obtiene la primera instancia con column == value usando una sentencia lambda
+        La sentencia se construye y compila una sola vez por modelo y columna; en cada
+        llamada solo cambia el parámetro (caché de compilación del engine compartido)
+        Args:
+            column: Nombre de la columna
+            value: Valor buscado
+        Returns:
+            Instancia encontrada o None
+        """
+        model = self.model_class
+        attr = getattr(model, column)
+        stmt = lambda_stmt(lambda: select(model), track_on=[model, column])
+        stmt += lambda s: s.where(attr == value).limit(1)
+        return self.get_session().execute(stmt).scalars().first()
+    
     def create(self, **kwargs) -> Any:
         """
         Crea una nueva instancia
@@ -38,12 +88,13 @@ class BaseRepository:
             session = self.get_session()
             instance = self.model_class(**kwargs)
             session.add(instance)
-            safe_commit(session)
+            # Flush inmediato dentro de la unidad de trabajo para disponer del ID
+            commit_or_defer(session, flush=True)
             
             self.logger.debug(f"Creado nuevo {self.model_class.__name__}: {instance.id if hasattr(instance, 'id') else 'N/A'}")
             return instance
         except SQLAlchemyError as e:
-            safe_rollback(session)
+            rollback_or_fail(session, e)
             self.logger.error(f"Error creando {self.model_class.__name__}: {e}")
             raise DatabaseError(f"Error al crear {self.model_class.__name__}", "create")
     
@@ -99,7 +150,7 @@ class BaseRepository:
         """
         try:
             session = self.get_session()
-            instance = self.get_by_id(id)
+            instance = session.get(self.model_class, id)
             
             if not instance:
                 return None
@@ -108,12 +159,12 @@ class BaseRepository:
                 if hasattr(instance, key):
                     setattr(instance, key, value)
             
-            safe_commit(session)
+            commit_or_defer(session)
             
             self.logger.debug(f"Actualizado {self.model_class.__name__}: {id}")
             return instance
         except SQLAlchemyError as e:
-            safe_rollback(session)
+            rollback_or_fail(session, e)
             self.logger.error(f"Error actualizando {self.model_class.__name__} {id}: {e}")
             raise DatabaseError(f"Error al actualizar {self.model_class.__name__}", "update")
     
@@ -127,21 +178,135 @@ class BaseRepository:
         """
         try:
             session = self.get_session()
-            instance = self.get_by_id(id)
+            instance = session.get(self.model_class, id)
             
             if not instance:
                 return False
             
             session.delete(instance)
-            safe_commit(session)
+            commit_or_defer(session)
             
             self.logger.debug(f"Eliminado {self.model_class.__name__}: {id}")
             return True
         except SQLAlchemyError as e:
-            safe_rollback(session)
+            rollback_or_fail(session, e)
             self.logger.error(f"Error eliminando {self.model_class.__name__} {id}: {e}")
             raise DatabaseError(f"Error al eliminar {self.model_class.__name__}", "delete")
     
+    def create_many(self, rows: Iterable[Dict[str, Any]], chunk_size: int = None,
+                    returning: bool = False) -> Union[int, List[Any]]:
+        """
+        Inserta muchas filas con INSERT de Core (executemany) y un solo commit
+        Args:
+            rows: Diccionarios columna -> valor
+            chunk_size: Filas por sentencia (por defecto DB_BULK_CHUNK_SIZE)
+            returning: Si True, devuelve los IDs insertados (RETURNING)
+        Returns:
+            int con el número de filas insertadas, o lista de IDs si returning=True
+        """
+        return self._bulk_write(rows, chunk_size, returning, operation='create_many')
+    
+    def upsert_many(self, rows: Iterable[Dict[str, Any]], conflict_columns: List[str],
+                    update_columns: List[str] = None, chunk_size: int = None,
+                    returning: bool = False) -> Union[int, List[Any]]:
+        """
+        Inserta o actualiza muchas filas con INSERT ... ON CONFLICT (PostgreSQL y SQLite)
+        Args:
+            rows: Diccionarios columna -> valor
+            conflict_columns: Columnas de la restricción única que detecta el conflicto
+            update_columns: Columnas a actualizar en conflicto (por defecto todas las
+                            recibidas salvo id, created_at y las de conflicto);
+                            lista vacía equivale a ON CONFLICT DO NOTHING
+            chunk_size: Filas por sentencia (por defecto DB_BULK_CHUNK_SIZE)
+            returning: Si True, devuelve los IDs insertados o actualizados
+        Returns:
+            int con el número de filas procesadas, o lista de IDs si returning=True
+        """
+        return self._bulk_write(rows, chunk_size, returning, operation='upsert_many',
+                                conflict_columns=conflict_columns, update_columns=update_columns)
+    
+    def _bulk_write(self, rows: Iterable[Dict[str, Any]], chunk_size: Optional[int], returning: bool,
+                    operation: str, conflict_columns: List[str] = None,
+                    update_columns: List[str] = None) -> Union[int, List[Any]]:
+        """
+        Ejecuta inserciones masivas agrupando filas por conjunto de columnas
+        executemany exige que todas las filas de una sentencia tengan las mismas claves
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if returning else 0
+        
+        chunk_size = max(1, chunk_size or DefaultConfig.DB_BULK_CHUNK_SIZE)
+        table = self.model_class.__table__
+        
+        try:
+            session = self.get_session()
+            dialect = session.get_bind().dialect.name
+            
+            groups: Dict[tuple, List[Dict[str, Any]]] = {}
+            for row in rows:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            
+            ids: List[Any] = []
+            processed = 0
+            for columns, group in groups.items():
+                if conflict_columns:
+                    stmt = self._build_upsert(table, dialect, columns, conflict_columns, update_columns)
+                else:
+                    stmt = insert(table)
+                if returning:
+                    stmt = stmt.returning(*table.primary_key.columns)
+                
+                for start in range(0, len(group), chunk_size):
+                    chunk = group[start:start + chunk_size]
+                    result = session.execute(stmt, chunk)
+                    if returning:
+                        ids.extend(result.scalars().all())
+                    processed += result.rowcount if result.rowcount and result.rowcount > 0 else len(chunk)
+            
+            if not commit_or_defer(session):
+                raise DatabaseError(f"Error al confirmar {operation} de {self.model_class.__name__}", operation)
+            
+            self.logger.debug(f"{operation}: {len(rows)} {self.model_class.__name__}s en {len(groups)} grupo(s)")
+            return ids if returning else processed
+        except SQLAlchemyError as e:
+            rollback_or_fail(session, e)
+            self.logger.error(f"Error en {operation} de {self.model_class.__name__}: {e}")
+            raise DatabaseError(f"Error en inserción masiva de {self.model_class.__name__}", operation)
+    
+    def _build_upsert(self, table, dialect: str, columns: tuple, conflict_columns: List[str],
+                      update_columns: Optional[List[str]]):
+        """
+        Construye INSERT ... ON CONFLICT según el dialecto
+        Args:
+            table: Tabla destino
+            dialect: Nombre del dialecto ('postgresql' o 'sqlite')
+            columns: Columnas presentes en las filas
+            conflict_columns: Columnas que definen el conflicto
+            update_columns: Columnas a actualizar (None = todas las recibidas)
+        Returns:
+            Sentencia INSERT con cláusula ON CONFLICT
+        """
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(table)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table)
+        else:
+            raise DatabaseError(f"upsert_many no soportado en {dialect}", "upsert_many")
+        
+        if update_columns is None:
+            excluded = set(conflict_columns) | {'id', 'created_at'}
+            update_columns = [column for column in columns if column not in excluded]
+        
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        
+        set_ = {column: stmt.excluded[column] for column in update_columns}
+        if 'updated_at' in table.c and 'updated_at' not in set_:
+            # onupdate no se aplica en ON CONFLICT: actualizarlo explícitamente
+            set_['updated_at'] = datetime.utcnow()
+        return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_)
+    
     def count(self, filters: Dict[str, Any] = None) -> int:
         """
         Cuenta instancias con filtros opcionales
@@ -187,6 +352,90 @@ class BaseRepository:
             self.logger.error(f"Error buscando {self.model_class.__name__}s: {e}")
             raise DatabaseError(f"Error al buscar {self.model_class.__name__}s", "find_by")
 
+    
+    def paginate_keyset(self, filters: Dict[str, Any] = None, limit: int = 10,
+                        after: tuple = None, offset: int = None,
+                        replica: bool = False) -> Tuple[List[Any], bool]:
+        """
+        Obtiene una página ordenada por (created_at DESC, id DESC) con paginación keyset
+        Args:
+            filters: Filtros de igualdad por columna (opcional)
+            limit: Elementos por página
+            after: Cursor (created_at, id) del último elemento de la página anterior
+            offset: Offset para compatibilidad con paginación por número de página
+            replica: Si True, lee de la réplica (solo para listados que no se modifican)
+        Returns:
+            tuple: (elementos de la página, hay_más_páginas)
+        """
+        try:
+            model = self.model_class
+            query = self._filtered_query(filters, replica)
+            
+            if after:
+                created_at, last_id = after
+                last_id = model.id.type.python_type(last_id)
+                query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, last_id))
+            
+            query = query.order_by(model.created_at.desc(), model.id.desc())
+            if offset:
+                query = query.offset(offset)
+            
+            # Pedir un elemento extra para saber si hay página siguiente sin contar
+            results = query.limit(limit + 1).all()
+            return results[:limit], len(results) > limit
+        except (ValueError, TypeError) as e:
+            raise ValidationError(f"Cursor de paginación inválido: {e}", field='cursor')
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error paginando {self.model_class.__name__}s: {e}")
+            raise DatabaseError(f"Error al paginar {self.model_class.__name__}s", "paginate_keyset")
+    
+    def count_filtered(self, filters: Dict[str, Any] = None, approximate: bool = False,
+                       replica: bool = False) -> Tuple[int, bool]:
+        """
+        Cuenta instancias con filtros, opcionalmente con una estimación del planner
+        En PostgreSQL la estimación usa pg_class.reltuples (sin filtros) o EXPLAIN
+        (con filtros), evitando recorrer la tabla; en otros motores se cuenta exacto
+        Args:
+            filters: Filtros de igualdad por columna (opcional)
+            approximate: Si True, permite devolver una estimación
+            replica: Si True, cuenta en la réplica
+        Returns:
+            tuple: (total, es_estimación)
+        """
+        try:
+            query = self._filtered_query(filters, replica)
+            session = query.session
+            
+            if approximate and session.get_bind().dialect.name == 'postgresql':
+                if not filters:
+                    estimate = session.execute(
+                        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                        {'table': self.model_class.__tablename__}
+                    ).scalar()
+                else:
+                    compiled = query.statement.compile(dialect=session.get_bind().dialect)
+                    plan = session.connection().exec_driver_sql(
+                        f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+                    ).scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    estimate = plan[0]['Plan']['Plan Rows']
+                # reltuples es -1 en tablas nunca analizadas
+                if estimate is not None and estimate >= 0:
+                    return int(estimate), True
+            
+            return query.order_by(None).count(), False
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error contando {self.model_class.__name__}s: {e}")
+            raise DatabaseError(f"Error al contar {self.model_class.__name__}s", "count_filtered")
+    
+    def _filtered_query(self, filters: Dict[str, Any] = None, replica: bool = False):
+        """Construye una consulta con filtros de igualdad sobre columnas existentes"""
+        query = self.read_query() if replica else self.model_class.query
+        for field, value in (filters or {}).items():
+            if hasattr(self.model_class, field):
+                query = query.filter(getattr(self.model_class, field) == value)
+        return query
 
 class MessageRepository(BaseRepository):
     """
@@ -196,6 +445,28 @@ class MessageRepository(BaseRepository):
     def __init__(self):
         from database.models import Message
         super().__init__(Message)
+        self._summaries = None
+    
+    @property
+    def summaries(self):
+        """Repositorio del resumen por conversación (creado al primer uso)"""
+        if self._summaries is None:
+            from app.repositories.conversation_summary_repository import ConversationSummaryRepository
+            self._summaries = ConversationSummaryRepository(self.model_class)
+        return self._summaries
+    
+    def create(self, **kwargs) -> Any:
+        """
+        Crea un mensaje y actualiza el resumen de su conversación en la misma transacción
+        Args:
+            **kwargs: Datos del mensaje
+        Returns:
+            Mensaje creado
+        """
+        with unit_of_work('message_write'):
+            message = super().create(**kwargs)
+            self.summaries.record_message(message)
+        return message
     
     def get_by_whatsapp_id(self, whatsapp_message_id: str) -> Optional[Any]:
         """
@@ -206,7 +477,7 @@ class MessageRepository(BaseRepository):
             Mensaje encontrado o None
         """
         try:
-            result = self.model_class.query.filter_by(whatsapp_message_id=whatsapp_message_id).first()
+            result = self.first_by('whatsapp_message_id', whatsapp_message_id)
             if result:
                 self.logger.debug(f"Encontrado mensaje: {whatsapp_message_id}")
             return result
@@ -270,6 +541,31 @@ class MessageRepository(BaseRepository):
             self.logger.error(f"Error obteniendo mensajes recientes: {e}")
             raise DatabaseError("Error al obtener mensajes recientes", "get_recent_messages")
     
+    def search(self, query: str, phone_number: str = None, date_from: datetime = None,
+               date_to: datetime = None, limit: int = 20, offset: int = 0) -> List[Tuple[Any, float]]:
+        """
+        Busca mensajes por contenido con el índice de texto completo
+        Args:
+            query: Texto a buscar
+            phone_number: Filtrar por número de teléfono (opcional)
+            date_from: Fecha mínima, inclusive (opcional)
+            date_to: Fecha máxima, exclusiva (opcional)
+            limit: Máximo de resultados
+            offset: Resultados a omitir
+        Returns:
+            Lista de tuplas (mensaje, puntuación) por relevancia
+        """
+        try:
+            from database.search import search_ranked
+            
+            results = search_ranked(self.model_class, query, phone_number=phone_number,
+                                    date_from=date_from, date_to=date_to, limit=limit, offset=offset)
+            self.logger.debug(f"Búsqueda '{query}' encontró {len(results)} mensajes")
+            return results
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error buscando mensajes: {e}")
+            raise DatabaseError("Error al buscar mensajes (¿ejecutó 'flask setup-search'?)", "search")
+    
     def update_status(self, message_id: int, new_status: str) -> bool:
         """
         Actualiza el estado de un mensaje
@@ -279,7 +575,11 @@ class MessageRepository(BaseRepository):
         Returns:
             bool: True si se actualizó exitosamente
         """
-        updated = self.update(message_id, status=new_status)
+        with unit_of_work('message_status'):
+            updated = self.update(message_id, status=new_status)
+            if updated is not None:
+                self.summaries.record_status(updated.line_id, updated.phone_number,
+                                             updated.whatsapp_message_id, new_status)
         return updated is not None
 
 
@@ -308,7 +608,7 @@ class MessagingLineRepository(BaseRepository):
             else:
                 line_id_str = str(line_id)
             
-            result = self.model_class.query.filter_by(line_id=line_id_str).first()
+            result = self.first_by('line_id', line_id_str)
             if result:
                 self.logger.debug(f"Encontrada línea: {line_id_str}")
             return result
@@ -325,7 +625,7 @@ class MessagingLineRepository(BaseRepository):
             Línea encontrada o None
         """
         try:
-            result = self.model_class.query.filter_by(phone_number_id=phone_number_id).first()
+            result = self.first_by('phone_number_id', phone_number_id)
             if result:
                 self.logger.debug(f"Encontrada línea con phone_number_id: {phone_number_id}")
             return result
@@ -380,7 +680,7 @@ class ContactRepository(BaseRepository):
             Contacto encontrado o None
         """
         try:
-            result = self.model_class.query.filter_by(phone_number=phone_number).first()
+            result = self.first_by('phone_number', phone_number)
             if result:
                 self.logger.debug(f"Encontrado contacto: {phone_number}")
             return result
@@ -434,7 +734,7 @@ class WebhookRepository(BaseRepository):
             Evento encontrado o None
         """
         try:
-            result = self.model_class.query.filter_by(webhook_id=webhook_id).first()
+            result = self.first_by('webhook_id', webhook_id)
             if result:
                 self.logger.debug(f"Encontrado evento de webhook: {webhook_id}")
             return result
@@ -469,7 +769,7 @@ class MediaRepository(BaseRepository):
             Archivo encontrado o None
         """
         try:
-            result = self.model_class.query.filter_by(whatsapp_media_id=whatsapp_media_id).first()
+            result = self.first_by('whatsapp_media_id', whatsapp_media_id)
             if result:
                 self.logger.debug(f"Encontrado archivo: {whatsapp_media_id}")
             return result
@@ -486,7 +786,7 @@ class MediaRepository(BaseRepository):
             Archivo encontrado o None
         """
         try:
-            result = self.model_class.query.filter_by(file_path=file_path).first()
+            result = self.first_by('file_path', file_path)
             if result:
                 self.logger.debug(f"Encontrado archivo por ruta: {file_path}")
             return result
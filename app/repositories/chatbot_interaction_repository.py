@@ -111,17 +111,17 @@ class ChatbotInteractionRepository(BaseRepository):
     def get_user_stats(self, phone_number: str) -> Dict[str, Any]:
         """Obtiene estadísticas de interacciones del usuario"""
         try:
-            total_interactions = (self.model_class.query
+            total_interactions = (self.read_query()
                                 .filter_by(phone_number=phone_number)
                                 .count())
             
-            recent_interactions = (self.model_class.query
+            recent_interactions = (self.read_query()
                                  .filter_by(phone_number=phone_number)
                                  .filter(self.model_class.created_at >= 
                                         datetime.utcnow() - timedelta(days=7))
                                  .count())
             
-            last_interaction = (self.model_class.query
+            last_interaction = (self.read_query()
                               .filter_by(phone_number=phone_number)
                               .order_by(self.model_class.created_at.desc())
                               .first())
@@ -134,7 +134,7 @@ class ChatbotInteractionRepository(BaseRepository):
             }
             
             # Obtener primera interacción
-            first_interaction = (self.model_class.query
+            first_interaction = (self.read_query()
                                .filter_by(phone_number=phone_number)
                                .order_by(self.model_class.created_at.asc())
                                .first())
@@ -155,18 +155,12 @@ class ChatbotInteractionRepository(BaseRepository):
             }
     
     def cleanup_old_interactions(self, days: int = 30) -> int:
-        """Limpia interacciones antiguas"""
+        """Limpia interacciones antiguas en bloques"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            from database.retention import RetentionPolicy, purge_table
             
-            old_interactions = (self.model_class.query
-                              .filter(self.model_class.created_at < cutoff_date)
-                              .all())
-            
-            count = len(old_interactions)
-            
-            for interaction in old_interactions:
-                self.delete(interaction.id)
+            result = purge_table(RetentionPolicy(self.model_class.__tablename__, timedelta(days=days)))
+            count = result['deleted']
             
             self.logger.info(f"Limpiadas {count} interacciones antiguas (>{days} días)")
             return count
@@ -176,27 +170,21 @@ class ChatbotInteractionRepository(BaseRepository):
             return 0
     
     def search_interactions(self, query: str, phone_number: Optional[str] = None,
-                           limit: int = 50) -> List[ChatbotInteraction]:
-        """Busca interacciones por contenido"""
+                           limit: int = 50, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None) -> List[ChatbotInteraction]:
+        """Busca interacciones por contenido con el índice de texto completo"""
         try:
-            search_query = self.model_class.query
-            
-            # Filtrar por mensaje del usuario o respuesta del bot usando nombres correctos
-            search_filter = (
-                self.model_class.message_in.contains(query) |
-                self.model_class.message_out.contains(query)
+            from database.search import search_ranked
+            
+            # user_message y bot_response, ordenado por relevancia
+            results = search_ranked(
+                self.model_class, query,
+                phone_number=phone_number,
+                date_from=date_from,
+                date_to=date_to,
+                limit=limit
             )
-            search_query = search_query.filter(search_filter)
-            
-            # Filtrar por teléfono si se especifica
-            if phone_number:
-                search_query = search_query.filter_by(phone_number=phone_number)
-            
-            # Ordenar por fecha más reciente y limitar resultados
-            interactions = (search_query
-                           .order_by(self.model_class.created_at.desc())
-                           .limit(limit)
-                           .all())
+            interactions = [interaction for interaction, _ in results]
             
             self.logger.debug(f"Búsqueda '{query}' encontró {len(interactions)} interacciones")
             return interactions
@@ -17,7 +17,7 @@ class ConversationRepository(BaseRepository):
     def get_or_create_context(self, phone_number: str) -> ConversationContext:
         """Obtiene o crea un contexto de conversación"""
         try:
-            context = self.model_class.query.filter_by(phone_number=phone_number).first()
+            context = self.first_by('phone_number', phone_number)
             
             if context:
                 # Actualizar última interacción
@@ -42,10 +42,11 @@ class ConversationRepository(BaseRepository):
             self.logger.error(f"Error obteniendo/creando contexto para {phone_number}: {e}")
             raise
     
-    def update_context(self, phone_number: str, topic: str = None, data: dict = None) -> bool:
-        """Actualiza el contexto de conversación"""
+    def update_context(self, phone_number: str, topic: str = None, data: dict = None,
+                       flow_id=None) -> bool:
+        """Actualiza el contexto de conversación (flow_id: flujo que atiende al usuario)"""
         try:
-            context = self.model_class.query.filter_by(phone_number=phone_number).first()
+            context = self.first_by('phone_number', phone_number)
             
             if not context:
                 return False
@@ -57,6 +58,9 @@ class ConversationRepository(BaseRepository):
             if topic:
                 updates['current_topic'] = topic
                 
+            if flow_id is not None:
+                updates['flow_id'] = flow_id
+                
             if data:
                 current_data = context.context_data or {}
                 current_data.update(data)
@@ -81,7 +85,7 @@ class ConversationRepository(BaseRepository):
         """Establece timeout para una conversación"""
         try:
             timeout_time = datetime.utcnow() + timedelta(minutes=timeout_minutes)
-            context = self.model_class.query.filter_by(phone_number=phone_number).first()
+            context = self.first_by('phone_number', phone_number)
             
             if context:
                 result = self.update(context.id, timeout_at=timeout_time)
@@ -98,7 +102,7 @@ class ConversationRepository(BaseRepository):
     def close_conversation(self, phone_number: str) -> bool:
         """Cierra una conversación activa"""
         try:
-            context = self.model_class.query.filter_by(phone_number=phone_number).first()
+            context = self.first_by('phone_number', phone_number)
             
             if context:
                 result = self.update(context.id, 
@@ -117,11 +121,13 @@ class ConversationRepository(BaseRepository):
     def delete_context(self, phone_number: str) -> bool:
         """Elimina completamente un contexto de conversación"""
         try:
-            context = self.model_class.query.filter_by(phone_number=phone_number).first()
+            context = self.first_by('phone_number', phone_number)
             
             if context:
                 result = self.delete(context.id)
                 if result:
+                    from app.services.rivescript_sessions import reset_session
+                    reset_session(phone_number)
                     self.logger.info(f"Contexto eliminado para {phone_number}")
                     return True
             
@@ -131,22 +137,17 @@ class ConversationRepository(BaseRepository):
             self.logger.error(f"Error eliminando contexto para {phone_number}: {e}")
             return False
     
-    def cleanup_expired_contexts(self) -> int:
-        """Limpia contextos expirados y retorna el número eliminado"""
+    def cleanup_expired_contexts(self, hours: int = None) -> int:
+        """Limpia contextos expirados en bloques y retorna el número eliminado"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(hours=24)
-            
-            old_contexts = self.model_class.query.filter(
-                self.model_class.last_interaction < cutoff_date
-            ).all()
+            from config.default import DefaultConfig
+            from database.retention import context_policy, purge_table
             
-            deleted_count = 0
-            for context in old_contexts:
-                if self.delete(context.id):
-                    deleted_count += 1
+            hours = DefaultConfig.CONTEXT_RETENTION_HOURS if hours is None else hours
+            result = purge_table(context_policy(hours))
             
-            self.logger.info(f"Limpiados {deleted_count} contextos expirados")
-            return deleted_count
+            self.logger.info(f"Limpiados {result['deleted']} contextos expirados")
+            return result['deleted']
             
         except Exception as e:
             self.logger.error(f"Error limpiando contextos expirados: {e}")
@@ -160,15 +161,18 @@ class ChatbotInteractionRepository(BaseRepository):
         self.logger = WhatsAppLogger.get_logger('interaction_repo')
     
     def save_interaction(self, phone_number: str, user_message: str, bot_response: str, 
-                        response_type: str, processing_time_ms: int = None) -> ChatbotInteraction:
-        """Guarda una nueva interacción del chatbot"""
+                        response_type: str, processing_time_ms: int = None,
+                        flow_id=None, confidence_score: float = None) -> ChatbotInteraction:
+        """Guarda una nueva interacción del chatbot (response_type se guarda como intent)"""
         try:
             interaction = self.create(
                 phone_number=phone_number,
-                message_in=user_message,
-                message_out=bot_response,
-                response_type=response_type,
-                processing_time_ms=processing_time_ms or 0
+                user_message=user_message or '',
+                bot_response=bot_response,
+                intent=response_type,
+                processing_time_ms=processing_time_ms or 0,
+                flow_id=flow_id,
+                confidence_score=confidence_score
             )
             
             self.logger.info(f"Interacción guardada para {phone_number} - Tipo: {response_type}")
@@ -193,7 +197,8 @@ class ChatbotInteractionRepository(BaseRepository):
             flow_id: ID del flujo que generó la respuesta (opcional)
             confidence_score: Puntuación de confianza de la respuesta (opcional)
         """
-        return self.save_interaction(phone_number, user_message, bot_response, response_type, processing_time_ms)
+        return self.save_interaction(phone_number, user_message, bot_response, response_type, processing_time_ms,
+                                     flow_id=flow_id, confidence_score=confidence_score)
     
     def get_user_history(self, phone_number: str, limit: int = 10) -> List[ChatbotInteraction]:
         """Obtiene el historial de interacciones de un usuario"""
@@ -214,10 +219,9 @@ class ChatbotInteractionRepository(BaseRepository):
         """Obtiene estadísticas de interacciones"""
         try:
             from sqlalchemy import func
-            from database.connection import get_db_session
             
             cutoff_date = datetime.utcnow() - timedelta(hours=hours_back)
-            session = get_db_session()
+            session = self.get_read_session()
             
             # Estadísticas generales
             general_stats = session.query(
@@ -226,19 +230,19 @@ class ChatbotInteractionRepository(BaseRepository):
                 func.count(func.distinct(self.model_class.phone_number)).label('unique_users')
             ).filter(self.model_class.created_at >= cutoff_date).first()
             
-            # Por tipo de respuesta
-            response_types = session.query(
-                self.model_class.response_type,
+            # Por intención detectada
+            intents = session.query(
+                self.model_class.intent,
                 func.count(self.model_class.id).label('count')
             ).filter(self.model_class.created_at >= cutoff_date)\
-             .group_by(self.model_class.response_type)\
+             .group_by(self.model_class.intent)\
              .all()
             
             return {
                 'total_interactions': general_stats.total_interactions or 0,
                 'avg_processing_time': float(general_stats.avg_processing_time or 0),
                 'unique_users': general_stats.unique_users or 0,
-                'response_types': {rt.response_type: rt.count for rt in response_types},
+                'intents': {row.intent: row.count for row in intents},
                 'period_hours': hours_back
             }
             
@@ -0,0 +1,229 @@
+# app/repositories/conversation_summary_repository.py
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.models import ConversationSummary
+from database.unit_of_work import commit_or_defer, rollback_or_fail
+from app.repositories.base_repo import BaseRepository
+from app.utils.exceptions import DatabaseError
+
+PREVIEW_LENGTH = 255
+
+
+class ConversationSummaryRepository(BaseRepository):
+    """Repositorio del resumen por conversación usado por la bandeja de entrada"""
+
+    def __init__(self, message_model=None):
+        """
+        Inicializa el repositorio
+        Args:
+            message_model: Modelo de mensajes para reconstruir (por defecto Message)
+        """
+        super().__init__(ConversationSummary)
+        if message_model is None:
+            from database.models import Message
+            message_model = Message
+        self.message_model = message_model
+
+    def record_message(self, message: Any) -> bool:
+        """
+        Aplica un mensaje nuevo al resumen de su conversación (INSERT ... ON CONFLICT)
+        Se ejecuta en un SAVEPOINT de la sesión actual: dentro de una unidad de trabajo
+        se confirma con el mensaje, y un fallo del resumen no revierte el mensaje
+        Args:
+            message: Mensaje con line_id, phone_number, whatsapp_message_id, content,
+                     message_type, direction, status y created_at
+        Returns:
+            bool: True si el resumen quedó actualizado
+        """
+        session = self.get_session()
+        try:
+            with session.begin_nested():
+                session.execute(self._build_record(message, session.get_bind().dialect.name))
+            commit_or_defer(session)
+            return True
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error actualizando resumen de conversación de {message.phone_number}: {e}")
+            return False
+
+    def _build_record(self, message: Any, dialect: str):
+        """Construye el upsert incremental; ignora mensajes más antiguos que el último"""
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(self.model_class)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(self.model_class)
+        else:
+            raise DatabaseError(f"Resumen de conversaciones no soportado en {dialect}", "record_message")
+
+        inbound = message.direction == 'inbound'
+        content = message.content if isinstance(message.content, str) else str(message.content or '')
+        now = datetime.utcnow()
+        stmt = stmt.values(
+            line_id=message.line_id or '',
+            phone_number=message.phone_number,
+            last_message_id=message.whatsapp_message_id,
+            last_message_preview=content[:PREVIEW_LENGTH],
+            last_message_type=message.message_type,
+            last_direction=message.direction,
+            last_status=message.status,
+            last_message_at=message.created_at or now,
+            unread_count=1 if inbound else 0,
+            message_count=1,
+            created_at=now,
+            updated_at=now
+        )
+
+        table = self.model_class.__table__
+        excluded = stmt.excluded
+        is_newer = excluded.last_message_at >= table.c.last_message_at
+
+        def latest(column: str):
+            return case((is_newer, excluded[column]), else_=table.c[column])
+
+        set_ = {column: latest(column) for column in (
+            'last_message_id', 'last_message_preview', 'last_message_type',
+            'last_direction', 'last_status', 'last_message_at'
+        )}
+        # Una respuesta saliente marca la conversación como leída
+        set_['unread_count'] = (table.c.unread_count + 1) if inbound else case((is_newer, 0), else_=table.c.unread_count)
+        set_['message_count'] = table.c.message_count + 1
+        set_['updated_at'] = now
+        return stmt.on_conflict_do_update(index_elements=['line_id', 'phone_number'], set_=set_)
+
+    def record_status(self, line_id: Optional[str], phone_number: str, whatsapp_message_id: str,
+                      status: str) -> None:
+        """
+        Actualiza el estado mostrado si corresponde al último mensaje de la conversación
+        Args:
+            line_id: Línea del mensaje
+            phone_number: Número del contacto
+            whatsapp_message_id: ID de WhatsApp del mensaje
+            status: Nuevo estado
+        """
+        session = self.get_session()
+        try:
+            with session.begin_nested():
+                session.execute(
+                    update(self.model_class)
+                    .where(self.model_class.line_id == (line_id or ''),
+                           self.model_class.phone_number == phone_number,
+                           self.model_class.last_message_id == whatsapp_message_id)
+                    .values(last_status=status, updated_at=datetime.utcnow())
+                )
+            commit_or_defer(session)
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error actualizando estado en resumen de {phone_number}: {e}")
+
+    def mark_read(self, phone_number: str, line_id: Optional[str] = None) -> int:
+        """
+        Pone a cero los mensajes sin leer de una conversación
+        Args:
+            phone_number: Número del contacto
+            line_id: Línea (opcional; sin ella se marcan todas las líneas)
+        Returns:
+            int: Conversaciones actualizadas
+        """
+        session = self.get_session()
+        try:
+            stmt = update(self.model_class).where(self.model_class.phone_number == phone_number)
+            if line_id is not None:
+                stmt = stmt.where(self.model_class.line_id == line_id)
+            result = session.execute(stmt.values(unread_count=0, updated_at=datetime.utcnow()))
+            commit_or_defer(session)
+            return result.rowcount
+        except SQLAlchemyError as e:
+            rollback_or_fail(session, e)
+            self.logger.error(f"Error marcando como leída la conversación {phone_number}: {e}")
+            raise DatabaseError("Error al marcar la conversación como leída", "mark_read")
+
+    def list_inbox(self, line_id: Optional[str] = None, unread_only: bool = False, limit: int = 20,
+                   after: Optional[Tuple[datetime, str, str]] = None) -> Tuple[List[ConversationSummary], bool]:
+        """
+        Lista conversaciones por último mensaje con paginación keyset (O(tamaño de página))
+        El orden (last_message_at, phone_number, line_id) es único también entre líneas y lo
+        sirve idx_conversation_summaries_inbox (con línea) o idx_conversation_summaries_recent
+        Args:
+            line_id: Filtrar por línea (opcional)
+            unread_only: Solo conversaciones con mensajes sin leer
+            limit: Conversaciones por página
+            after: Cursor (last_message_at, phone_number, line_id) del último elemento de la
+                   página anterior
+        Returns:
+            tuple: (conversaciones, hay_más_páginas)
+        """
+        try:
+            model = self.model_class
+            query = self.read_query()
+            if line_id is not None:
+                query = query.filter(model.line_id == line_id)
+            if unread_only:
+                query = query.filter(model.unread_count > 0)
+            if after:
+                query = query.filter(tuple_(model.last_message_at, model.phone_number, model.line_id)
+                                     < tuple_(*after))
+
+            results = (query.order_by(model.last_message_at.desc(), model.phone_number.desc(),
+                                      model.line_id.desc())
+                       .limit(limit + 1).all())
+            return results[:limit], len(results) > limit
+        except SQLAlchemyError as e:
+            self.logger.error(f"Error listando bandeja de entrada: {e}")
+            raise DatabaseError("Error al listar conversaciones", "list_inbox")
+
+    def rebuild(self) -> int:
+        """
+        Regenera todos los resúmenes desde el historial de mensajes con una sola sentencia
+        Returns:
+            int: Conversaciones reconstruidas
+        """
+        m = self.message_model.__table__
+        line_key = func.coalesce(m.c.line_id, '')
+        partition = (line_key, m.c.phone_number)
+
+        base = select(
+            line_key.label('line_id'), m.c.phone_number, m.c.whatsapp_message_id, m.c.content,
+            m.c.message_type, m.c.direction, m.c.status, m.c.created_at,
+            func.row_number().over(partition_by=partition,
+                                   order_by=(m.c.created_at.desc(), m.c.id.desc())).label('rn'),
+            func.max(case((m.c.direction == 'outbound', m.c.created_at))).over(partition_by=partition).label('last_out'),
+            func.count().over(partition_by=partition).label('total')
+        ).subquery('base')
+
+        unread = select(
+            base.c.line_id, base.c.phone_number,
+            func.sum(case((and_(base.c.direction == 'inbound',
+                                or_(base.c.last_out.is_(None), base.c.created_at > base.c.last_out)), 1),
+                          else_=0)).label('unread')
+        ).group_by(base.c.line_id, base.c.phone_number).subquery('unread')
+
+        now = datetime.utcnow()
+        latest = select(
+            base.c.line_id, base.c.phone_number, base.c.whatsapp_message_id,
+            func.substr(base.c.content, 1, PREVIEW_LENGTH), base.c.message_type, base.c.direction,
+            base.c.status, base.c.created_at, unread.c.unread, base.c.total,
+            literal(now, DateTime), literal(now, DateTime)
+        ).join_from(base, unread, and_(base.c.line_id == unread.c.line_id,
+                                       base.c.phone_number == unread.c.phone_number)
+        ).where(base.c.rn == 1)
+
+        columns = ['line_id', 'phone_number', 'last_message_id', 'last_message_preview', 'last_message_type',
+                   'last_direction', 'last_status', 'last_message_at', 'unread_count', 'message_count',
+                   'created_at', 'updated_at']
+
+        session = self.get_session()
+        try:
+            session.execute(delete(self.model_class))
+            session.execute(insert(self.model_class).from_select(columns, latest))
+            commit_or_defer(session)
+            count = session.execute(select(func.count()).select_from(self.model_class)).scalar()
+            self.logger.info(f"Resúmenes de conversación reconstruidos: {count}")
+            return count
+        except SQLAlchemyError as e:
+            rollback_or_fail(session, e)
+            self.logger.error(f"Error reconstruyendo resúmenes de conversación: {e}")
+            raise DatabaseError("Error al reconstruir resúmenes de conversación", "rebuild")
@@ -2,11 +2,18 @@
 Repositorio de flujos de conversación para PostgreSQL
 Versión simplificada usando SQLAlchemy ORM nativo con UUIDs
 """
-from typing import List, Optional, Dict, Any
-from database.models import ConversationFlow
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from database.models import ConversationFlow, FlowRevision
 from database.connection import db
+from database.unit_of_work import commit_or_defer, rollback_or_fail
 import logging
 
+# Marca de sesión: la transacción actual subió la revisión de flujos (ver services/flow_reload)
+REVISION_BUMPED = 'flow_revision_bumped'
+
 
 class FlowRepository:
     """
@@ -49,13 +56,15 @@ class FlowRepository:
             for key, value in update_data.items():
                 if hasattr(flow, key):
                     setattr(flow, key, value)
-                    
-            db.session.commit()
+            
+            self.bump_revision()
+            if not commit_or_defer(db.session):
+                return False
             self.logger.info(f"Flujo {flow_id} actualizado correctamente")
             return True
             
         except Exception as e:
-            db.session.rollback()
+            rollback_or_fail(db.session, e)
             self.logger.error(f"Error actualizando flujo {flow_id}: {e}")
             return False
             
@@ -64,12 +73,14 @@ class FlowRepository:
         try:
             flow = ConversationFlow(**flow_data)
             db.session.add(flow)
-            db.session.commit()
+            self.bump_revision()
+            if not commit_or_defer(db.session, flush=True):
+                return None
             self.logger.info(f"Flujo creado: {flow.name}")
             return flow
             
         except Exception as e:
-            db.session.rollback()
+            rollback_or_fail(db.session, e)
             self.logger.error(f"Error creando flujo: {e}")
             return None
             
@@ -81,11 +92,130 @@ class FlowRepository:
                 return False
                 
             db.session.delete(flow)
-            db.session.commit()
+            self.bump_revision()
+            if not commit_or_defer(db.session):
+                return False
             self.logger.info(f"Flujo {flow_id} eliminado")
             return True
             
         except Exception as e:
-            db.session.rollback()
+            rollback_or_fail(db.session, e)
             self.logger.error(f"Error eliminando flujo {flow_id}: {e}")
             return False
+            
+    def get_revision(self) -> Tuple[Optional[int], Optional[datetime]]:
+        """
+        Obtiene la revisión global de los flujos
+        Returns:
+            tuple: (revisión, fecha del último cambio); (0, None) si aún no hubo cambios
+                   y (None, None) si la tabla no existe
+        """
+        try:
+            row = db.session.execute(
+                select(FlowRevision.revision, FlowRevision.updated_at).where(FlowRevision.id == 1)
+            ).first()
+            return (row.revision, row.updated_at) if row else (0, None)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self.logger.warning(f"Revisión de flujos no disponible: {e}")
+            return None, None
+    
+    def bump_revision(self, commit: bool = False) -> None:
+        """
+        Sube la revisión global de los flujos en la transacción actual
+        Al confirmarse se avisa a los demás procesos para que recompilen (ver flow_reload)
+        Args:
+            commit: Si True, confirma la transacción
+        """
+        updated = db.session.execute(
+            update(FlowRevision).where(FlowRevision.id == 1)
+            .values(revision=FlowRevision.revision + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        if not updated:
+            db.session.add(FlowRevision(id=1, revision=1, updated_at=datetime.utcnow()))
+        db.session.info[REVISION_BUMPED] = True
+        if commit:
+            commit_or_defer(db.session)
+    
+    def increment_usage(self, flow_id: str) -> bool:
+        """
+        Incrementa el contador de uso de un flujo con un UPDATE atómico
+        Args:
+            flow_id: UUID del flujo
+        Returns:
+            bool: True si se actualizó el flujo
+        """
+        try:
+            updated = ConversationFlow.query.filter_by(id=flow_id).update(
+                {
+                    ConversationFlow.usage_count: func.coalesce(ConversationFlow.usage_count, 0) + 1,
+                    ConversationFlow.last_used: datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+            return commit_or_defer(db.session) and updated > 0
+            
+        except Exception as e:
+            rollback_or_fail(db.session, e)
+            self.logger.error(f"Error incrementando uso del flujo {flow_id}: {e}")
+            return False
+
+    def add_usage_many(self, usage: Dict[Any, Tuple[int, datetime]]) -> int:
+        """
+        Suma usos acumulados a varios flujos con un UPDATE aditivo por flujo (executemany)
+        usage_count = usage_count + n no depende del valor leído, así que los lotes de varios
+        workers se suman sin perder incrementos; last_used solo avanza. Los flujos se
+        actualizan en orden de ID para que dos workers no se bloqueen mutuamente
+        Args:
+            usage: flow_id -> (usos, último uso)
+        Returns:
+            int: Flujos actualizados
+        """
+        if not usage:
+            return 0
+
+        table = ConversationFlow.__table__
+        last_used = bindparam('b_last_used')
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(
+                usage_count=func.coalesce(table.c.usage_count, 0) + bindparam('b_count'),
+                last_used=case(
+                    (or_(table.c.last_used.is_(None), table.c.last_used < last_used), last_used),
+                    else_=table.c.last_used
+                )
+            )
+        )
+        try:
+            db.session.execute(stmt, [
+                {'b_id': flow_id, 'b_count': count, 'b_last_used': used_at}
+                for flow_id, (count, used_at) in sorted(usage.items(), key=lambda item: str(item[0]))
+            ])
+            if not commit_or_defer(db.session):
+                raise SQLAlchemyError("commit fallido")
+            return len(usage)
+
+        except SQLAlchemyError as e:
+            rollback_or_fail(db.session, e)
+            self.logger.error(f"Error sumando uso de {len(usage)} flujos: {e}")
+            raise
+
+    def get_flow_statistics(self) -> Dict[str, Any]:
+        """Obtiene estadísticas de uso de los flujos"""
+        flows = ConversationFlow.query.order_by(ConversationFlow.usage_count.desc()).all()
+        return {
+            'total_flows': len(flows),
+            'active_flows': sum(1 for flow in flows if flow.is_active),
+            'total_usage': sum(flow.usage_count or 0 for flow in flows),
+            'flows': [
+                {
+                    'id': str(flow.id),
+                    'name': flow.name,
+                    'is_active': flow.is_active,
+                    'usage_count': flow.usage_count or 0,
+                    'last_used': flow.last_used.isoformat() if flow.last_used else None
+                }
+                for flow in flows
+            ]
+        }
@@ -0,0 +1,192 @@
+# app/services/brain_cache.py
+
+"""
+Caché en disco del cerebro RiveScript ya parseado y ordenado
+La clave es un sha256 del contenido de los flujos (rivescript_brain guarda un fichero por
+flujo) y de la versión de rivescript. Se guarda el estado interno que producen stream() y sort_replies();
+las expresiones regulares de los triggers se guardan como patrón y se compilan al primer
+uso (y en segundo plano), porque recompilarlas al cargar cuesta casi lo mismo que parsear
+Solo se cargan ficheros escritos por este mismo servicio en BRAIN_CACHE_DIR (pickle)
+"""
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.logger import WhatsAppLogger
+
+try:
+    import rivescript
+    RIVESCRIPT_VERSION = rivescript.__version__
+except ImportError:
+    RIVESCRIPT_VERSION = None
+
+logger = WhatsAppLogger.get_logger('brain_cache')
+
+# Sube si cambia el formato del fichero
+CACHE_FORMAT = 1
+
+# Atributos de RiveScript que rellenan stream() y sort_replies()
+_STATE_ATTRIBUTES = (
+    '_global', '_var', '_sub', '_person', '_array', '_includes', '_lineage',
+    '_topics', '_thats', '_sorted', '_syntax'
+)
+
+
+class LazyPatternDict(dict):
+    """Caché de regex de triggers que compila cada patrón la primera vez que se pide"""
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, tuple):
+            value = re.compile(*value)
+            super().__setitem__(key, value)
+        return value
+
+    def warm(self) -> None:
+        """Compila todos los patrones pendientes"""
+        for key in list(self.keys()):
+            self[key]
+
+
+def cache_key(flows: List[Any]) -> str:
+    """
+    Calcula la clave del cerebro para una lista de flujos
+    Args:
+        flows: Flujos en orden de carga (id y rivescript_content)
+    Returns:
+        str: sha256 hexadecimal
+    """
+    digest = hashlib.sha256(f'{CACHE_FORMAT}:{RIVESCRIPT_VERSION}'.encode('utf-8'))
+    for flow in flows:
+        if not flow.rivescript_content:
+            continue
+        digest.update(b'\0' + str(flow.id).encode('utf-8') + b'\0')
+        digest.update(flow.rivescript_content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f'brain-{key}.pickle')
+
+
+def save_brain(cache_dir: str, key: str, rs: Any, flows: List[Dict[str, Any]],
+               errors: List[Dict[str, str]], keep: Optional[int] = 5) -> bool:
+    """
+    Guarda el estado compilado de un RiveScript (escritura atómica)
+    Args:
+        cache_dir: Directorio de la caché
+        key: Clave de cache_key()
+        rs: Instancia tras sort_replies()
+        flows: Flujos cargados (metadata del cerebro)
+        errors: Flujos con error de carga
+        keep: Ficheros más recientes a conservar (None no limpia)
+    Returns:
+        bool: True si se guardó
+    """
+    if rs._objlangs:
+        # Las macros de objeto son código compilado: no se cachean
+        return False
+
+    regexc = dict(rs._regexc)
+    regexc['trigger'] = {
+        trigger: (value.pattern, value.flags) if hasattr(value, 'pattern') else value
+        for trigger, value in rs._regexc['trigger'].items()
+    }
+    payload = {
+        'format': CACHE_FORMAT,
+        'state': {name: getattr(rs, name) for name in _STATE_ATTRIBUTES},
+        'regexc': regexc,
+        'flows': flows,
+        'errors': errors
+    }
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _cache_path(cache_dir, key))
+    except Exception as e:
+        logger.warning(f"No se pudo guardar la caché del cerebro: {e}")
+        return False
+
+    if keep is not None:
+        prune_cache(cache_dir, keep)
+    return True
+
+
+def load_brain(cache_dir: str, key: str, warm: bool = True,
+               session_manager: Any = None) -> Optional[Tuple[Any, List[Dict[str, Any]], List[Dict[str, str]]]]:
+    """
+    Reconstruye un RiveScript desde la caché
+    Args:
+        cache_dir: Directorio de la caché
+        key: Clave de cache_key()
+        warm: Compilar los patrones en segundo plano (False si el llamador lo agrupa, ver warm_patterns)
+        session_manager: Almacén de variables de usuario (None: en memoria de la instancia)
+    Returns:
+        tuple: (instancia RiveScript, flujos, errores) o None si no hay caché válida
+    """
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as fh:
+            payload = pickle.load(fh)
+        if payload.get('format') != CACHE_FORMAT:
+            return None
+
+        rs = rivescript.RiveScript(utf8=True, debug=False, session_manager=session_manager)
+        for name, value in payload['state'].items():
+            setattr(rs, name, value)
+        regexc = payload['regexc']
+        regexc['trigger'] = LazyPatternDict(regexc['trigger'])
+        rs._regexc = regexc
+    except Exception as e:
+        logger.warning(f"Caché del cerebro inválida ({path}): {e}")
+        return None
+
+    os.utime(path)
+    if warm:
+        warm_patterns([rs])
+    return rs, payload['flows'], payload['errors']
+
+
+def warm_patterns(instances: List[Any]) -> None:
+    """
+    Compila en un solo hilo de fondo los patrones pendientes de varios RiveScript cargados
+    Args:
+        instances: Instancias devueltas por load_brain()
+    """
+    pending = [rs._regexc['trigger'] for rs in instances
+               if isinstance(rs._regexc.get('trigger'), LazyPatternDict)]
+    if not pending:
+        return
+
+    def _warm():
+        for patterns in pending:
+            patterns.warm()
+
+    threading.Thread(target=_warm, name='brain-cache-warm', daemon=True).start()
+
+
+def prune_cache(cache_dir: str, keep: int) -> None:
+    """
+    Borra los ficheros de la caché menos usados
+    Args:
+        cache_dir: Directorio de la caché
+        keep: Ficheros más recientes a conservar
+    """
+    try:
+        files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                 if name.startswith('brain-') and name.endswith('.pickle')]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[keep:]:
+            os.remove(path)
+    except OSError as e:
+        logger.debug(f"No se pudo limpiar la caché del cerebro: {e}")
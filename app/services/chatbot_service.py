@@ -5,9 +5,13 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 
+from app.services.conversation_turn import ConversationTurn
+from app.services.interaction_log import interaction_log
 from app.services.rivescript_service import RiveScriptService
+from app.services.rivescript_sessions import reset_session
 from app.repositories.conversation_repository import ConversationRepository, ChatbotInteractionRepository
 from app.repositories.flow_repository import FlowRepository
+from app.utils.keyword_matcher import keyword_matcher
 from app.utils.logger import WhatsAppLogger
 from config.default import DefaultConfig
 
@@ -80,62 +84,10 @@ class ChatbotService:
             # 1. Limpiar número de teléfono
             clean_phone = self._clean_phone_number(phone_number)
             
-            # 2. NUEVA LÓGICA: Verificar y manejar timeout de conversación
-            context = self.context_repo.get_or_create_context(clean_phone)
-            
-            if self._is_conversation_expired(context):
-                self.logger.info(f"Conversación expirada para {clean_phone}, reiniciando sesión")
-                return self._restart_conversation_session(context, message, start_time)
-            
-            # 3. Verificar comando de cierre explícito
-            if self._is_close_command(message):
-                self.logger.info(f"Comando de cierre recibido de {clean_phone}")
-                return self._close_conversation(context, start_time)
-            
-            # 4. Intentar respuesta con flujos RiveScript
-            flow_response = self.rivescript_service.get_response(clean_phone, message)
-            
-            processing_time = int((time.time() - start_time) * 1000)
-            
-            if flow_response:
-                self.logger.info(f"Respuesta generada por flujo: {flow_response['type']}")
-                
-                # Registrar interacción exitosa
-                self._log_interaction(
-                    phone_number=clean_phone,
-                    user_message=message,
-                    bot_response=flow_response.get('response'),
-                    intent=flow_response.get('type'),
-                    processing_time_ms=processing_time,
-                    flow_id=flow_response.get('flow_id'),
-                    confidence_score=flow_response.get('confidence_score')
-                )
-                
-                flow_response['processing_time_ms'] = processing_time
-                flow_response['timestamp'] = datetime.utcnow().isoformat()
-                flow_response['phone_number'] = clean_phone
-                
-                return flow_response
-            else:
-                # 3. Si no hay match en flujos, usar respuesta por defecto
-                self.logger.info(f"No hay match en flujos para: {message[:30]}...")
-                
-                default_response = self._get_default_response(message)
-                
-                # Registrar interacción sin match
-                self._log_interaction(
-                    phone_number=clean_phone,
-                    user_message=message,
-                    bot_response=default_response.get('response'),
-                    intent=default_response.get('type'),
-                    processing_time_ms=processing_time
-                )
-                
-                default_response['processing_time_ms'] = processing_time
-                default_response['timestamp'] = datetime.utcnow().isoformat()
-                default_response['phone_number'] = clean_phone
-                
-                return default_response
+            # 2. Un turno por mensaje: el contexto se carga una vez y todas las
+            # escrituras del pipeline se confirman con un solo commit al salir
+            with ConversationTurn(self.context_repo, clean_phone, message) as turn:
+                return self._process_turn(turn)
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
@@ -161,6 +113,76 @@ class ChatbotService:
             
             return error_response
     
+    def _process_turn(self, turn: ConversationTurn) -> Dict[str, Any]:
+        """
+        Genera la respuesta de un mensaje con el contexto ya cargado en el turno
+        
+        Args:
+            turn: Turno de conversación abierto por process_message
+            
+        Returns:
+            dict: Respuesta generada con metadata
+        """
+        context, message, clean_phone = turn.context, turn.message, turn.phone_number
+        
+        # Verificar y manejar timeout de conversación
+        if self._is_conversation_expired(context):
+            self.logger.info(f"Conversación expirada para {clean_phone}, reiniciando sesión")
+            return self._restart_conversation_session(context, message, turn.start_time)
+        
+        # Verificar comando de cierre explícito
+        if self._is_close_command(message):
+            self.logger.info(f"Comando de cierre recibido de {clean_phone}")
+            return self._close_conversation(context, turn.start_time)
+        
+        # Intentar respuesta con flujos RiveScript sobre el mismo contexto
+        flow_response = self.rivescript_service.get_response(clean_phone, message, turn=turn)
+        
+        processing_time = turn.elapsed_ms()
+        
+        if flow_response:
+            self.logger.info(f"Respuesta generada por flujo: {flow_response['type']}")
+            
+            # Registrar interacción exitosa
+            self._log_interaction(
+                phone_number=clean_phone,
+                user_message=message,
+                bot_response=flow_response.get('response'),
+                intent=flow_response.get('type'),
+                processing_time_ms=processing_time,
+                flow_id=flow_response.get('flow_id'),
+                confidence_score=flow_response.get('confidence_score'),
+                context_id=context.id
+            )
+            
+            flow_response['processing_time_ms'] = processing_time
+            flow_response['timestamp'] = datetime.utcnow().isoformat()
+            flow_response['phone_number'] = clean_phone
+            
+            return flow_response
+        
+        # Si no hay match en flujos, usar respuesta por defecto
+        self.logger.info(f"No hay match en flujos para: {message[:30]}...")
+        
+        default_response = self._get_default_response(message)
+        
+        # Registrar interacción sin match
+        self._log_interaction(
+            phone_number=clean_phone,
+            user_message=message,
+            bot_response=default_response.get('response'),
+            intent=default_response.get('type'),
+            processing_time_ms=processing_time,
+            confidence_score=default_response.get('confidence_score'),
+            context_id=context.id
+        )
+        
+        default_response['processing_time_ms'] = processing_time
+        default_response['timestamp'] = datetime.utcnow().isoformat()
+        default_response['phone_number'] = clean_phone
+        
+        return default_response
+    
     def _clean_phone_number(self, phone_number: str) -> str:
         """Limpia el número de teléfono para consistencia"""
         if not phone_number:
@@ -178,11 +200,11 @@ class ChatbotService:
     def _get_default_response(self, message: str) -> Dict[str, Any]:
         """Respuesta por defecto cuando no hay match en flujos"""
         
-        # Respuestas basadas en palabras clave simples
-        message_lower = message.lower()
+        # Respuestas basadas en palabras clave (todas las categorías en una pasada)
+        categories = keyword_matcher.categories(message)
         
         # Saludos
-        if any(greeting in message_lower for greeting in ['hola', 'hello', 'hi', 'buenos días', 'buenas tardes', 'buenas noches']):
+        if 'greeting' in categories:
             return {
                 'response': '¡Hola! Gracias por contactarnos. En breve un agente te atenderá.',
                 'type': 'default_greeting',
@@ -190,7 +212,7 @@ class ChatbotService:
             }
         
         # Despedidas
-        if any(goodbye in message_lower for goodbye in ['adiós', 'adios', 'chau', 'bye', 'gracias']):
+        if 'goodbye' in categories:
             return {
                 'response': '¡Hasta luego! Si necesitas ayuda adicional, no dudes en contactarnos nuevamente.',
                 'type': 'default_goodbye',
@@ -198,14 +220,14 @@ class ChatbotService:
             }
         
         # Preguntas frecuentes
-        if any(faq in message_lower for faq in ['horario', 'hora', 'abierto', 'cerrado']):
+        if 'faq_hours' in categories:
             return {
                 'response': 'Nuestro horario de atención es de lunes a viernes de 9:00 AM a 6:00 PM. ¿En qué más puedo ayudarte?',
                 'type': 'default_faq',
                 'confidence_score': 0.6
             }
         
-        if any(price in message_lower for price in ['precio', 'costo', 'cuanto', 'valor']):
+        if 'faq_price' in categories:
             return {
                 'response': 'Para información sobre precios, un agente especializado te contactará pronto con toda la información detallada.',
                 'type': 'default_faq',
@@ -231,9 +253,9 @@ class ChatbotService:
     def _log_interaction(self, phone_number: str, user_message: str, bot_response: str,
                         intent: str, processing_time_ms: int, 
                         flow_id: Optional[str] = None, **kwargs):
-        """Registra la interacción del chatbot en la base de datos"""
+        """Registra la interacción del chatbot (encolada y escrita por lotes en segundo plano)"""
         try:
-            self.interaction_repo.log_interaction(
+            interaction_log.log(
                 phone_number=phone_number,
                 user_message=user_message,
                 bot_response=bot_response,
@@ -424,12 +446,16 @@ class ChatbotService:
             context.current_topic = "session_restart"
             context.context_data = {'restarted': True, 'previous_message': message}
             
-            # Guardar cambios
-            self.context_repo.update_context(context.phone_number, {
-                'session_count': context.session_count,
-                'current_topic': context.current_topic,
-                'context_data': context.context_data
-            })
+            # Descartar las variables RiveScript en memoria de la sesión anterior
+            reset_session(context.phone_number)
+            
+            # Guardar cambios sobre el contexto ya cargado
+            self.context_repo.update(
+                context.id,
+                session_count=context.session_count,
+                current_topic=context.current_topic,
+                context_data=context.context_data
+            )
             
             processing_time = int((time.time() - start_time) * 1000)
             
@@ -447,14 +473,15 @@ class ChatbotService:
             }
             
             # Registrar evento de reinicio
-            self.interaction_repo.log_interaction(
+            self._log_interaction(
                 phone_number=context.phone_number,
                 user_message=message,
                 bot_response=restart_response['response'],
-                response_type='session_restart',
+                intent='session_restart',
                 processing_time_ms=processing_time,
                 flow_id=context.flow_id,
-                confidence_score=1.0
+                confidence_score=1.0,
+                context_id=context.id
             )
             
             self.logger.info(f"CONVERSATION_RESTARTED: {context.phone_number} - session_{context.session_count}")
@@ -475,15 +502,7 @@ class ChatbotService:
         Returns:
             bool: True si es comando de cierre
         """
-        close_commands = [
-            'cerrar conversacion', 'cerrar', 'terminar', 'salir', 'bye', 'adios', 'adiós',
-            'hasta luego', 'nos vemos', 'chau', 'goodbye', 'finish', 'end', 'stop',
-            'cerrar conversación', 'finalizar', 'acabar'
-        ]
-        
-        message_lower = message.lower().strip()
-        
-        return any(command in message_lower for command in close_commands)
+        return keyword_matcher.matches(message, 'close')
     
     def _close_conversation(self, context, start_time: float) -> Dict[str, Any]:
         """
@@ -512,11 +531,11 @@ class ChatbotService:
             }
             
             # Registrar evento de cierre
-            self.interaction_repo.log_interaction(
+            self._log_interaction(
                 phone_number=context.phone_number,
                 user_message="[COMANDO_CIERRE]",
                 bot_response=close_response['response'],
-                response_type='conversation_closed',
+                intent='conversation_closed',
                 processing_time_ms=processing_time,
                 flow_id=context.flow_id if context else None,
                 confidence_score=1.0
@@ -0,0 +1,69 @@
+# app/services/conversation_turn.py
+
+"""
+Turno de conversación: un mensaje entrante del chatbot de principio a fin
+El contexto del usuario se carga una sola vez al abrir el turno y el mismo objeto viaja
+por ChatbotService y RiveScriptService; las escrituras del turno (contexto y flujo asignado;
+uso del flujo e interacción si no van por lotes en segundo plano) se agrupan en una unidad
+de trabajo y se confirman con un único commit al cerrarlo. En el webhook el turno va en su
+propia unidad, después de confirmar el mensaje entrante y antes de enviar la respuesta
+"""
+import time
+from typing import Any, Optional
+
+from database.unit_of_work import UnitOfWork, unit_of_work
+
+
+class ConversationTurn:
+    """Contexto de conversación de un mensaje, cargado y guardado una sola vez"""
+
+    def __init__(self, context_repo: Any, phone_number: str, message: str,
+                 name: str = 'chatbot_message'):
+        """
+        Inicializa el turno (el contexto se carga al entrar)
+        Args:
+            context_repo: ConversationRepository
+            phone_number: Número ya normalizado
+            message: Mensaje entrante
+            name: Nombre de la unidad de trabajo para logs
+        """
+        self.context_repo = context_repo
+        self.phone_number = phone_number
+        self.message = message
+        self.context: Optional[Any] = None
+        self.start_time = time.time()
+        self._uow: UnitOfWork = unit_of_work(name)
+
+    def __enter__(self) -> 'ConversationTurn':
+        self._uow.__enter__()
+        try:
+            self.context = self.context_repo.get_or_create_context(self.phone_number)
+        except BaseException as e:
+            self._uow.__exit__(type(e), e, e.__traceback__)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return self._uow.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def flow_id(self) -> Optional[Any]:
+        """Flujo asignado al usuario en el contexto cargado"""
+        return self.context.flow_id if self.context is not None else None
+
+    def assign_flow(self, flow_id: Any) -> bool:
+        """
+        Asigna el flujo que respondió sobre el contexto ya cargado (sin volver a leerlo)
+        Args:
+            flow_id: ID del flujo
+        Returns:
+            bool: True si el flujo cambió
+        """
+        if self.context is None or str(self.context.flow_id) == str(flow_id):
+            return False
+        self.context_repo.update(self.context.id, flow_id=flow_id)
+        return True
+
+    def elapsed_ms(self) -> int:
+        """Milisegundos transcurridos desde que llegó el mensaje"""
+        return int((time.time() - self.start_time) * 1000)
@@ -0,0 +1,252 @@
+# app/services/flow_reload.py
+
+"""
+Propagación de recargas de flujos entre workers y nodos
+Cada cambio de flujo sube la revisión global de conversation_flow_revision en la misma
+transacción. Un hilo por proceso compara esa revisión con la del cerebro publicado y, si
+es mayor, recompila en segundo plano y publica el cerebro nuevo (ver rivescript_brain).
+Redis pub/sub despierta al hilo en cuanto se confirma un cambio; sin Redis, el retraso
+queda acotado por FLOW_RELOAD_POLL_SECONDS más el tiempo de compilación.
+Los hilos arrancan con el primer request de cada proceso: con gunicorn --preload el maestro
+no atiende requests, así que nunca compila ni llega al fork con una compilación a medias
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.repositories.flow_repository import REVISION_BUMPED, FlowRepository
+from app.services.rivescript_brain import CompiledBrain, brain_registry
+from app.utils.logger import WhatsAppLogger
+
+logger = WhatsAppLogger.get_logger('flow_reload')
+
+
+class FlowReloadWatcher:
+    """Hilo que recompila el cerebro del proceso cuando cambia la revisión de flujos"""
+
+    def __init__(self, app, poll_seconds: float = 2.0, channel: str = 'flows:reload'):
+        """
+        Inicializa el vigilante
+        Args:
+            app: Aplicación Flask (para el contexto de base de datos)
+            poll_seconds: Segundos entre consultas de la revisión
+            channel: Canal de Redis para avisos inmediatos
+        """
+        self.app = app
+        self.poll_seconds = max(0.1, poll_seconds)
+        self.channel = channel
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._threads = []
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+        self.stats: Dict[str, Any] = {
+            'checks': 0,
+            'reloads': 0,
+            'propagations': 0,
+            'last_seen_revision': None,
+            'last_check_at': None,
+            'last_propagation_ms': None,
+            'max_propagation_ms': 0.0,
+            'total_propagation_ms': 0.0,
+            'redis_subscribed': False,
+            'last_error': None
+        }
+
+    def start(self) -> None:
+        """Arranca el hilo de sondeo y, si hay Redis, el de suscripción"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._run, name='flow-reload-watcher', daemon=True)]
+        if self._redis() is not None:
+            self._threads.append(threading.Thread(target=self._listen, name='flow-reload-pubsub', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def ensure_started(self) -> None:
+        """Arranca los hilos en este proceso si aún no se arrancaron (before_request)"""
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                self.start()
+
+    def _reset_after_fork(self) -> None:
+        # Los hilos no sobreviven al fork y sus eventos o locks podían estar tomados:
+        # el worker arranca los suyos con su primer request
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def stop(self) -> None:
+        """Detiene los hilos"""
+        self._stop.set()
+        self._wake.set()
+
+    def is_running(self) -> bool:
+        return bool(self._threads) and self._threads[0].is_alive()
+
+    def trigger(self) -> None:
+        """Pide una comprobación inmediata sin esperar al siguiente sondeo"""
+        self._wake.set()
+
+    def _redis(self):
+        from app.extensions import get_redis_client
+        return get_redis_client()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.check()
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                logger.error(f"Error comprobando la revisión de flujos: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.stats['redis_subscribed'] = True
+                while not self._stop.is_set():
+                    if pubsub.get_message(timeout=1.0):
+                        self._wake.set()
+            except Exception as e:
+                self.stats['redis_subscribed'] = False
+                logger.warning(f"Suscripción a {self.channel} interrumpida, solo sondeo: {e}")
+                self._stop.wait(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def check(self) -> bool:
+        """
+        Compara la revisión global con la del cerebro publicado y recompila si es mayor
+        Returns:
+            bool: True si se publicó un cerebro nuevo
+        """
+        revision, changed_at = FlowRepository().get_revision()
+        self.stats['checks'] += 1
+        if revision is None:
+            return False
+        self.stats['last_seen_revision'] = revision
+        self.stats['last_check_at'] = datetime.utcnow().isoformat()
+
+        previous = brain_registry.current()
+        if previous is not None and previous.revision is not None and revision <= previous.revision:
+            return False
+
+        brain = brain_registry.reload(revision=revision)
+        if brain is None or brain is previous:
+            return False
+
+        self.stats['reloads'] += 1
+        if previous is not None and changed_at is not None:
+            # Desde el commit del cambio hasta que el cerebro nuevo atiende respuestas
+            delay_ms = max(0.0, (brain.compiled_at - changed_at).total_seconds() * 1000)
+            self.stats['last_propagation_ms'] = round(delay_ms, 1)
+            self.stats['max_propagation_ms'] = round(max(self.stats['max_propagation_ms'], delay_ms), 1)
+            self.stats['total_propagation_ms'] += delay_ms
+            self.stats['propagations'] += 1
+            logger.info(f"Flujos revisión {revision} propagados en {delay_ms:.0f} ms")
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Estado y métricas de propagación"""
+        propagations = self.stats['propagations']
+        return {
+            'running': self.is_running(),
+            'mode': 'redis+poll' if self.stats['redis_subscribed'] else 'poll',
+            'poll_seconds': self.poll_seconds,
+            **{key: value for key, value in self.stats.items() if key != 'total_propagation_ms'},
+            'avg_propagation_ms': round(self.stats['total_propagation_ms'] / propagations, 1) if propagations else None
+        }
+
+
+def get_flow_reload_watcher() -> Optional[FlowReloadWatcher]:
+    """Vigilante de la aplicación actual (None si no está arrancado)"""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('flow_reload_watcher')
+
+
+def start_flow_reload_watcher(app) -> Optional[FlowReloadWatcher]:
+    """
+    Registra la propagación de recargas de flujos si está habilitada
+    Los hilos arrancan con el primer request de cada proceso, nunca en el maestro
+    Args:
+        app: Aplicación Flask
+    Returns:
+        FlowReloadWatcher o None si está deshabilitada
+    """
+    if not app.config.get('FLOW_RELOAD_WATCHER_ENABLED', True) or app.config.get('TESTING'):
+        return None
+
+    watcher = FlowReloadWatcher(app, app.config.get('FLOW_RELOAD_POLL_SECONDS', 2.0),
+                                app.config.get('FLOW_RELOAD_CHANNEL', 'flows:reload'))
+    app.before_request(watcher.ensure_started)
+    app.extensions['flow_reload_watcher'] = watcher
+    return watcher
+
+
+def notify_flow_change() -> None:
+    """Avisa a todos los procesos (Redis) y al vigilante local de que cambió la revisión"""
+    watcher = get_flow_reload_watcher()
+    if watcher is not None:
+        watcher.trigger()
+
+    from app.extensions import get_redis_client
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        channel = current_app.config.get('FLOW_RELOAD_CHANNEL', 'flows:reload') if has_app_context() else 'flows:reload'
+        client.publish(channel, str(time.time()))
+    except Exception as e:
+        logger.warning(f"No se pudo publicar el cambio de flujos en Redis: {e}")
+
+
+def request_flow_reload() -> Optional[CompiledBrain]:
+    """
+    Recarga los flujos en todo el clúster subiendo la revisión global
+    Con el vigilante activo la recompilación ocurre en segundo plano y se devuelve el
+    cerebro vigente; sin vigilante (CLI, tests) se recompila en este hilo
+    Returns:
+        CompiledBrain publicado en este proceso
+    """
+    try:
+        FlowRepository().bump_revision(commit=True)
+    except Exception as e:
+        logger.warning(f"No se pudo subir la revisión de flujos: {e}")
+
+    watcher = get_flow_reload_watcher()
+    if watcher is not None and watcher.is_running():
+        return brain_registry.current() or brain_registry.get()
+    return brain_registry.reload()
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session: Session) -> None:
+    if session.info.pop(REVISION_BUMPED, False):
+        notify_flow_change()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session: Session) -> None:
+    session.info.pop(REVISION_BUMPED, None)
@@ -0,0 +1,231 @@
+# app/services/flow_usage.py
+
+"""
+Contadores de uso de flujos agregados en memoria
+Cada respuesta de un flujo solo suma en un diccionario del proceso; un hilo en segundo plano
+escribe cada FLOW_USAGE_FLUSH_SECONDS un UPDATE aditivo por flujo (usage_count + n) en una
+sola transacción, en vez de un UPDATE con commit por respuesta sobre la misma fila. Al ser
+aditivo, los lotes de varios workers se suman sin perder usos. Si la escritura falla, los
+usos vuelven al contador y se reintentan en el siguiente ciclo; al apagar se escribe lo
+pendiente. Sin el hilo en marcha (TESTING o FLOW_USAGE_BUFFERED=false) cada uso se escribe
+al momento, dentro de la unidad de trabajo activa
+"""
+import atexit
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.utils.logger import WhatsAppLogger
+
+logger = WhatsAppLogger.get_logger('flow_usage')
+
+# flow_id -> (usos, último uso)
+Usage = Dict[Any, Tuple[int, datetime]]
+
+
+def _write_usage(usage: Usage) -> int:
+    """Suma los usos acumulados con un UPDATE aditivo por flujo"""
+    from app.repositories.flow_repository import FlowRepository
+    return FlowRepository().add_usage_many(usage)
+
+
+class FlowUsageCounter:
+    """Contador de usos por flujo con escritura periódica"""
+
+    def __init__(self, writer: Callable[[Usage], Any] = _write_usage, interval: float = 10.0):
+        """
+        Inicializa el contador
+        Args:
+            writer: Función que suma un diccionario flow_id -> (usos, último uso)
+            interval: Segundos entre escrituras
+        """
+        self.writer = writer
+        self.interval = max(0.1, interval)
+
+        self._usage: Usage = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+        self._fork_hook = False
+
+        self._stats = {
+            'recorded': 0,
+            'written': 0,
+            'updates': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_error': None
+        }
+
+    @property
+    def running(self) -> bool:
+        """Si el hilo de escritura está activo en este proceso"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(self, flow_id: Any, count: int = 1) -> None:
+        """
+        Registra usos de un flujo
+        Args:
+            flow_id: ID del flujo que respondió
+            count: Usos a sumar
+        """
+        if flow_id is None:
+            return
+        now = datetime.utcnow()
+        if not self.running:
+            self.writer({flow_id: (count, now)})
+            with self._lock:
+                self._stats['recorded'] += count
+                self._stats['written'] += count
+            return
+
+        with self._lock:
+            self._merge(flow_id, count, now)
+            self._stats['recorded'] += count
+
+    def _merge(self, flow_id: Any, count: int, used_at: datetime) -> None:
+        previous = self._usage.get(flow_id)
+        if previous is not None:
+            count += previous[0]
+            used_at = max(used_at, previous[1])
+        self._usage[flow_id] = (count, used_at)
+
+    def pending(self, flow_id: Any = None) -> int:
+        """
+        Usos aún no escritos
+        Args:
+            flow_id: Flujo concreto (por defecto todos)
+        Returns:
+            int: Usos pendientes
+        """
+        with self._lock:
+            if flow_id is not None:
+                return self._usage.get(flow_id, (0, None))[0]
+            return sum(count for count, _ in self._usage.values())
+
+    def flush(self) -> int:
+        """
+        Escribe los usos acumulados (requiere contexto de aplicación)
+        Returns:
+            int: Usos escritos
+        """
+        with self._flush_lock:
+            with self._lock:
+                usage, self._usage = self._usage, {}
+            if not usage:
+                return 0
+
+            total = sum(count for count, _ in usage.values())
+            try:
+                self.writer(usage)
+            except Exception as e:
+                # La transacción se revirtió: devolver los usos para el siguiente ciclo
+                with self._lock:
+                    for flow_id, (count, used_at) in usage.items():
+                        self._merge(flow_id, count, used_at)
+                    self._stats['failed_flushes'] += 1
+                    self._stats['last_error'] = str(e)
+                logger.error(f"Error escribiendo uso de {len(usage)} flujos: {e}")
+                return 0
+
+            with self._lock:
+                self._stats['written'] += total
+                self._stats['updates'] += len(usage)
+                self._stats['flushes'] += 1
+            return total
+
+    def start(self, app) -> None:
+        """
+        Arranca el hilo de escritura
+        Args:
+            app: Aplicación Flask (para el contexto de base de datos)
+        """
+        self._app = app
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='flow-usage-flusher', daemon=True)
+        self._thread.start()
+        if not self._fork_hook:
+            atexit.register(self.shutdown)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook = True
+
+    def _restart_after_fork(self) -> None:
+        # Los usos heredados del padre los escribe el padre
+        self._thread = None
+        self._usage = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if self._app is not None:
+            self.start(self._app)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                self._stats['last_error'] = str(e)
+                logger.error(f"Error en el hilo de uso de flujos: {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo y escribe los usos pendientes"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.error(f"Error escribiendo uso de flujos pendiente al apagar: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene métricas del contador
+        Returns:
+            dict: Usos registrados, escritos y pendientes, escrituras y fallos
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = sum(count for count, _ in self._usage.values())
+            stats['pending_flows'] = len(self._usage)
+        stats.update({'running': self.running, 'interval_seconds': self.interval})
+        return stats
+
+
+def create_flow_usage() -> FlowUsageCounter:
+    """Crea el contador del proceso con FLOW_USAGE_FLUSH_SECONDS"""
+    from config.default import DefaultConfig
+
+    return FlowUsageCounter(interval=DefaultConfig.FLOW_USAGE_FLUSH_SECONDS)
+
+
+flow_usage = create_flow_usage()
+
+
+def start_flow_usage(app) -> Optional[FlowUsageCounter]:
+    """
+    Arranca la escritura periódica del uso de los flujos
+    Args:
+        app: Aplicación Flask
+    Returns:
+        FlowUsageCounter o None si está desactivada o se está en TESTING
+    """
+    if not app.config.get('FLOW_USAGE_BUFFERED', True) or app.config.get('TESTING'):
+        return None
+    flow_usage.start(app)
+    return flow_usage
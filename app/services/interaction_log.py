@@ -0,0 +1,293 @@
+# app/services/interaction_log.py
+
+"""
+Registro asíncrono de interacciones del chatbot
+Las filas de chatbot_interactions se encolan en un buffer acotado en memoria y un hilo en
+segundo plano las inserta por lotes (create_many) al llegar a CHATBOT_INTERACTION_LOG_BATCH
+filas o cada CHATBOT_INTERACTION_LOG_FLUSH_SECONDS, fuera del camino de la respuesta. Si el
+buffer se llena se descartan las filas más antiguas (contador 'overflow'); un lote que falla
+se reintenta una vez partiéndolo por mitades y solo se descartan las filas que siguen
+fallando (contador 'dropped'). Al apagar el proceso se
+escribe lo pendiente. Dentro de una unidad de trabajo la fila se encola solo cuando la
+unidad se confirma (su context_id puede apuntar a un contexto creado en ella) y se descarta
+si se revierte. Sin el hilo en marcha (TESTING o CHATBOT_INTERACTION_LOG_ASYNC=false)
+cada interacción se escribe al momento, dentro de la unidad de trabajo activa
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.utils.logger import WhatsAppLogger
+from database.ids import uuid7
+from database.unit_of_work import get_current_uow
+
+logger = WhatsAppLogger.get_logger('interaction_log')
+
+
+def interaction_row(phone_number: str, user_message: str, bot_response: Optional[str],
+                    intent: Optional[str] = None, processing_time_ms: Optional[int] = None,
+                    flow_id: Any = None, confidence_score: Optional[float] = None,
+                    context_id: Any = None) -> Dict[str, Any]:
+    """
+    Construye la fila de chatbot_interactions con la hora en que ocurrió la interacción
+    Args:
+        phone_number: Número del usuario
+        user_message: Mensaje entrante
+        bot_response: Respuesta enviada
+        intent: Tipo de respuesta ('flow', 'default_greeting', 'error'...)
+        processing_time_ms: Tiempo de procesamiento
+        flow_id: Flujo que respondió (opcional)
+        confidence_score: Confianza de la respuesta (opcional)
+        context_id: Contexto de conversación (opcional)
+    Returns:
+        dict: Columna -> valor, lista para create_many
+    """
+    now = datetime.utcnow()
+    return {
+        'id': uuid7(),
+        'phone_number': phone_number,
+        'user_message': user_message or '',
+        'bot_response': bot_response,
+        'intent': intent,
+        'confidence_score': confidence_score,
+        'flow_id': flow_id,
+        'context_id': context_id,
+        'processing_time_ms': processing_time_ms,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def _write_interactions(rows: List[Dict[str, Any]]) -> int:
+    """Inserta un lote de interacciones con un solo INSERT executemany"""
+    from app.repositories.conversation_repository import ChatbotInteractionRepository
+    return ChatbotInteractionRepository().create_many(rows)
+
+
+class InteractionLogBuffer:
+    """Buffer acotado de interacciones con escritura por lotes en segundo plano"""
+
+    def __init__(self, writer: Callable[[List[Dict[str, Any]]], Any] = _write_interactions,
+                 max_size: int = 10000, batch_size: int = 500, interval: float = 2.0):
+        """
+        Inicializa el buffer
+        Args:
+            writer: Función que inserta una lista de filas
+            max_size: Máximo de filas pendientes en memoria
+            batch_size: Filas por lote (y umbral para despertar al hilo)
+            interval: Segundos máximos entre escrituras
+        """
+        self.writer = writer
+        self.max_size = max(1, max_size)
+        self.batch_size = max(1, batch_size)
+        self.interval = max(0.1, interval)
+
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._retry: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+        self._fork_hook = False
+
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'overflow': 0,
+            'dropped': 0,
+            'last_error': None
+        }
+
+    @property
+    def running(self) -> bool:
+        """Si el hilo de escritura está activo en este proceso"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def log(self, **fields) -> None:
+        """
+        Registra una interacción (campos de interaction_row)
+        Con el hilo activo solo se encola (al confirmarse la unidad activa); sin él se
+        escribe al momento
+        """
+        row = interaction_row(**fields)
+        if not self.running:
+            self.writer([row])
+            with self._lock:
+                self._stats['written'] += 1
+            return
+
+        uow = get_current_uow()
+        if uow is not None:
+            uow.on_commit(lambda: self._enqueue(row))
+        else:
+            self._enqueue(row)
+
+    def _enqueue(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._rows) >= self.max_size:
+                # Buffer lleno: se pierde la interacción más antigua
+                self._rows.popleft()
+                self._stats['overflow'] += 1
+            self._rows.append(row)
+            self._stats['enqueued'] += 1
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Escribe todas las interacciones pendientes por lotes (requiere contexto de aplicación)
+        Returns:
+            int: Filas escritas
+        """
+        written = 0
+        with self._flush_lock:
+            if self._retry:
+                batch, self._retry = self._retry, []
+                written += self._write(batch, retry=True)
+            while True:
+                with self._lock:
+                    batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+                if not batch:
+                    break
+                count = self._write(batch, retry=False)
+                if not count:
+                    break
+                written += count
+        return written
+
+    def _write(self, batch: List[Dict[str, Any]], retry: bool) -> int:
+        """
+        Escribe un lote; si falla se guarda para reintentarlo en la siguiente escritura
+        En el reintento se parte por la mitad hasta aislar las filas que fallan, y solo
+        esas se descartan
+        """
+        try:
+            self.writer(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats['failed_batches'] += 1
+                self._stats['last_error'] = str(e)
+                if retry and len(batch) == 1:
+                    self._stats['dropped'] += 1
+            logger.error(f"Error escribiendo {len(batch)} interacciones del chatbot: {e}")
+            if not retry:
+                self._retry = batch
+            elif len(batch) > 1:
+                middle = len(batch) // 2
+                return self._write(batch[:middle], retry=True) + self._write(batch[middle:], retry=True)
+            return 0
+        with self._lock:
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+        return len(batch)
+
+    def start(self, app) -> None:
+        """
+        Arranca el hilo de escritura
+        Args:
+            app: Aplicación Flask (para el contexto de base de datos)
+        """
+        self._app = app
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='interaction-log-flusher', daemon=True)
+        self._thread.start()
+        if not self._fork_hook:
+            atexit.register(self.shutdown)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook = True
+
+    def _restart_after_fork(self) -> None:
+        # Las filas heredadas del padre las escribe el padre
+        self._thread = None
+        self._rows = deque()
+        self._retry = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if self._app is not None:
+            self.start(self._app)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                self._stats['last_error'] = str(e)
+                logger.error(f"Error en el hilo de interacciones del chatbot: {e}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo y escribe lo pendiente"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+                # Último intento del lote fallido antes de salir
+                self.flush()
+        except Exception as e:
+            logger.error(f"Error escribiendo interacciones pendientes al apagar: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene métricas del buffer
+        Returns:
+            dict: Encoladas, escritas, lotes, lotes fallidos, desbordadas y descartadas
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._rows) + len(self._retry)
+        stats.update({
+            'running': self.running,
+            'max_size': self.max_size,
+            'batch_size': self.batch_size,
+            'interval_seconds': self.interval
+        })
+        return stats
+
+
+def create_interaction_log() -> InteractionLogBuffer:
+    """Crea el buffer del proceso con la configuración CHATBOT_INTERACTION_LOG_*"""
+    from config.default import DefaultConfig
+
+    return InteractionLogBuffer(
+        max_size=DefaultConfig.CHATBOT_INTERACTION_LOG_MAX_SIZE,
+        batch_size=DefaultConfig.CHATBOT_INTERACTION_LOG_BATCH,
+        interval=DefaultConfig.CHATBOT_INTERACTION_LOG_FLUSH_SECONDS
+    )
+
+
+interaction_log = create_interaction_log()
+
+
+def start_interaction_log(app) -> Optional[InteractionLogBuffer]:
+    """
+    Arranca la escritura por lotes de las interacciones del chatbot
+    Args:
+        app: Aplicación Flask
+    Returns:
+        InteractionLogBuffer o None si está desactivada o se está en TESTING
+    """
+    if not app.config.get('CHATBOT_INTERACTION_LOG_ASYNC', True) or app.config.get('TESTING'):
+        return None
+    interaction_log.start(app)
+    return interaction_log
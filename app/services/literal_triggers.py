@@ -0,0 +1,165 @@
+# app/services/literal_triggers.py
+
+"""
+Atajo O(1) para triggers literales ("hola", "menu", "1") delante del motor RiveScript
+Al compilar cada flujo se construye, por tema, un diccionario mensaje normalizado -> trigger
+con los triggers sin comodines, opcionales, condiciones ni redirecciones (las alternativas
+"(1|uno)" se expanden a cada texto), siempre que ningún trigger que el motor prueba antes
+acepte el mismo texto. El mensaje se normaliza con el mismo format_message() de RiveScript y
+la respuesta se procesa con sus process_tags(), de modo que el resultado, el tema, <set>/<get>,
+__lastmatch__ y el historial quedan igual que si hubiera respondido el motor. Los temas donde el motor podría
+elegir otro trigger antes (bloque BEGIN, %Previous, includes/inherits) no se indexan
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.logger import WhatsAppLogger
+
+try:
+    from rivescript.exceptions import RiveScriptError
+    from rivescript.regexp import RE
+    from rivescript.utils import is_atomic, random_choice
+except ImportError:
+    RiveScriptError = Exception
+
+logger = WhatsAppLogger.get_logger('literal_triggers')
+
+# Respuesta candidata: (texto original, texto ya procesado si no depende del usuario, o None)
+Candidate = Tuple[str, Optional[str]]
+# {tema: {mensaje normalizado: (trigger, stars, candidatas ya repetidas por {weight})}}
+LiteralTable = Dict[str, Dict[str, Tuple[str, Tuple[str, ...], List[Candidate]]]]
+
+_ALTERNATION = re.compile(r'\(([^()]*)\)')
+# Caracteres que el motor convierte en comodines, opcionales o etiquetas
+_NON_LITERAL = set('[*#_<{@')
+# Etiquetas de respuesta cuyo resultado depende del usuario, del mensaje o del estado del bot
+_DYNAMIC_TAGS = {
+    'star', 'botstar', 'input', 'reply', 'id', 'bot', 'env', 'get', 'set', 'add', 'sub', 'mult',
+    'div', 'call', 'person', 'formal', 'sentence', 'uppercase', 'lowercase', '@'
+}
+_TAG_NAME = re.compile(r'<\s*/?\s*([a-zA-Z@]*)')
+
+
+def _expand(pattern: str, limit: int) -> List[str]:
+    """Textos exactos que acepta un trigger de palabras y alternativas "(a|b)" ([] si no es literal)"""
+    if _NON_LITERAL & set(pattern):
+        return []
+    texts = ['']
+    for index, part in enumerate(_ALTERNATION.split(pattern)):
+        options = part.split('|') if index % 2 else [part]
+        texts = [text + option for text in texts for option in options]
+        if len(texts) > limit:
+            return []
+    return texts
+
+
+def _is_static(text: str) -> bool:
+    """Si process_tags() devuelve siempre lo mismo para esta respuesta (p. ej. solo <br>)"""
+    if '{' in text or '(@' in text:
+        return False
+    return not any(name.lower() in _DYNAMIC_TAGS for name in _TAG_NAME.findall(text))
+
+
+def _candidates(rs: Any, replies: List[str]) -> List[Candidate]:
+    """Respuestas repetidas según su {weight}, como el motor, con las estáticas ya procesadas"""
+    rendered = {text: rs._brain.process_tags('', '', text) if _is_static(text) else None for text in replies}
+    bucket = []
+    for text in replies:
+        weight = re.search(RE.weight, text)
+        bucket.extend([(text, rendered[text])] * max(1, int(weight.group(1)) if weight else 1))
+    return bucket
+
+
+def build_literal_table(rs: Any, max_expansion: int = 256) -> LiteralTable:
+    """
+    Construye la tabla de triggers literales de un RiveScript ya ordenado
+    Args:
+        rs: Instancia tras sort_replies()
+        max_expansion: Máximo de textos por trigger con alternativas
+    Returns:
+        dict: Tabla por tema; vacía si el flujo tiene bloque BEGIN
+    """
+    if '__begin__' in rs._topics:
+        # BEGIN reescribe todas las respuestas: siempre por el motor
+        return {}
+
+    table: LiteralTable = {}
+    for topic, sorted_triggers in rs._sorted.get('topics', {}).items():
+        if rs._includes.get(topic) or rs._lineage.get(topic) or rs._sorted['thats'].get(topic):
+            continue
+
+        literals, earlier, compiled = {}, [], []
+        for pattern, data in sorted_triggers:
+            texts = _expand(pattern, max_expansion)
+            if not texts:
+                if '<' in pattern:
+                    # <get>, <input>, <bot>...: puede cambiar en cada mensaje, el resto solo por el motor
+                    break
+                earlier.append(pattern)
+                continue
+
+            # Las regex de los triggers anteriores solo se compilan si hay literales detrás
+            compiled.extend(rs._brain.reply_regexp('', other) for other in earlier[len(compiled):])
+            regexp = rs._brain.reply_regexp('', pattern)
+            simple = not (data.get('condition') or data.get('redirect') or data.get('previous')) and data.get('reply')
+            for text in texts:
+                match = regexp.match(text)
+                # Solo si ningún trigger que el motor prueba antes acepta este mismo texto
+                if not match or text in literals or any(other.match(text) for other in compiled):
+                    continue
+                # Un trigger con condiciones o redirección reserva el texto para el motor
+                literals[text] = (pattern, match.groups(), _candidates(rs, data['reply'])) if simple else None
+        literals = {text: entry for text, entry in literals.items() if entry is not None}
+        if literals:
+            table[topic] = literals
+    return table
+
+
+def literal_reply(rs: Any, table: LiteralTable, user: str, message: str) -> Optional[str]:
+    """
+    Responde sin pasar por el motor si el mensaje es exactamente un trigger literal
+    El llamador debe tener el lock de la instancia (RiveScript guarda el usuario actual)
+    Args:
+        rs: Instancia RiveScript del flujo
+        table: Tabla de build_literal_table()
+        user: Identificador del usuario
+        message: Mensaje sin normalizar
+    Returns:
+        str: Respuesta, o None si hay que consultar el motor
+    """
+    if not table:
+        return None
+
+    brain = rs._brain
+    msg = brain.format_message(message)
+    topic = rs.get_uservar(user, 'topic')
+    if topic in (None, 'undefined') or topic not in rs._topics:
+        topic = 'random'
+
+    literals = table.get(topic)
+    entry = literals.get(msg) if literals else None
+    if entry is None:
+        return None
+    pattern, stars, bucket = entry
+
+    # A partir de aquí, lo mismo que Brain.reply() y Brain._getreply() tras el match
+    rs.set_uservar(user, 'topic', topic)
+    history = rs.get_uservar(user, '__history__')
+    if type(history) is not dict or 'input' not in history or 'reply' not in history:
+        history = brain.default_history()
+    rs.set_uservar(user, '__lastmatch__', pattern)
+
+    text, reply = random_choice(bucket)
+    if reply is None:
+        brain._current_user = user
+        try:
+            reply = brain.process_tags(user, msg, text, list(stars), [], 0)
+        except RiveScriptError as e:
+            reply = e.error_message
+        finally:
+            brain._current_user = None
+
+    history['input'] = [msg] + history['input'][:8]
+    history['reply'] = [reply] + history['reply'][:8]
+    rs.set_uservar(user, '__history__', history)
+    return reply
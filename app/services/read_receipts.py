@@ -0,0 +1,175 @@
+"""
+Cola diferida de confirmaciones de lectura para WhatsApp
+Agrupa las confirmaciones por conversación y envía solo el último message_id
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ReadReceiptQueue:
+    """
+    Cola en segundo plano para confirmaciones de lectura (read receipts)
+
+    Marcar como leído el mensaje más reciente de una conversación cubre
+    implícitamente los anteriores, por lo que dentro de la ventana de
+    agrupación solo se envía a Graph API el último message_id por conversación.
+    """
+
+    def __init__(self, sender: Callable[[str, str], Any], window_ms: int = 1500):
+        """
+        Inicializa la cola de confirmaciones
+        Args:
+            sender: Función que envía la confirmación (message_id, phone_number_id)
+            window_ms: Ventana de agrupación por conversación en milisegundos
+        """
+        self.sender = sender
+        self.window_seconds = max(0, window_ms) / 1000.0
+        self.logger = logging.getLogger(__name__)
+
+        # Pendientes por conversación: (phone_number_id, phone_number) -> datos
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stopped = False
+
+        self._stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'sent': 0,
+            'failed': 0
+        }
+
+        atexit.register(self.shutdown)
+
+    def enqueue(self, message_id: str, phone_number_id: str, phone_number: str,
+                timestamp: Optional[int] = None) -> None:
+        """
+        Encola una confirmación de lectura para envío diferido
+        Args:
+            message_id: ID del mensaje de WhatsApp a marcar como leído
+            phone_number_id: ID del número de WhatsApp Business
+            phone_number: Número del remitente (identifica la conversación)
+            timestamp: Timestamp del mensaje según el webhook (opcional)
+        """
+        if not message_id or not phone_number_id:
+            return
+
+        key = (phone_number_id, phone_number)
+        order = timestamp if timestamp is not None else time.time()
+
+        with self._lock:
+            self._stats['enqueued'] += 1
+            pending = self._pending.get(key)
+
+            if pending:
+                # Ya hay una confirmación pendiente: conservar solo la más reciente
+                self._stats['coalesced'] += 1
+                if order >= pending['order']:
+                    pending['message_id'] = message_id
+                    pending['order'] = order
+            else:
+                # El plazo se fija con el primer mensaje para acotar la latencia
+                self._pending[key] = {
+                    'message_id': message_id,
+                    'order': order,
+                    'due_at': time.monotonic() + self.window_seconds
+                }
+
+        self._ensure_worker()
+        self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Envía inmediatamente todas las confirmaciones pendientes
+        Returns:
+            int: Número de confirmaciones enviadas
+        """
+        with self._lock:
+            due = list(self._pending.items())
+            self._pending.clear()
+
+        return self._send_batch(due)
+
+    def shutdown(self) -> None:
+        """Detiene el worker y envía lo que quede pendiente"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene métricas de la cola
+        Returns:
+            dict: Contadores de encolados, agrupados, enviados y fallidos
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['window_ms'] = int(self.window_seconds * 1000)
+        return stats
+
+    def _ensure_worker(self) -> None:
+        """Arranca el hilo de envío si no existe (o tras un fork del proceso)"""
+        if self._stopped:
+            return
+
+        pid = os.getpid()
+        if self._thread and self._thread.is_alive() and self._thread_pid == pid:
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._thread_pid == pid:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='read-receipt-queue', daemon=True
+            )
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Bucle del worker: envía las confirmaciones cuyo plazo ha vencido"""
+        while not self._stopped:
+            now = time.monotonic()
+
+            with self._lock:
+                due = [(key, data) for key, data in self._pending.items() if data['due_at'] <= now]
+                for key, _ in due:
+                    del self._pending[key]
+                next_due = min((data['due_at'] for data in self._pending.values()), default=None)
+
+            if due:
+                self._send_batch(due)
+
+            # Dormir hasta el próximo vencimiento o hasta que llegue un nuevo mensaje
+            timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _send_batch(self, entries) -> int:
+        """
+        Envía un lote de confirmaciones a WhatsApp API
+        Args:
+            entries: Lista de tuplas ((phone_number_id, phone_number), datos)
+        Returns:
+            int: Número de confirmaciones enviadas con éxito
+        """
+        sent = 0
+        for (phone_number_id, _), data in entries:
+            try:
+                self.sender(data['message_id'], phone_number_id)
+                sent += 1
+            except Exception as e:
+                self.logger.warning(f"No se pudo marcar mensaje como leído {data['message_id']}: {e}")
+                with self._lock:
+                    self._stats['failed'] += 1
+
+        if sent:
+            with self._lock:
+                self._stats['sent'] += sent
+        return sent
@@ -0,0 +1,405 @@
+# app/services/rivescript_brain.py
+
+"""
+Cerebro RiveScript compartido por proceso
+Cada flujo activo se compila en su propio RiveScript (FlowBrain); el conjunto versionado lo
+comparten RiveScriptService, ChatbotService, WebhookProcessor y el simulador. Un mensaje se
+prueba primero en el flujo del usuario (ConversationContext.flow_id) o en el flujo por
+defecto, y después en el resto por prioridad, así cada intento solo recorre los triggers de
+un flujo y dos flujos con el mismo trigger no chocan. La recarga compila un cerebro nuevo
+aparte y lo publica con una sola asignación
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.brain_cache import cache_key, load_brain, prune_cache, save_brain, warm_patterns
+from app.services.literal_triggers import build_literal_table, literal_reply
+from app.services.rivescript_sessions import rivescript_sessions
+from app.utils.logger import WhatsAppLogger
+
+try:
+    import rivescript
+    RIVESCRIPT_AVAILABLE = True
+except ImportError:
+    RIVESCRIPT_AVAILABLE = False
+
+logger = WhatsAppLogger.get_logger('rivescript_brain')
+
+# Respuesta con match: texto, FlowBrain que respondió y variables del usuario tras responder
+BrainReply = namedtuple('BrainReply', ['reply', 'flow_brain', 'user_vars'])
+
+
+def is_valid_reply(reply: Optional[str], message: str) -> bool:
+    """
+    Indica si una respuesta de RiveScript es un match real
+    Args:
+        reply: Respuesta de rs.reply()
+        message: Mensaje del usuario
+    Returns:
+        bool: False para vacías, errores ("[ERR: No Reply Matched]", "ERR: ...") y ecos
+    """
+    if not reply:
+        return False
+    return not reply.startswith(('ERR:', '[ERR:')) and reply != message
+
+
+class FlowBrain:
+    """RiveScript compilado de un solo flujo"""
+
+    def __init__(self, flow: Any, rs: Any, compile_ms: float, source: str = 'compiled',
+                 cache_key: Optional[str] = None):
+        """
+        Inicializa el cerebro del flujo
+        Args:
+            flow: Flujo con id, name y priority
+            rs: Instancia RiveScript ya ordenada
+            compile_ms: Tiempo de carga y compilación en milisegundos
+            source: 'compiled' o 'cache' (cargado de la caché en disco)
+            cache_key: Clave del contenido del flujo en la caché
+        """
+        self.flow_id = flow.id
+        self.key = str(flow.id)
+        self.name = flow.name
+        self.priority = flow.priority
+        self.is_default = bool(getattr(flow, 'is_default', False))
+        self.rs = rs
+        self.compile_ms = compile_ms
+        self.source = source
+        self.cache_key = cache_key
+        self.trigger_count = sum(len(triggers) for triggers in rs._topics.values())
+        # Triggers literales que se resuelven sin recorrer el motor (literal_triggers)
+        self.literals = build_literal_table(rs)
+        self.literal_count = sum(len(literals) for literals in self.literals.values())
+        # RiveScript guarda el usuario actual en la instancia: una respuesta a la vez
+        self.lock = threading.RLock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.key,
+            'name': self.name,
+            'priority': self.priority,
+            'is_default': self.is_default,
+            'trigger_count': self.trigger_count,
+            'literal_count': self.literal_count,
+            'compile_ms': round(self.compile_ms, 3),
+            'source': self.source
+        }
+
+
+class FlowLatencyStats:
+    """Latencia de respuesta por flujo (acumulada en el proceso)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, flow_brain: FlowBrain, elapsed_ms: float, matched: bool, literal: bool = False) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(flow_brain.key, {
+                'name': flow_brain.name, 'calls': 0, 'matches': 0, 'literal_hits': 0,
+                'total_ms': 0.0, 'max_ms': 0.0
+            })
+            stats['calls'] += 1
+            stats['matches'] += int(matched)
+            stats['literal_hits'] += int(literal)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                key: {
+                    'name': stats['name'],
+                    'calls': stats['calls'],
+                    'matches': stats['matches'],
+                    'literal_hits': stats['literal_hits'],
+                    'avg_ms': round(stats['total_ms'] / stats['calls'], 3),
+                    'max_ms': round(stats['max_ms'], 3)
+                }
+                for key, stats in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+flow_latency = FlowLatencyStats()
+
+
+class CompiledBrain:
+    """Cerebros de los flujos activos, ordenados por prioridad, y su metadata"""
+
+    def __init__(self, flow_brains: List[FlowBrain], version: int, compile_ms: float,
+                 errors: List[Dict[str, str]], revision: Optional[int] = None, literal_fast_path: bool = True):
+        """
+        Inicializa el cerebro
+        Args:
+            flow_brains: Cerebros por flujo en orden de prioridad
+            version: Versión monótona dentro del proceso
+            compile_ms: Tiempo total de carga y compilación en milisegundos
+            errors: Flujos que no se pudieron cargar
+            revision: Revisión global de flujos compilada (None si se desconoce)
+            literal_fast_path: Resolver los triggers literales sin pasar por el motor
+        """
+        self.flow_brains = flow_brains
+        self.literal_fast_path = literal_fast_path
+        self.by_id = {flow_brain.key: flow_brain for flow_brain in flow_brains}
+        self.default = next((flow_brain for flow_brain in flow_brains if flow_brain.is_default), None)
+        self.version = version
+        self.revision = revision
+        self.compile_ms = compile_ms
+        self.errors = errors
+        self.compiled_at = datetime.utcnow()
+        self.trigger_count = sum(flow_brain.trigger_count for flow_brain in flow_brains)
+        sources = {flow_brain.source for flow_brain in flow_brains}
+        self.source = sources.pop() if len(sources) == 1 else ('mixed' if sources else 'compiled')
+
+    @property
+    def flows(self) -> List[Dict[str, Any]]:
+        """Flujos cargados (id, name, priority, triggers y origen)"""
+        return [flow_brain.to_dict() for flow_brain in self.flow_brains]
+
+    def route(self, flow_id: Any = None) -> List[FlowBrain]:
+        """
+        Orden en que se prueban los flujos para un usuario
+        Args:
+            flow_id: Flujo del contexto del usuario (opcional)
+        Returns:
+            list: Flujo del usuario o por defecto primero, después el resto por prioridad
+        """
+        first = self.by_id.get(str(flow_id)) if flow_id is not None else None
+        if first is None:
+            first = self.default
+        if first is None:
+            return list(self.flow_brains)
+        return [first] + [flow_brain for flow_brain in self.flow_brains if flow_brain is not first]
+
+    def reply(self, user: str, message: str, flow_id: Any = None,
+              user_vars: Optional[Dict[str, Any]] = None) -> Optional[BrainReply]:
+        """
+        Responde con el primer flujo de la ruta del usuario que tenga match
+        Args:
+            user: Identificador del usuario (teléfono)
+            message: Mensaje entrante
+            flow_id: Flujo del contexto del usuario (opcional)
+            user_vars: Variables del usuario a fijar antes de responder
+        Returns:
+            BrainReply o None si ningún flujo tiene match
+        """
+        for flow_brain in self.route(flow_id):
+            start = time.perf_counter()
+            with flow_brain.lock:
+                rs = flow_brain.rs
+                for key, value in (user_vars or {}).items():
+                    rs.set_uservar(user, key, value)
+                # Las sesiones se comparten entre flujos: un intento sin match no deja rastro
+                # (historial, __lastmatch__ ni el tema, que el motor pasa a 'random' si no lo tiene)
+                rs.freeze_uservars(user)
+                reply = literal_reply(rs, flow_brain.literals, user, message) if self.literal_fast_path else None
+                literal = reply is not None
+                if not literal:
+                    reply = rs.reply(user, message)
+                matched = is_valid_reply(reply, message)
+                rs.thaw_uservars(user, 'discard' if matched else 'thaw')
+                updated_vars = rs.get_uservars(user) if matched else None
+            flow_latency.record(flow_brain, (time.perf_counter() - start) * 1000, matched, literal)
+            if matched:
+                return BrainReply(reply, flow_brain, updated_vars)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Metadata del cerebro para /v1/flows/info y health checks"""
+        return {
+            'version': self.version,
+            'revision': self.revision,
+            'compiled_at': self.compiled_at.isoformat(),
+            'compile_ms': round(self.compile_ms, 3),
+            'source': self.source,
+            'default_flow_id': self.default.key if self.default else None,
+            'flow_count': len(self.flow_brains),
+            'trigger_count': self.trigger_count,
+            'literal_fast_path': self.literal_fast_path,
+            'flows': self.flows,
+            'errors': self.errors
+        }
+
+
+def compile_flow(flow: Any, cache_dir: Optional[str] = None, warm: bool = True,
+                 session_manager: Any = None) -> FlowBrain:
+    """
+    Compila un flujo en su propio RiveScript
+    Con cache_dir, reutiliza el flujo ya compilado para el mismo contenido (brain_cache)
+    Args:
+        flow: Flujo con id, name, priority y rivescript_content
+        cache_dir: Directorio de la caché en disco (opcional)
+        warm: Compilar en segundo plano los patrones cargados de la caché
+        session_manager: Sesiones de usuario compartidas (None: en memoria de la instancia)
+    Returns:
+        FlowBrain: Cerebro del flujo listo para responder
+    """
+    start = time.perf_counter()
+    key = None
+    if cache_dir:
+        key = cache_key([flow])
+        cached = load_brain(cache_dir, key, warm=warm, session_manager=session_manager)
+        if cached:
+            return FlowBrain(flow, cached[0], (time.perf_counter() - start) * 1000, 'cache', key)
+
+    rs = rivescript.RiveScript(utf8=True, debug=False, session_manager=session_manager)
+    rs.stream(flow.rivescript_content)
+    rs.sort_replies()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    if cache_dir:
+        save_brain(cache_dir, key, rs, [{'id': str(flow.id), 'name': flow.name}], [], keep=None)
+    return FlowBrain(flow, rs, compile_ms, cache_key=key)
+
+
+def compile_brain(flows: List[Any], version: int, revision: Optional[int] = None,
+                  cache_dir: Optional[str] = None, literal_fast_path: bool = True,
+                  session_manager: Any = None) -> CompiledBrain:
+    """
+    Compila un cerebro nuevo con los flujos dados, sin tocar el publicado
+    Cada flujo se compila (o se carga de la caché) por separado: editar uno solo recompila ese
+    Args:
+        flows: Flujos con id, name, priority y rivescript_content
+        version: Versión a asignar
+        revision: Revisión global de flujos de la que proceden
+        cache_dir: Directorio de la caché en disco (opcional)
+        literal_fast_path: Resolver los triggers literales sin pasar por el motor
+        session_manager: Sesiones de usuario compartidas por todos los flujos (rivescript_sessions)
+    Returns:
+        CompiledBrain: Cerebro listo para responder
+    """
+    start = time.perf_counter()
+    flow_brains, errors = [], []
+    # Menor número = mayor prioridad; sort estable respeta el orden de llegada en empates
+    for flow in sorted(flows, key=lambda f: f.priority if f.priority is not None else 0):
+        if not flow.rivescript_content:
+            continue
+        try:
+            flow_brains.append(compile_flow(flow, cache_dir, warm=False, session_manager=session_manager))
+        except Exception as e:
+            logger.error(f"Error cargando flujo '{flow.name}': {e}")
+            errors.append({'id': str(flow.id), 'name': flow.name, 'error': str(e)})
+
+    if cache_dir and flow_brains:
+        # Un solo hilo calienta los patrones de todos los flujos cargados de la caché
+        warm_patterns([flow_brain.rs for flow_brain in flow_brains if flow_brain.source == 'cache'])
+        # Un fichero por flujo: conservar al menos los de los flujos vigentes
+        prune_cache(cache_dir, keep=max(5, 2 * len(flow_brains)))
+    return CompiledBrain(flow_brains, version, (time.perf_counter() - start) * 1000, errors, revision,
+                         literal_fast_path)
+
+
+class BrainRegistry:
+    """Publica el cerebro vigente del proceso y serializa las recompilaciones"""
+
+    def __init__(self, cache_dir: Optional[str] = None, literal_fast_path: bool = True,
+                 session_manager: Any = None):
+        """
+        Inicializa el registro
+        Args:
+            cache_dir: Directorio de la caché de cerebros compilados (None la desactiva)
+            literal_fast_path: Resolver los triggers literales sin pasar por el motor
+            session_manager: Sesiones de usuario compartidas, que sobreviven a las recargas
+        """
+        self.cache_dir = cache_dir
+        self.literal_fast_path = literal_fast_path
+        self.session_manager = session_manager
+        self._brain: Optional[CompiledBrain] = None
+        self._version = 0
+        self._compile_lock = threading.Lock()
+
+    def _reset_after_fork(self) -> None:
+        # Un fork durante una compilación dejaría el lock tomado para siempre en el hijo
+        self._compile_lock = threading.Lock()
+
+    def current(self) -> Optional[CompiledBrain]:
+        """Cerebro publicado (None si aún no se ha compilado)"""
+        return self._brain
+
+    def get(self) -> Optional[CompiledBrain]:
+        """
+        Obtiene el cerebro vigente, compilándolo la primera vez (requiere contexto de aplicación)
+        Returns:
+            CompiledBrain o None si RiveScript no está disponible o la compilación falló
+        """
+        brain = self._brain
+        if brain is not None:
+            return brain
+        with self._compile_lock:
+            if self._brain is None:
+                self._publish_locked()
+            return self._brain
+
+    def reload(self, flows: Optional[List[Any]] = None, revision: Optional[int] = None) -> Optional[CompiledBrain]:
+        """
+        Compila un cerebro nuevo y lo publica de forma atómica
+        Si la compilación falla se mantiene el cerebro anterior
+        Args:
+            flows: Flujos a compilar (por defecto los activos de la base de datos)
+            revision: Revisión global de esos flujos (por defecto se lee antes de cargarlos)
+        Returns:
+            CompiledBrain publicado, o None si no hay ninguno
+        """
+        with self._compile_lock:
+            self._publish_locked(flows, revision)
+            return self._brain
+
+    def _publish_locked(self, flows: Optional[List[Any]] = None, revision: Optional[int] = None) -> None:
+        if not RIVESCRIPT_AVAILABLE:
+            return
+        try:
+            if flows is None:
+                from app.repositories.flow_repository import FlowRepository
+                repo = FlowRepository()
+                if revision is None:
+                    # Leer la revisión antes que los flujos: un cambio concurrente provoca otra recarga
+                    revision = repo.get_revision()[0]
+                flows = repo.get_active_flows()
+            brain = compile_brain(flows, self._version + 1, revision, self.cache_dir, self.literal_fast_path,
+                                  self.session_manager)
+        except Exception as e:
+            logger.error(f"Error compilando cerebro RiveScript: {e}")
+            return
+
+        self._version = brain.version
+        self._brain = brain
+        logger.info(
+            f"Cerebro RiveScript v{brain.version} (revisión {brain.revision}) publicado: {len(brain.flows)} flujos, "
+            f"{brain.trigger_count} triggers en {brain.compile_ms:.1f} ms ({brain.source})"
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """Estado del cerebro publicado"""
+        brain = self._brain
+        return {
+            'rivescript_available': RIVESCRIPT_AVAILABLE,
+            'loaded': brain is not None,
+            **(brain.to_dict() if brain else {'version': self._version}),
+            'flow_latency': flow_latency.snapshot(),
+            'sessions': self.session_manager.status() if self.session_manager is not None else None
+        }
+
+
+def _default_cache_dir() -> Optional[str]:
+    from config.default import DefaultConfig
+    return DefaultConfig.BRAIN_CACHE_DIR if DefaultConfig.BRAIN_CACHE_ENABLED else None
+
+
+def _default_literal_fast_path() -> bool:
+    from config.default import DefaultConfig
+    return DefaultConfig.RIVESCRIPT_LITERAL_FAST_PATH
+
+
+brain_registry = BrainRegistry(cache_dir=_default_cache_dir(), literal_fast_path=_default_literal_fast_path(),
+                               session_manager=rivescript_sessions)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=brain_registry._reset_after_fork)
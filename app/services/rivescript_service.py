@@ -8,6 +8,11 @@ from datetime import datetime
 
 from app.repositories.flow_repository import FlowRepository
 from app.repositories.conversation_repository import ConversationRepository
+from app.services.conversation_turn import ConversationTurn
+from app.services.flow_reload import get_flow_reload_watcher, request_flow_reload
+from app.services.flow_usage import flow_usage
+from app.services.rivescript_brain import CompiledBrain, brain_registry, is_valid_reply
+from app.services.rivescript_sessions import rivescript_sessions
 from app.utils.logger import WhatsAppLogger
 
 # Importar RiveScript solo si está disponible
@@ -21,7 +26,6 @@ class RiveScriptService:
     """Servicio para manejo de flujos RiveScript"""
     
     def __init__(self):
-        self.rs = None
         self.flow_repo = None
         self.context_repo = None
         self.logger = WhatsAppLogger.get_logger('rivescript_service')
@@ -32,6 +36,11 @@ class RiveScriptService:
         
         # No inicializar automáticamente, se hace cuando se necesite con contexto
     
+    @property
+    def brain(self) -> Optional[CompiledBrain]:
+        """Cerebro compartido del proceso (se compila la primera vez que se usa)"""
+        return brain_registry.get()
+    
     def _ensure_initialized(self) -> bool:
         """
         Asegura que el servicio esté inicializado con contexto de aplicación
@@ -50,9 +59,9 @@ class RiveScriptService:
             self.flow_repo = FlowRepository()
             self.context_repo = ConversationRepository()
             
-            # Cargar flujos activos si RiveScript está disponible
+            # El cerebro compartido se compila una sola vez por proceso
             if RIVESCRIPT_AVAILABLE:
-                self._load_active_flows()
+                brain_registry.get()
                 
             self._initialized = True
             self.logger.info("RiveScript service inicializado correctamente con contexto de aplicación")
@@ -62,50 +71,28 @@ class RiveScriptService:
             self.logger.error(f"Error inicializando RiveScript service: {e}")
             return False
     
-    def _load_active_flows(self) -> None:
-        """Carga todos los flujos activos en RiveScript"""
+    def _load_active_flows(self) -> Optional[CompiledBrain]:
+        """
+        Recarga los flujos activos en todos los procesos (sube la revisión global)
+        Con el vigilante de recargas activo no bloquea: devuelve el cerebro vigente
+        """
         if not RIVESCRIPT_AVAILABLE:
-            return
-            
-        try:
-            self.rs = rivescript.RiveScript(utf8=True, debug=False)
-            
-            # Obtener flujos activos (debe estar dentro del contexto de aplicación)
-            if not self.flow_repo:
-                self.logger.error("FlowRepository no inicializado")
-                return
-                
-            active_flows = self.flow_repo.get_active_flows()
-            
-            if not active_flows:
-                self.logger.warning("No hay flujos activos para cargar")
-                return
-            
-            # Cargar cada flujo
-            for flow in active_flows:
-                try:
-                    # Cargar contenido directamente en RiveScript (no archivo temporal)
-                    self.rs.stream(flow.rivescript_content)
-                    self.logger.info(f"Flujo '{flow.name}' cargado exitosamente")
-                    
-                except Exception as flow_error:
-                    self.logger.error(f"Error cargando flujo '{flow.name}': {flow_error}")
-            
-            # Compilar el cerebro
-            self.rs.sort_replies()
-            self.logger.info(f"RiveScript inicializado con {len(active_flows)} flujos")
-            
-        except Exception as e:
-            self.logger.error(f"Error inicializando RiveScript: {e}")
-            self.rs = None
+            return None
+        
+        brain = request_flow_reload()
+        if brain and not brain.flows:
+            self.logger.warning("No hay flujos activos para cargar")
+        return brain
     
-    def get_response(self, phone_number: str, message: str) -> Optional[Dict[str, Any]]:
+    def get_response(self, phone_number: str, message: str,
+                     turn: Optional[ConversationTurn] = None) -> Optional[Dict[str, Any]]:
         """
         Obtiene respuesta del flujo RiveScript para un mensaje
         
         Args:
             phone_number: Número del usuario
             message: Mensaje entrante
+            turn: Turno abierto por ChatbotService con el contexto ya cargado (opcional)
             
         Returns:
             dict: Respuesta del flujo o None si no hay match
@@ -114,50 +101,58 @@ class RiveScriptService:
         if not self._ensure_initialized():
             return self._get_simulation_response(message)
             
-        if not RIVESCRIPT_AVAILABLE or not self.rs:
+        brain = self.brain
+        if not RIVESCRIPT_AVAILABLE or not brain:
             return self._get_simulation_response(message)
         
         try:
-            # Obtener/crear contexto del usuario
-            context = self.context_repo.get_or_create_context(phone_number)
-            
-            # Establecer variables de usuario en RiveScript
-            if context.context_data:
-                for key, value in context.context_data.items():
-                    if isinstance(value, (str, int, float)):
-                        self.rs.set_uservar(phone_number, key, str(value))
-            
-            # Obtener respuesta
-            reply = self.rs.reply(phone_number, message)
-            
-            # Verificar si es una respuesta válida
-            if reply and not reply.startswith("ERR:") and reply != message:
-                
-                # Obtener variables actualizadas del usuario
-                updated_vars = self.rs.get_uservars(phone_number)
-                
-                # Actualizar contexto si hay cambios
-                if updated_vars != context.context_data:
-                    self.context_repo.update_context_data(phone_number, updated_vars)
-                
-                # Incrementar uso del flujo si hay uno activo
-                if context.flow_id:
-                    self.flow_repo.increment_usage(context.flow_id)
-                
-                return {
-                    'response': reply,
-                    'type': 'flow',
-                    'flow_id': context.flow_id,
-                    'context_updated': updated_vars != context.context_data,
-                    'confidence_score': 0.9  # Alta confianza para matches de flujo
-                }
-            
-            return None
+            if turn is None:
+                # Llamada suelta: el turno solo cubre esta respuesta
+                with ConversationTurn(self.context_repo, phone_number, message, 'rivescript_reply') as turn:
+                    return self._reply_turn(brain, turn)
+            return self._reply_turn(brain, turn)
             
         except Exception as e:
             self.logger.error(f"Error obteniendo respuesta RiveScript para {phone_number}: {e}")
             return None
     
+    def _reply_turn(self, brain: CompiledBrain, turn: ConversationTurn) -> Optional[Dict[str, Any]]:
+        """
+        Responde el mensaje del turno con el contexto ya cargado
+        
+        Args:
+            brain: Cerebro compartido
+            turn: Turno con el contexto del usuario
+            
+        Returns:
+            dict: Respuesta del flujo o None si no hay match
+        """
+        # Las variables del usuario viven en el gestor de sesiones compartido
+        # (rivescript_sessions), que las carga y las guarda por lotes (con Redis,
+        # releídas y escritas en cada respuesta)
+        with rivescript_sessions.turn(turn.phone_number):
+            result = brain.reply(turn.phone_number, turn.message, flow_id=turn.flow_id)
+            context_updated = rivescript_sessions.is_dirty(turn.phone_number)
+        if result is None:
+            return None
+        
+        reply, flow_brain = result.reply, result.flow_brain
+        
+        # El usuario queda asignado al flujo que respondió
+        turn.assign_flow(flow_brain.flow_id)
+        
+        # Sumar el uso del flujo que respondió (se escribe por lotes)
+        flow_usage.record(flow_brain.flow_id)
+        
+        return {
+            'response': reply,
+            'type': 'flow',
+            'flow_id': flow_brain.flow_id,
+            'flow_name': flow_brain.name,
+            'context_updated': context_updated,
+            'confidence_score': 0.9  # Alta confianza para matches de flujo
+        }
+    
     def _get_simulation_response(self, message: str) -> Optional[Dict[str, Any]]:
         """Respuesta simulada cuando RiveScript no está disponible"""
         message_lower = message.lower()
@@ -206,8 +201,10 @@ class RiveScriptService:
             return False
             
         try:
-            self._load_active_flows()
-            self.logger.info("Flujos recargados exitosamente")
+            brain = self._load_active_flows()
+            if brain is None:
+                return False
+            self.logger.info(f"Flujos recargados exitosamente (cerebro v{brain.version})")
             return True
         except Exception as e:
             self.logger.error(f"Error recargando flujos: {e}")
@@ -253,7 +250,7 @@ class RiveScriptService:
                     'success': True,
                     'response': reply,
                     'user_vars': temp_rs.get_uservars(test_user),
-                    'valid_response': not reply.startswith("ERR:") and reply != test_message,
+                    'valid_response': is_valid_reply(reply, test_message),
                     'test_message': test_message
                 }
                 
@@ -284,10 +281,14 @@ class RiveScriptService:
                 }
                 
             active_flows = self.flow_repo.get_active_flows()
+            watcher = get_flow_reload_watcher()
             
             return {
                 'rivescript_available': RIVESCRIPT_AVAILABLE,
-                'rs_initialized': self.rs is not None,
+                'rs_initialized': brain_registry.current() is not None,
+                'brain': brain_registry.status(),
+                'reload_watcher': watcher.status() if watcher else None,
+                'usage_buffer': flow_usage.get_stats(),
                 'active_flows_count': len(active_flows),
                 'flows': [
                     {
@@ -295,7 +296,7 @@ class RiveScriptService:
                         'name': flow.name,
                         'description': flow.description,
                         'priority': flow.priority,
-                        'usage_count': flow.usage_count or 0,
+                        'usage_count': (flow.usage_count or 0) + flow_usage.pending(flow.id),
                         'last_used': flow.last_used.isoformat() if flow.last_used else None
                     }
                     for flow in active_flows
@@ -328,38 +329,13 @@ class RiveScriptService:
                 self.logger.warning("RiveScript no disponible para recarga")
                 return False
             
-            # Recrear el objeto RiveScript para "limpiar" contenido anterior
-            from rivescript import RiveScript
-            self.rs = RiveScript(utf8=True, debug=False)
-            
-            # Cargar flujos activos desde BD
-            flows = self.flow_repo.get_active_flows()
-            flows_loaded = 0
-            
-            for flow in flows:
-                if flow.rivescript_content:
-                    try:
-                        # Parsear contenido RiveScript línea por línea
-                        content_lines = flow.rivescript_content.split('\n')
-                        for line in content_lines:
-                            if line.strip():  # Solo líneas no vacías
-                                self.rs.stream(line)
-                        flows_loaded += 1
-                        self.logger.debug(f"Flujo '{flow.name}' cargado desde BD")
-                    except Exception as e:
-                        self.logger.error(f"Error cargando flujo '{flow.name}' desde BD: {e}")
-            
-            # Cargar archivos del sistema también (si existen)
-            try:
-                self._load_system_files()
-            except:
-                pass  # No es crítico si fallan los archivos del sistema
-            
-            # Reordenar respuestas
-            self.rs.sort_replies()
+            # Compilar un cerebro nuevo aparte y publicarlo para todo el proceso
+            brain = self._load_active_flows()
+            if brain is None:
+                return False
             
-            self.logger.info(f"Recargados {flows_loaded} flujos desde base de datos")
-            return flows_loaded > 0  # True si se cargó al menos un flujo
+            self.logger.info(f"Recargados {len(brain.flows)} flujos desde base de datos (cerebro v{brain.version})")
+            return len(brain.flows) > 0  # True si se cargó al menos un flujo
             
         except Exception as e:
             self.logger.error(f"Error recargando flujos desde BD: {e}")
@@ -401,7 +377,7 @@ class RiveScriptService:
             response_type = 'rivescript_test'
             if response.startswith("ERR:"):
                 response_type = 'error'
-            elif response == message:
+            elif not is_valid_reply(response, message):
                 response_type = 'no_match'
                 response = "Sin respuesta encontrada para este mensaje"
             
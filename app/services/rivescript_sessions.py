@@ -0,0 +1,518 @@
+# app/services/rivescript_sessions.py
+
+"""
+Sesiones de usuario de RiveScript en memoria con escritura diferida
+Un único SessionManager por proceso, compartido por los cerebros de todos los flujos, guarda
+las variables de cada usuario en un LRU acotado. Los cambios se marcan como sucios y se
+escriben por lotes (ConversationContext.context_data o Redis con TTL igual al timeout de
+sesión) desde un hilo en segundo plano, en vez de un commit por respuesta. Los usuarios
+inactivos o que exceden la capacidad salen del LRU; si tenían cambios pendientes se escriben
+en el siguiente lote.
+Cada worker tiene su propio LRU. Con Redis el almacén es la fuente de verdad: cada respuesta
+(turn) relee la sesión al empezar y la escribe al terminar si cambió, así que cualquier worker
+puede atender a cualquier usuario. Con database la sesión solo se lee al entrar en el LRU y se
+escribe en diferido: es correcto con un único worker (o enrutando siempre a cada usuario al
+mismo); con varios, otro worker puede responder con una copia vieja y pisar la nueva en su lote
+"""
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from flask import has_app_context
+from sqlalchemy import bindparam
+
+from app.utils.logger import WhatsAppLogger
+
+try:
+    from rivescript.sessions import SessionManager
+except ImportError:
+    SessionManager = object
+
+logger = WhatsAppLogger.get_logger('rivescript_sessions')
+
+
+class DatabaseSessionStore:
+    """Persistencia en conversation_contexts.context_data"""
+
+    name = 'database'
+    shared = False  # La copia del LRU manda: solo un worker
+
+    def load(self, username: str) -> Optional[Dict[str, Any]]:
+        if not has_app_context():
+            return None
+        from app.repositories.conversation_repository import ConversationRepository
+        context = ConversationRepository().first_by('phone_number', username)
+        return dict(context.context_data) if context is not None and context.context_data else None
+
+    def save_many(self, sessions: Dict[str, Dict[str, Any]]) -> None:
+        from database.connection import db
+        from database.models import ConversationContext
+
+        table = ConversationContext.__table__
+        stmt = (
+            table.update()
+            .where(table.c.phone_number == bindparam('b_phone'))
+            .values(context_data=bindparam('b_data'), last_interaction=bindparam('b_now'))
+        )
+        now = datetime.utcnow()
+        try:
+            db.session.execute(stmt, [
+                {'b_phone': username, 'b_data': data, 'b_now': now} for username, data in sessions.items()
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def delete(self, username: str) -> None:
+        # El contexto lo gestiona ConversationRepository
+        pass
+
+
+class RedisSessionStore:
+    """Persistencia en Redis, una clave JSON por usuario con TTL"""
+
+    name = 'redis'
+    shared = True  # El almacén manda: se relee y se escribe en cada respuesta
+
+    def __init__(self, ttl_seconds: int, prefix: str = 'rivescript:vars:'):
+        """
+        Inicializa el almacén
+        Args:
+            ttl_seconds: Vida de la sesión sin actividad
+            prefix: Prefijo de las claves
+        """
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _client(self):
+        from app.extensions import get_redis_client
+        client = get_redis_client()
+        if client is None:
+            raise RuntimeError('Redis no disponible')
+        return client
+
+    def load(self, username: str) -> Optional[Dict[str, Any]]:
+        raw = self._client().get(self.prefix + username)
+        return json.loads(raw) if raw else None
+
+    def save_many(self, sessions: Dict[str, Dict[str, Any]]) -> None:
+        pipe = self._client().pipeline(transaction=False)
+        for username, data in sessions.items():
+            pipe.set(self.prefix + username, json.dumps(data, default=str), ex=self.ttl_seconds)
+        pipe.execute()
+
+    def delete(self, username: str) -> None:
+        self._client().delete(self.prefix + username)
+
+
+class LRUSessionManager(SessionManager):
+    """SessionManager de RiveScript con LRU acotado y escritura diferida por lotes"""
+
+    def __init__(self, store: Any = None, max_users: int = 10000, idle_seconds: float = 1800,
+                 flush_batch: int = 500):
+        """
+        Inicializa el gestor
+        Args:
+            store: DatabaseSessionStore, RedisSessionStore o None (solo memoria)
+            max_users: Usuarios como máximo en memoria
+            idle_seconds: Segundos sin actividad tras los que un usuario sale de memoria
+            flush_batch: Usuarios con cambios que disparan una escritura inmediata
+        """
+        self.store = store
+        self.max_users = max(1, max_users)
+        self.idle_seconds = idle_seconds
+        self.flush_batch = max(1, flush_batch)
+        self._users: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+        self._dirty = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}  # Expulsados con cambios sin escribir
+        self._frozen: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._app = None
+        self._interval = 5.0
+        self._fork_hook = False
+        self.stats: Dict[str, Any] = {
+            'hits': 0,
+            'misses': 0,
+            'load_errors': 0,
+            'evictions': 0,
+            'flushes': 0,
+            'flushed_users': 0,
+            'flush_errors': 0,
+            'refreshes': 0,
+            'last_flush_ms': None,
+            'last_error': None
+        }
+
+    # --- Interfaz SessionManager ---
+
+    def set(self, username, args):
+        data = self._entry(username)
+        with self._lock:
+            for key, value in args.items():
+                if value is None:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            self._dirty.add(username)
+            if len(self._dirty) + len(self._pending) >= self.flush_batch:
+                self._wake.set()
+
+    def get(self, username, key, default='undefined'):
+        return self._entry(username).get(key, default)
+
+    def get_any(self, username):
+        data = self._entry(username)
+        with self._lock:
+            return copy.deepcopy(data)
+
+    def get_all(self):
+        """Solo los usuarios en memoria"""
+        with self._lock:
+            return copy.deepcopy(dict(self._users))
+
+    def reset(self, username):
+        with self._lock:
+            self._users.pop(username, None)
+            self._last_seen.pop(username, None)
+            self._dirty.discard(username)
+            self._pending.pop(username, None)
+            self._frozen.pop(username, None)
+        if self.store is not None:
+            try:
+                self.store.delete(username)
+            except Exception as e:
+                logger.warning(f"No se pudo borrar la sesión de {username}: {e}")
+
+    def reset_all(self):
+        with self._lock:
+            self._users.clear()
+            self._last_seen.clear()
+            self._dirty.clear()
+            self._pending.clear()
+            self._frozen.clear()
+
+    def freeze(self, username):
+        data = self._entry(username)
+        with self._lock:
+            self._frozen[username] = copy.deepcopy(data)
+
+    def thaw(self, username, action='thaw'):
+        with self._lock:
+            frozen = self._frozen.get(username)
+            if frozen is None:
+                return
+            if action in ('thaw', 'keep'):
+                self._users[username] = copy.deepcopy(frozen)
+                self._users.move_to_end(username)
+                self._pending.pop(username, None)
+                self._dirty.add(username)
+                self._last_seen[username] = time.monotonic()
+            if action in ('thaw', 'discard'):
+                del self._frozen[username]
+
+    # --- LRU ---
+
+    def _lookup(self, username: str) -> Optional[Dict[str, Any]]:
+        data = self._users.get(username)
+        if data is not None:
+            self._users.move_to_end(username)
+        else:
+            data = self._pending.pop(username, None)
+            if data is None:
+                return None
+            self._users[username] = data
+            self._dirty.add(username)
+        self._last_seen[username] = time.monotonic()
+        return data
+
+    def _entry(self, username: str) -> Dict[str, Any]:
+        """Variables del usuario en memoria, cargándolas del almacén (fuera del lock) si no están"""
+        with self._lock:
+            data = self._lookup(username)
+            if data is not None:
+                self.stats['hits'] += 1
+                return data
+        loaded = self._load(username)
+        with self._lock:
+            data = self._lookup(username)
+            if data is None:
+                self.stats['misses'] += 1
+                data = self._users[username] = loaded
+                self._last_seen[username] = time.monotonic()
+                self._evict(self._last_seen[username])
+            return data
+
+    def _load(self, username: str) -> Dict[str, Any]:
+        data = None
+        if self.store is not None:
+            try:
+                data = self.store.load(username)
+            except Exception as e:
+                self.stats['load_errors'] += 1
+                logger.warning(f"No se pudo cargar la sesión de {username}: {e}")
+        return data if data else self.default_session()
+
+    def _evict(self, now: float) -> None:
+        while self._users:
+            username = next(iter(self._users))
+            idle = now - self._last_seen.get(username, now) > self.idle_seconds
+            if len(self._users) <= self.max_users and not idle:
+                break
+            data = self._users.pop(username)
+            self._last_seen.pop(username, None)
+            self.stats['evictions'] += 1
+            if username in self._dirty:
+                self._dirty.discard(username)
+                self._pending[username] = data
+
+    def evict_idle(self) -> None:
+        """Saca de memoria a los usuarios inactivos"""
+        with self._lock:
+            self._evict(time.monotonic())
+
+    def is_dirty(self, username: str) -> bool:
+        with self._lock:
+            return username in self._dirty or username in self._pending
+
+    # --- Escritura diferida ---
+
+    def flush(self) -> int:
+        """
+        Escribe en el almacén las variables cambiadas desde la última escritura
+        Returns:
+            int: Usuarios escritos
+        """
+        if self.store is None:
+            with self._lock:
+                self._dirty.clear()
+                self._pending.clear()
+            return 0
+
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._pending)
+                for username in self._dirty:
+                    batch[username] = copy.deepcopy(self._users[username])
+                self._pending.clear()
+                self._dirty.clear()
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self.store.save_many(batch)
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                self.stats['last_error'] = str(e)
+                logger.error(f"Error escribiendo {len(batch)} sesiones RiveScript: {e}")
+                self._requeue(batch)
+                return 0
+
+            self.stats['flushes'] += 1
+            self.stats['flushed_users'] += len(batch)
+            self.stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            return len(batch)
+
+    def _requeue(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        """Reintentar en el siguiente lote salvo lo que ya se haya vuelto a cambiar"""
+        with self._lock:
+            for username, data in batch.items():
+                if username in self._users:
+                    self._dirty.add(username)
+                else:
+                    self._pending.setdefault(username, data)
+
+    # --- Almacén compartido entre workers ---
+
+    @contextmanager
+    def turn(self, username: str):
+        """
+        Una respuesta a un usuario. Con un almacén compartido (Redis) relee la sesión al entrar
+        y la escribe al salir si cambió; con los demás no hace nada (LRU de un único worker)
+        Args:
+            username: Usuario (teléfono)
+        """
+        if self.store is None or not getattr(self.store, 'shared', False):
+            yield
+            return
+        self.refresh(username)
+        try:
+            yield
+        finally:
+            self.write_through(username)
+
+    def refresh(self, username: str) -> None:
+        """
+        Descarta la copia en memoria para que el siguiente acceso la lea del almacén
+        Se conserva si tiene cambios sin escribir (una escritura anterior falló)
+        Args:
+            username: Usuario (teléfono)
+        """
+        with self._lock:
+            if username in self._dirty or username in self._pending:
+                return
+            if self._users.pop(username, None) is not None:
+                self._last_seen.pop(username, None)
+                self.stats['refreshes'] += 1
+
+    def write_through(self, username: str) -> bool:
+        """
+        Escribe ya los cambios de un usuario, sin esperar al lote
+        Args:
+            username: Usuario (teléfono)
+        Returns:
+            bool: True si había cambios y se escribieron
+        """
+        if self.store is None:
+            return False
+        with self._flush_lock:
+            with self._lock:
+                if username in self._dirty:
+                    self._dirty.discard(username)
+                    data = copy.deepcopy(self._users[username])
+                else:
+                    data = self._pending.pop(username, None)
+            if data is None:
+                return False
+            try:
+                self.store.save_many({username: data})
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                self.stats['last_error'] = str(e)
+                logger.error(f"Error escribiendo la sesión RiveScript de {username}: {e}")
+                self._requeue({username: data})
+                return False
+            self.stats['flushes'] += 1
+            self.stats['flushed_users'] += 1
+            return True
+
+    def start(self, app, interval: float = 5.0) -> None:
+        """
+        Arranca el hilo que escribe los cambios y expulsa a los inactivos
+        Args:
+            app: Aplicación Flask (para el contexto de base de datos)
+            interval: Segundos entre escrituras
+        """
+        self._app = app
+        self._interval = max(0.1, interval)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rivescript-session-flusher', daemon=True)
+        self._thread.start()
+        if not self._fork_hook:
+            atexit.register(self._flush_at_exit)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook = True
+
+    def _restart_after_fork(self) -> None:
+        # El hilo del padre podía tener los locks a mitad de save_many; los cambios
+        # heredados del padre los escribe el padre
+        self._thread = None
+        self._users = OrderedDict()
+        self._last_seen = {}
+        self._dirty = set()
+        self._pending = {}
+        self._frozen = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if self._app is not None:
+            self.start(self._app, self._interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            try:
+                self.evict_idle()
+                with self._app.app_context():
+                    self.flush()
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                logger.error(f"Error en el hilo de sesiones RiveScript: {e}")
+
+    def _flush_at_exit(self) -> None:
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.error(f"Error escribiendo sesiones RiveScript al salir: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        """Ocupación y métricas del LRU"""
+        with self._lock:
+            return {
+                'backend': self.store.name if self.store is not None else 'memory',
+                'shared': bool(getattr(self.store, 'shared', False)),
+                'running': self._thread is not None and self._thread.is_alive(),
+                'users': len(self._users),
+                'max_users': self.max_users,
+                'dirty': len(self._dirty),
+                'pending': len(self._pending),
+                **self.stats
+            }
+
+
+def create_session_manager() -> LRUSessionManager:
+    """
+    Crea el gestor de sesiones del proceso según RIVESCRIPT_SESSION_BACKEND
+    Returns:
+        LRUSessionManager: Con almacén database, redis o ninguno (memory)
+    """
+    from config.default import DefaultConfig
+
+    backend = DefaultConfig.RIVESCRIPT_SESSION_BACKEND
+    if backend == 'redis':
+        store = RedisSessionStore(DefaultConfig.CHATBOT_SESSION_TIMEOUT_HOURS * 3600)
+    elif backend == 'memory':
+        store = None
+    else:
+        store = DatabaseSessionStore()
+    return LRUSessionManager(
+        store,
+        max_users=DefaultConfig.RIVESCRIPT_SESSION_MAX_USERS,
+        idle_seconds=DefaultConfig.RIVESCRIPT_SESSION_IDLE_SECONDS,
+        flush_batch=DefaultConfig.RIVESCRIPT_SESSION_FLUSH_BATCH
+    )
+
+
+rivescript_sessions = create_session_manager()
+
+
+def start_session_flusher(app) -> Optional[LRUSessionManager]:
+    """
+    Arranca la escritura diferida de sesiones RiveScript
+    Args:
+        app: Aplicación Flask
+    Returns:
+        LRUSessionManager o None si no hay almacén (memory) o se está en TESTING
+    """
+    if rivescript_sessions.store is None or app.config.get('TESTING'):
+        return None
+    rivescript_sessions.start(app, app.config.get('RIVESCRIPT_SESSION_FLUSH_SECONDS', 5.0))
+    return rivescript_sessions
+
+
+def reset_session(username: str) -> None:
+    """Descarta las variables RiveScript de un usuario (reinicio o borrado del contexto)"""
+    rivescript_sessions.reset(username)
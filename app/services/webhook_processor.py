@@ -8,10 +8,17 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 
+from flask import g, has_app_context
+
 from app.services.whatsapp_api import WhatsAppAPIService
+from app.services.read_receipts import ReadReceiptQueue
 from app.repositories.base_repo import MessageRepository, MessagingLineRepository
 from app.utils.exceptions import ValidationError, WhatsAppAPIError
 from app.utils.helpers import create_success_response
+from app.utils.keyword_matcher import keyword_matcher
+from config.default import DefaultConfig
+from database.query_stats import query_scope
+from database.unit_of_work import UnitOfWork, release_connection, unit_of_work
 
 # Importar servicio de chatbot
 try:
@@ -31,6 +38,14 @@ class WebhookProcessor:
         self.msg_repo = MessageRepository()
         self.line_repo = MessagingLineRepository()
         
+        # Cola de confirmaciones de lectura diferidas (fuera del camino de respuesta)
+        self.read_receipts = None
+        if DefaultConfig.READ_RECEIPTS_DEFERRED:
+            self.read_receipts = ReadReceiptQueue(
+                sender=self.whatsapp_api.mark_message_as_read,
+                window_ms=DefaultConfig.READ_RECEIPTS_COALESCE_WINDOW_MS
+            )
+        
         # Inicializar chatbot si está disponible
         self.chatbot = None
         if CHATBOT_AVAILABLE:
@@ -62,9 +77,10 @@ class WebhookProcessor:
                 self.logger.warning("Estructura de webhook inválida")
                 return False
             
-            # Procesar cada entrada del webhook
-            for entry in webhook_data.get('entry', []):
-                self._process_webhook_entry(entry)
+            # Procesar cada entrada del webhook midiendo sus consultas SQL
+            with query_scope('webhook', getattr(g, 'request_id', None) if has_app_context() else None):
+                for entry in webhook_data.get('entry', []):
+                    self._process_webhook_entry(entry)
             
             self.logger.info("Webhook procesado exitosamente")
             return True
@@ -173,79 +189,79 @@ class WebhookProcessor:
                 self.logger.info(f"Mensaje {message_id} ya procesado en memoria, saltando")
                 return
             
-            # Verificar si el mensaje ya existe en la base de datos
-            existing_message = self.msg_repo.get_by_whatsapp_id(message_id)
-            if existing_message:
-                self.logger.info(f"Mensaje {message_id} ya existe en BD, saltando")
-                self._processed_messages.add(message_id)
-                return
+            # El mensaje entrante y su resumen se confirman antes de responder: un fallo del
+            # chatbot o del envío no los revierte, y la respuesta usa sus propias transacciones
+            with unit_of_work('inbound_message'):
+                # Verificar si el mensaje ya existe en la base de datos
+                existing_message = self.msg_repo.get_by_whatsapp_id(message_id)
+                if existing_message:
+                    self.logger.info(f"Mensaje {message_id} ya existe en BD, saltando")
+                    self._processed_messages.add(message_id)
+                    return
             
-            # Extraer contenido del mensaje
-            content = self._extract_message_content(message)
+                # Extraer contenido del mensaje
+                content = self._extract_message_content(message)
             
-            # Buscar línea de mensajería correspondiente
-            line = self._find_messaging_line_by_phone_id(phone_number_id)
+                # Buscar línea de mensajería correspondiente
+                line = self._find_messaging_line_by_phone_id(phone_number_id)
             
-            if not line:
-                self.logger.warning(f"No se encontró línea para phone_number_id: {phone_number_id}")
-                line = self._create_default_line(phone_number_id, display_name)
+                if not line:
+                    self.logger.warning(f"No se encontró línea para phone_number_id: {phone_number_id}")
+                    line = self._create_default_line(phone_number_id, display_name)
             
-            # Guardar mensaje en base de datos
-            try:
-                # Preparar datos del mensaje
-                message_data = {
-                    'whatsapp_message_id': message_id,
-                    'line_id': line.line_id,
-                    'phone_number': from_number,
-                    'message_type': message_type,
-                    'content': content,
-                    'status': 'received',
-                    'direction': 'inbound'
-                }
+                # Guardar mensaje en base de datos
+                try:
+                    # Preparar datos del mensaje
+                    message_data = {
+                        'whatsapp_message_id': message_id,
+                        'line_id': line.line_id,
+                        'phone_number': from_number,
+                        'message_type': message_type,
+                        'content': content,
+                        'status': 'received',
+                        'direction': 'inbound'
+                    }
                 
-                # Si tenemos timestamp del webhook, incluirlo en los datos de creación
-                if timestamp:
-                    try:
-                        message_data['created_at'] = datetime.fromtimestamp(int(timestamp), timezone.utc)
-                        message_data['updated_at'] = datetime.fromtimestamp(int(timestamp), timezone.utc)
-                    except (ValueError, OSError) as e:
-                        self.logger.warning(f"No se pudo convertir timestamp {timestamp}: {e}")
+                    # Si tenemos timestamp del webhook, incluirlo en los datos de creación
+                    if timestamp:
+                        try:
+                            message_data['created_at'] = datetime.fromtimestamp(int(timestamp), timezone.utc)
+                            message_data['updated_at'] = datetime.fromtimestamp(int(timestamp), timezone.utc)
+                        except (ValueError, OSError) as e:
+                            self.logger.warning(f"No se pudo convertir timestamp {timestamp}: {e}")
                 
-                # Crear mensaje con todos los datos
-                message_record = self.msg_repo.create(**message_data)
+                    # Crear mensaje con todos los datos
+                    message_record = self.msg_repo.create(**message_data)
                         
-            except Exception as e:
-                # Si hay error de duplicado, verificar si el mensaje existe
-                if "UNIQUE constraint failed" in str(e) or "duplicate key" in str(e):
-                    self.logger.warning(f"Mensaje duplicado detectado para {message_id}, verificando existencia")
-                    existing_message = self.msg_repo.get_by_whatsapp_id(message_id)
-                    if existing_message:
-                        self.logger.info(f"Mensaje {message_id} confirmado como duplicado, usando existente")
-                        # No usar el objeto existing_message directamente para evitar conflictos de sesión
-                        message_record = None  # Marcamos que ya existe sin usar el objeto
+                except Exception as e:
+                    # Si hay error de duplicado, verificar si el mensaje existe
+                    if "UNIQUE constraint failed" in str(e) or "duplicate key" in str(e):
+                        self.logger.warning(f"Mensaje duplicado detectado para {message_id}, verificando existencia")
+                        existing_message = self.msg_repo.get_by_whatsapp_id(message_id)
+                        if existing_message:
+                            self.logger.info(f"Mensaje {message_id} confirmado como duplicado, usando existente")
+                            # No usar el objeto existing_message directamente para evitar conflictos de sesión
+                            message_record = None  # Marcamos que ya existe sin usar el objeto
+                            self._processed_messages.add(message_id)
+                        else:
+                            self.logger.error(f"Error inesperado creando mensaje {message_id}: {e}")
+                            raise e
+                    elif "already attached to session" in str(e):
+                        self.logger.warning(f"Conflicto de sesión SQLAlchemy para mensaje {message_id}, ignorando")
+                        # También es un indicador de que el mensaje ya existe
+                        message_record = None
                         self._processed_messages.add(message_id)
                     else:
-                        self.logger.error(f"Error inesperado creando mensaje {message_id}: {e}")
+                        self.logger.error(f"Error creando mensaje {message_id}: {e}")
                         raise e
-                elif "already attached to session" in str(e):
-                    self.logger.warning(f"Conflicto de sesión SQLAlchemy para mensaje {message_id}, ignorando")
-                    # También es un indicador de que el mensaje ya existe
-                    message_record = None
-                    self._processed_messages.add(message_id)
-                else:
-                    self.logger.error(f"Error creando mensaje {message_id}: {e}")
-                    raise e
             
             # Marcar como procesado
             self._processed_messages.add(message_id)
             
             # Solo continuar con el procesamiento si tenemos un message_record válido
             if message_record is not None:
-                # Marcar mensaje como leído
-                try:
-                    self.whatsapp_api.mark_message_as_read(message_id, phone_number_id)
-                except Exception as e:
-                    self.logger.warning(f"No se pudo marcar mensaje como leído: {e}")
+                # Marcar mensaje como leído (diferido y agrupado por conversación)
+                self._mark_as_read(message_id, phone_number_id, from_number, timestamp)
                 
                 # Procesar respuesta automática del chatbot
                 self._process_chatbot_response(message_record, from_number, content, line)
@@ -261,6 +277,29 @@ class WebhookProcessor:
             self.logger.error(f"Error procesando mensaje entrante: {e}")
             raise
     
+    def _mark_as_read(self, message_id: str, phone_number_id: str, from_number: str,
+                      timestamp: Optional[str] = None) -> None:
+        """
+        Marca un mensaje como leído, encolándolo si el modo diferido está activo
+        Args:
+            message_id: ID del mensaje de WhatsApp
+            phone_number_id: ID del número de WhatsApp Business
+            from_number: Número del remitente
+            timestamp: Timestamp del mensaje según el webhook
+        """
+        if self.read_receipts:
+            try:
+                order = int(timestamp) if timestamp else None
+            except (TypeError, ValueError):
+                order = None
+            self.read_receipts.enqueue(message_id, phone_number_id, from_number, order)
+            return
+        
+        try:
+            self.whatsapp_api.mark_message_as_read(message_id, phone_number_id)
+        except Exception as e:
+            self.logger.warning(f"No se pudo marcar mensaje como leído: {e}")
+    
     def _extract_message_content(self, message: Dict[str, Any]) -> str:
         """
         Extrae el contenido del mensaje según su tipo
@@ -331,27 +370,40 @@ class WebhookProcessor:
         try:
             statuses = value.get('statuses', [])
             
-            for status in statuses:
-                message_id = status.get('id')
-                recipient_id = status.get('recipient_id')
-                status_value = status.get('status')
-                timestamp = status.get('timestamp')
-                
-                # Actualizar estado en base de datos
-                try:
+            # Un commit para el lote; cada estado en su savepoint para que uno
+            # inválido no revierta los demás
+            with unit_of_work('message_status') as uow:
+                self._update_message_statuses(statuses, uow)
+                    
+        except Exception as e:
+            self.logger.error(f"Error procesando estados de mensaje: {e}")
+            raise
+    
+    def _update_message_statuses(self, statuses: List[Dict[str, Any]], uow: UnitOfWork) -> None:
+        """
+        Actualiza en base de datos el estado de cada mensaje notificado
+        Args:
+            statuses: Lista de estados recibidos en el webhook
+            uow: Unidad de trabajo del lote
+        """
+        for status in statuses:
+            message_id = status.get('id')
+            recipient_id = status.get('recipient_id')
+            status_value = status.get('status')
+            timestamp = status.get('timestamp')
+            
+            # Actualizar estado en base de datos
+            try:
+                with uow.savepoint():
                     message = self.msg_repo.get_by_whatsapp_id(message_id)
                     if message:
                         self.msg_repo.update_status(message.id, status_value)
                         self.logger.info(f"Estado de mensaje actualizado: {message_id} -> {status_value}")
                     else:
                         self.logger.warning(f"Mensaje no encontrado para actualizar estado: {message_id}")
-                
-                except Exception as e:
-                    self.logger.error(f"Error actualizando estado de mensaje {message_id}: {e}")
-                    
-        except Exception as e:
-            self.logger.error(f"Error procesando estados de mensaje: {e}")
-            raise
+            
+            except Exception as e:
+                self.logger.error(f"Error actualizando estado de mensaje {message_id}: {e}")
     
     def _process_message_reactions(self, value: Dict[str, Any]) -> None:
         """
@@ -455,10 +507,10 @@ class WebhookProcessor:
             # - Integración con chatbots
             # - Procesamiento de comandos
             
-            message_text = message_record.content.lower()
+            categories = keyword_matcher.categories(message_record.content or '')
             
             # Ejemplo: respuesta automática a saludo
-            if any(greeting in message_text for greeting in ['hola', 'hello', 'hi', 'buenos días']):
+            if 'greeting' in categories:
                 self._send_auto_reply(
                     message_record.phone_number,
                     message_record.line_id,
@@ -466,7 +518,7 @@ class WebhookProcessor:
                 )
             
             # Ejemplo: respuesta a comando de ayuda
-            elif 'ayuda' in message_text or 'help' in message_text:
+            elif 'help' in categories:
                 self._send_auto_reply(
                     message_record.phone_number,
                     message_record.line_id,
@@ -546,12 +598,14 @@ class WebhookProcessor:
             if not line or not line.phone_number_id:
                 self.logger.warning(f"No se puede enviar respuesta del chatbot: línea no válida")
                 return
+            line_id, phone_number_id = line.line_id, line.phone_number_id
             
-            # Enviar mensaje vía WhatsApp API
+            # Enviar mensaje vía WhatsApp API sin transacción abierta
+            release_connection()
             api_response = self.whatsapp_api.send_text_message(
                 phone_number=phone_number,
                 text=response_text,
-                phone_number_id=line.phone_number_id
+                phone_number_id=phone_number_id
             )
             
             # Guardar respuesta del chatbot en BD
@@ -569,15 +623,16 @@ class WebhookProcessor:
                 }
                 
                 # Crear registro del mensaje enviado
-                self.msg_repo.create(
-                    whatsapp_message_id=whatsapp_message_id,
-                    line_id=line.line_id,
-                    phone_number=phone_number,
-                    message_type='text',
-                    content=chatbot_metadata,  # Guardar metadata completa
-                    status='sent',
-                    direction='outbound'
-                )
+                with unit_of_work('chatbot_reply'):
+                    self.msg_repo.create(
+                        whatsapp_message_id=whatsapp_message_id,
+                        line_id=line_id,
+                        phone_number=phone_number,
+                        message_type='text',
+                        content=chatbot_metadata,  # Guardar metadata completa
+                        status='sent',
+                        direction='outbound'
+                    )
                 
                 self.logger.info(f"Respuesta del chatbot enviada exitosamente a {phone_number}")
                 self.logger.debug(f"Metadata de respuesta: {chatbot_metadata}")
@@ -602,27 +657,30 @@ class WebhookProcessor:
             if not line or not line.phone_number_id:
                 self.logger.warning(f"No se puede enviar respuesta automática: línea {line_id} no válida")
                 return
+            line_key, phone_number_id = line.line_id, line.phone_number_id
             
-            # Enviar mensaje vía WhatsApp API
+            # Enviar mensaje vía WhatsApp API sin transacción abierta
+            release_connection()
             response = self.whatsapp_api.send_text_message(
                 phone_number=phone_number,
                 text=text,
-                phone_number_id=line.phone_number_id
+                phone_number_id=phone_number_id
             )
             
             # Guardar respuesta automática en BD
             if response and 'messages' in response:
                 whatsapp_message_id = response['messages'][0]['id']
                 
-                self.msg_repo.create(
-                    whatsapp_message_id=whatsapp_message_id,
-                    line_id=line.line_id,  # Usar line.line_id en lugar de line_id string
-                    phone_number=phone_number,
-                    message_type='text',
-                    content=text,
-                    status='sent',
-                    direction='outbound'
-                )
+                with unit_of_work('auto_reply'):
+                    self.msg_repo.create(
+                        whatsapp_message_id=whatsapp_message_id,
+                        line_id=line_key,  # Usar line.line_id en lugar de line_id string
+                        phone_number=phone_number,
+                        message_type='text',
+                        content=text,
+                        status='sent',
+                        direction='outbound'
+                    )
                 
             self.logger.info(f"Respuesta automática enviada a {phone_number}")
             
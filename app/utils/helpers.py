@@ -4,6 +4,7 @@ Utilidades para formateo, conversión y procesamiento de datos
 """
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
+import base64
 import json
 import logging
 
@@ -92,6 +93,42 @@ def paginate_results(items: List[Any], page: int = 1, per_page: int = 10) -> dic
         }
     }
 
+def encode_cursor(created_at: datetime, record_id: Any, *extra: Any) -> str:
+    """
+    Codifica un cursor de paginación keyset (created_at, id) en base64 URL-safe
+    Args:
+        created_at: Fecha de creación del último elemento de la página
+        record_id: ID del último elemento de la página
+        extra: Columnas de desempate adicionales del orden (opcional)
+    Returns:
+        str: Cursor opaco para la siguiente página
+    """
+    data = {'c': created_at.isoformat(), 'i': str(record_id)}
+    if extra:
+        data['x'] = [str(value) for value in extra]
+    payload = json.dumps(data, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decodifica un cursor generado por encode_cursor
+    Args:
+        cursor: Cursor opaco recibido del cliente
+    Returns:
+        tuple: (created_at, id como string, columnas de desempate como string...)
+    Raises:
+        ValidationError: Si el cursor no es válido
+    """
+    from app.utils.exceptions import ValidationError
+    
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return (datetime.fromisoformat(payload['c']), str(payload['i']),
+                *(str(value) for value in payload.get('x', [])))
+    except Exception:
+        raise ValidationError("Cursor de paginación inválido", field='cursor')
+
 def filter_dict_keys(data: dict, allowed_keys: List[str]) -> dict:
     """
     Filtra diccionario manteniendo solo las claves permitidas
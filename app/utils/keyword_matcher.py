@@ -0,0 +1,130 @@
+"""
+Búsqueda de palabras clave por categoría en una sola pasada (Aho-Corasick)
+Las listas de saludos, despedidas, preguntas frecuentes y comandos de cierre se compilan
+una vez en un autómata; cada mensaje se recorre carácter a carácter una sola vez y se
+obtienen todas las categorías presentes, en vez de un any(palabra in mensaje) por lista.
+Conserva la semántica anterior: coincidencia como subcadena sobre el mensaje en minúsculas.
+La tabla por defecto se puede ampliar o sustituir por categoría con CHATBOT_KEYWORDS (JSON)
+"""
+import json
+import logging
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set
+
+logger = logging.getLogger(__name__)
+
+# Categoría -> palabras clave (en minúsculas)
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    'greeting': ['hola', 'hello', 'hi', 'buenos días', 'buenas tardes', 'buenas noches'],
+    'goodbye': ['adiós', 'adios', 'chau', 'bye', 'gracias'],
+    'faq_hours': ['horario', 'hora', 'abierto', 'cerrado'],
+    'faq_price': ['precio', 'costo', 'cuanto', 'valor'],
+    'help': ['ayuda', 'help'],
+    'close': [
+        'cerrar conversacion', 'cerrar', 'terminar', 'salir', 'bye', 'adios', 'adiós',
+        'hasta luego', 'nos vemos', 'chau', 'goodbye', 'finish', 'end', 'stop',
+        'cerrar conversación', 'finalizar', 'acabar'
+    ]
+}
+
+
+class KeywordMatcher:
+    """Autómata Aho-Corasick compilado a tabla de transiciones (DFA)"""
+
+    def __init__(self, keywords: Mapping[str, Iterable[str]]):
+        """
+        Compila la tabla de palabras clave
+        Args:
+            keywords: Categoría -> palabras clave
+        """
+        self.keywords = {category: sorted({word.lower() for word in words if word})
+                         for category, words in keywords.items()}
+
+        # Trie: transiciones por estado y categorías que terminan en cada estado
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Set[str]] = [set()]
+        for category, words in self.keywords.items():
+            for word in words:
+                state = 0
+                for char in word:
+                    if char not in goto[state]:
+                        goto.append({})
+                        output.append(set())
+                        goto[state][char] = len(goto) - 1
+                    state = goto[state][char]
+                output[state].add(category)
+
+        # Enlaces de fallo en anchura; cada estado hereda la salida y las transiciones
+        # de su estado de fallo, así la búsqueda no necesita retroceder
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            output[state] |= output[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+
+        self._delta = delta
+        self._output: List[FrozenSet[str]] = [frozenset(categories) for categories in output]
+
+    def categories(self, text: str) -> Set[str]:
+        """
+        Categorías con alguna palabra clave contenida en el texto
+        Args:
+            text: Mensaje (se pasa a minúsculas)
+        Returns:
+            set: Categorías encontradas
+        """
+        delta, output = self._delta, self._output
+        found: Set[str] = set()
+        state = 0
+        for char in text.lower():
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def matches(self, text: str, category: str) -> bool:
+        """
+        Si el texto contiene alguna palabra clave de la categoría
+        Args:
+            text: Mensaje
+            category: Categoría
+        Returns:
+            bool: True si hay coincidencia
+        """
+        return category in self.categories(text)
+
+
+def load_keyword_table(raw: str = '') -> Dict[str, List[str]]:
+    """
+    Tabla de palabras clave: la de por defecto con las categorías de CHATBOT_KEYWORDS encima
+    Args:
+        raw: JSON {"categoria": ["palabra", ...]}; una categoría nueva se añade y una
+             existente se sustituye
+    Returns:
+        dict: Categoría -> palabras clave
+    """
+    table = {category: list(words) for category, words in DEFAULT_KEYWORDS.items()}
+    if not raw:
+        return table
+    try:
+        custom = json.loads(raw)
+        if not isinstance(custom, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        for category, words in custom.items():
+            table[category] = [str(word) for word in words]
+    except (TypeError, ValueError) as e:
+        logger.warning(f"CHATBOT_KEYWORDS inválido, se usan las palabras clave por defecto: {e}")
+    return table
+
+
+def _create_keyword_matcher() -> KeywordMatcher:
+    from config.default import DefaultConfig
+    return KeywordMatcher(load_keyword_table(DefaultConfig.CHATBOT_KEYWORDS))
+
+
+keyword_matcher = _create_keyword_matcher()
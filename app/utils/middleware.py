@@ -314,6 +314,41 @@ class DatabaseLoggingMiddleware:
     def __init__(self):
         self.db_logger = WhatsAppLogger.get_logger(WhatsAppLogger.DATABASE_LOGGER)
     
+    def init_app(self, app: Flask):
+        """
+        Mide las consultas SQL de cada request (ver database.query_stats)
+        Debe registrarse después de RequestLoggingMiddleware, que asigna g.request_id
+        """
+        app.before_request(self._start_query_scope)
+        app.teardown_request(self._end_query_scope)
+    
+    def _start_query_scope(self):
+        from database.query_stats import start_scope
+        
+        g.query_scope, g.query_scope_token = start_scope(
+            request.endpoint or request.path, getattr(g, 'request_id', None)
+        )
+    
+    def _end_query_scope(self, exception):
+        scope = g.pop('query_scope', None)
+        if scope is None:
+            return
+        
+        from database.query_stats import end_scope
+        summary = end_scope(scope, g.pop('query_scope_token', None))
+        self.db_logger.debug(
+            f"SQL del request: {summary['queries']} consultas ({summary['db_ms']}ms)",
+            extra={'extra_data': {
+                'event_type': 'db_request_summary',
+                'request_id': summary['key'],
+                'endpoint': summary['name'],
+                'queries': summary['queries'],
+                'db_ms': summary['db_ms'],
+                'n_plus_one': len(summary['n_plus_one']),
+                'slow_queries': summary['slow_queries']
+            }}
+        )
+    
     def log_query_execution(self, func):
         """
         Decorador para logging de ejecución de queries
@@ -386,6 +421,8 @@ def setup_logging_middleware(app: Flask):
     """
     # Configurar middleware de requests
     request_logging.init_app(app)
+    # Métricas de SQL por request (usa el g.request_id asignado arriba)
+    database_logging.init_app(app)
     
     # Configurar manejo de errores global
     @app.errorhandler(404)
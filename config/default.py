@@ -40,16 +40,90 @@ class DefaultConfig:
     # Mantener por compatibilidad, pero ahora usar FACEBOOK_APP_SECRET
     WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
     
+    # Confirmaciones de lectura diferidas y agrupadas por conversación
+    READ_RECEIPTS_DEFERRED = os.getenv('READ_RECEIPTS_DEFERRED', 'true').lower() == 'true'
+    READ_RECEIPTS_COALESCE_WINDOW_MS = int(os.getenv('READ_RECEIPTS_COALESCE_WINDOW_MS', '1500'))
+    
     # Configuración de SQLAlchemy
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
+    # Un único engine/pool por URL y proceso (ver database.connection.get_engine)
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_recycle': 300,
-        'pool_pre_ping': True,
-        'pool_size': 10,
-        'max_overflow': 20
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '300')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        # Sentencias compiladas en caché por engine (uno por proceso y URL)
+        'query_cache_size': int(os.getenv('DB_QUERY_CACHE_SIZE', '1200'))
+    }
+    # Réplica de solo lectura para las lecturas de los repositorios (opcional)
+    SQLALCHEMY_REPLICA_URI = os.getenv('DATABASE_REPLICA_URL')
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', '5'))
+    # Instrumentación de SQL por request/webhook (N+1 y consultas lentas)
+    SQL_METRICS_ENABLED = os.getenv('SQL_METRICS_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '200'))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+    # Filas por sentencia en create_many/upsert_many
+    DB_BULK_CHUNK_SIZE = int(os.getenv('DB_BULK_CHUNK_SIZE', '1000'))
+    # Filas por lote de COPY / executemany en flask bulk-load
+    BULK_LOAD_BATCH_SIZE = int(os.getenv('BULK_LOAD_BATCH_SIZE', '10000'))
+    # Configuración de text search de PostgreSQL para la búsqueda de texto completo
+    SEARCH_LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'spanish')
+    
+    # Particionado mensual de messages, webhook_events y chatbot_interactions (PostgreSQL)
+    PARTITION_MAINTENANCE_ENABLED = os.getenv('PARTITION_MAINTENANCE_ENABLED', 'true').lower() == 'true'
+    PARTITION_MAINTENANCE_INTERVAL_HOURS = float(os.getenv('PARTITION_MAINTENANCE_INTERVAL_HOURS', '24'))
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+    PARTITION_RETENTION_MODE = os.getenv('PARTITION_RETENTION_MODE', 'detach')  # detach | drop
+    PARTITION_RETENTION_MONTHS = {
+        'messages': int(os.getenv('MESSAGES_RETENTION_MONTHS', '12')),
+        'webhook_events': int(os.getenv('WEBHOOK_EVENTS_RETENTION_MONTHS', '3')),
+        'chatbot_interactions': int(os.getenv('CHATBOT_INTERACTIONS_RETENTION_MONTHS', '6'))
     }
     
+    # Retención por filas (borrado en bloques): días por tabla y horas de contexto
+    RETENTION_DAYS = {
+        'messages': int(os.getenv('MESSAGES_RETENTION_DAYS', '365')),
+        'webhook_events': int(os.getenv('WEBHOOK_EVENTS_RETENTION_DAYS', '90')),
+        'chatbot_interactions': int(os.getenv('CHATBOT_INTERACTIONS_RETENTION_DAYS', '180'))
+    }
+    CONTEXT_RETENTION_HOURS = int(os.getenv('CONTEXT_RETENTION_HOURS', '24'))
+    RETENTION_CHUNK_SIZE = int(os.getenv('RETENTION_CHUNK_SIZE', '5000'))
+    RETENTION_THROTTLE_MS = int(os.getenv('RETENTION_THROTTLE_MS', '50'))
+    
+    # Archivado en frío (JSONL.gz por día) de las filas anteriores a ARCHIVE_AFTER_DAYS
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+    
+    # Propagación de recargas de flujos entre workers (revisión global + Redis pub/sub)
+    FLOW_RELOAD_WATCHER_ENABLED = os.getenv('FLOW_RELOAD_WATCHER_ENABLED', 'true').lower() == 'true'
+    FLOW_RELOAD_POLL_SECONDS = float(os.getenv('FLOW_RELOAD_POLL_SECONDS', '2'))
+    FLOW_RELOAD_CHANNEL = os.getenv('FLOW_RELOAD_CHANNEL', 'flows:reload')
+    # Caché local del cerebro RiveScript compilado (clave: sha256 de los flujos + versión)
+    BRAIN_CACHE_ENABLED = os.getenv('BRAIN_CACHE_ENABLED', 'true').lower() == 'true'
+    BRAIN_CACHE_DIR = os.getenv('BRAIN_CACHE_DIR', os.path.join('cache', 'rivescript'))
+    # Triggers literales ("hola", "menu", "1") resueltos con una tabla antes del motor RiveScript
+    RIVESCRIPT_LITERAL_FAST_PATH = os.getenv('RIVESCRIPT_LITERAL_FAST_PATH', 'true').lower() == 'true'
+    # Variables de usuario RiveScript: LRU en memoria con escritura diferida por lotes
+    # Backend: database (context_data), redis (TTL = CHATBOT_SESSION_TIMEOUT_HOURS) o memory
+    # database y memory solo son correctos con un único worker; con varios, usar redis, que se
+    # relee y se escribe en cada respuesta
+    RIVESCRIPT_SESSION_BACKEND = os.getenv('RIVESCRIPT_SESSION_BACKEND', 'database').lower()
+    RIVESCRIPT_SESSION_MAX_USERS = int(os.getenv('RIVESCRIPT_SESSION_MAX_USERS', '10000'))
+    RIVESCRIPT_SESSION_IDLE_SECONDS = int(os.getenv('RIVESCRIPT_SESSION_IDLE_SECONDS', '900'))
+    RIVESCRIPT_SESSION_FLUSH_SECONDS = float(os.getenv('RIVESCRIPT_SESSION_FLUSH_SECONDS', '5'))
+    RIVESCRIPT_SESSION_FLUSH_BATCH = int(os.getenv('RIVESCRIPT_SESSION_FLUSH_BATCH', '500'))
+    # Registro de interacciones del chatbot: buffer acotado escrito por lotes en segundo plano
+    CHATBOT_INTERACTION_LOG_ASYNC = os.getenv('CHATBOT_INTERACTION_LOG_ASYNC', 'true').lower() == 'true'
+    CHATBOT_INTERACTION_LOG_MAX_SIZE = int(os.getenv('CHATBOT_INTERACTION_LOG_MAX_SIZE', '10000'))
+    CHATBOT_INTERACTION_LOG_BATCH = int(os.getenv('CHATBOT_INTERACTION_LOG_BATCH', '500'))
+    CHATBOT_INTERACTION_LOG_FLUSH_SECONDS = float(os.getenv('CHATBOT_INTERACTION_LOG_FLUSH_SECONDS', '2'))
+    # Uso de flujos (usage_count/last_used) sumado en memoria y escrito con un UPDATE aditivo por flujo
+    FLOW_USAGE_BUFFERED = os.getenv('FLOW_USAGE_BUFFERED', 'true').lower() == 'true'
+    FLOW_USAGE_FLUSH_SECONDS = float(os.getenv('FLOW_USAGE_FLUSH_SECONDS', '10'))
+    
     # Configuración de Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
     
@@ -89,6 +163,8 @@ class DefaultConfig:
     # Configuración de respuestas automáticas
     CHATBOT_AUTO_RESPOND_TO_GREETINGS = os.getenv('CHATBOT_AUTO_RESPOND_TO_GREETINGS', 'true').lower() == 'true'
     CHATBOT_AUTO_RESPOND_TO_QUESTIONS = os.getenv('CHATBOT_AUTO_RESPOND_TO_QUESTIONS', 'true').lower() == 'true'
+    # Palabras clave por categoría (JSON {"categoria": ["palabra", ...]}) sobre las de app/utils/keyword_matcher
+    CHATBOT_KEYWORDS = os.getenv('CHATBOT_KEYWORDS', '')
     
     @staticmethod
     def is_chatbot_available():
@@ -0,0 +1,244 @@
+"""
+Archivado en frío de filas antiguas a ficheros JSONL comprimidos por día
+Las filas anteriores a ARCHIVE_AFTER_DAYS se leen en bloques ordenados por clave, se añaden
+a ARCHIVE_DIR/<tabla>/AAAA/MM/DD.jsonl.gz (un miembro gzip por bloque) y solo después de
+escribir y sincronizar el fichero se eliminan de la base de datos en la misma transacción
+corta del bloque. Si el proceso se interrumpe entre ambos pasos, el bloque puede quedar
+archivado dos veces: el lector descarta las claves repetidas
+"""
+import gzip
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import MetaData, Table, delete, func, select
+from sqlalchemy.engine import Engine
+
+from database.connection import db
+from database.retention import RetentionPolicy
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArchivePolicy(RetentionPolicy):
+    """
+    Política de archivado de una tabla
+    """
+    phone_column: Optional[str] = 'phone_number'
+
+
+def get_archive_policies() -> List[ArchivePolicy]:
+    """
+    Construye las políticas a partir de la configuración
+    Returns:
+        list: Políticas de messages, chatbot_interactions y webhook_events
+    """
+    from config.default import DefaultConfig
+
+    days = DefaultConfig.ARCHIVE_AFTER_DAYS
+    return [
+        ArchivePolicy('messages', timedelta(days=days)),
+        ArchivePolicy('chatbot_interactions', timedelta(days=days)),
+        ArchivePolicy('webhook_events', timedelta(days=days), phone_column=None)
+    ]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _day_path(archive_dir: str, table_name: str, day: date) -> str:
+    return os.path.join(archive_dir, table_name, f'{day:%Y}', f'{day:%m}', f'{day:%d}.jsonl.gz')
+
+
+def _append_day(path: str, lines: List[str]) -> None:
+    """Añade un miembro gzip al fichero del día y lo sincroniza a disco"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+            gz.write(''.join(lines).encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_table(policy: ArchivePolicy, engine: Engine = None, archive_dir: str = None,
+                  chunk_size: int = None, throttle_ms: int = None, max_rows: int = None,
+                  dry_run: bool = False, now: datetime = None) -> Dict[str, Any]:
+    """
+    Archiva y elimina las filas anteriores a la fecha límite de una tabla
+    Args:
+        policy: Política de archivado
+        engine: Engine de base de datos (por defecto db.engine)
+        archive_dir: Directorio raíz del archivo (por defecto ARCHIVE_DIR)
+        chunk_size: Filas por bloque (por defecto RETENTION_CHUNK_SIZE)
+        throttle_ms: Pausa entre bloques en milisegundos (por defecto RETENTION_THROTTLE_MS)
+        max_rows: Máximo de filas a archivar en esta ejecución (opcional)
+        dry_run: Si True, solo cuenta las filas afectadas
+        now: Fecha de referencia (para tests)
+    Returns:
+        dict: Tabla, fecha límite, filas archivadas, bloques, ficheros tocados y filas/s
+    """
+    from config.default import DefaultConfig
+
+    engine = engine or db.engine
+    archive_dir = archive_dir or DefaultConfig.ARCHIVE_DIR
+    chunk_size = chunk_size or DefaultConfig.RETENTION_CHUNK_SIZE
+    throttle_ms = DefaultConfig.RETENTION_THROTTLE_MS if throttle_ms is None else throttle_ms
+
+    # Todas las columnas reales de la tabla, sin depender del modelo
+    target = Table(policy.table, MetaData(), autoload_with=engine)
+    key = target.c[policy.key_column]
+    timestamp = target.c[policy.timestamp_column]
+    cutoff = policy.cutoff(now)
+    expired = timestamp < cutoff
+
+    result = {
+        'table': policy.table,
+        'cutoff': cutoff.isoformat(),
+        'archived': 0,
+        'chunks': 0,
+        'files': 0,
+        'elapsed_seconds': 0.0,
+        'rows_per_second': 0.0
+    }
+
+    if dry_run:
+        with engine.connect() as conn:
+            result['expired'] = conn.execute(select(func.count()).select_from(target).where(expired)).scalar()
+        return result
+
+    files = set()
+    start = time.perf_counter()
+    while max_rows is None or result['archived'] < max_rows:
+        limit = chunk_size if max_rows is None else min(chunk_size, max_rows - result['archived'])
+
+        with engine.begin() as conn:
+            rows = conn.execute(select(target).where(expired).order_by(key).limit(limit)).mappings().all()
+            if not rows:
+                break
+
+            by_day: Dict[date, List[str]] = {}
+            for row in rows:
+                by_day.setdefault(row[policy.timestamp_column].date(), []).append(
+                    json.dumps(dict(row), default=_json_default, ensure_ascii=False) + '\n'
+                )
+            for day, lines in by_day.items():
+                path = _day_path(archive_dir, policy.table, day)
+                _append_day(path, lines)
+                files.add(path)
+
+            conn.execute(delete(target).where(key.in_([row[policy.key_column] for row in rows])))
+
+        result['archived'] += len(rows)
+        result['chunks'] += 1
+        if len(rows) < limit:
+            break
+        if throttle_ms:
+            time.sleep(throttle_ms / 1000.0)
+
+    elapsed = time.perf_counter() - start
+    result['files'] = len(files)
+    result['elapsed_seconds'] = round(elapsed, 3)
+    result['rows_per_second'] = round(result['archived'] / elapsed, 1) if elapsed > 0 else 0.0
+
+    if result['archived']:
+        logger.info(
+            f"Archivado {policy.table}: {result['archived']} filas en {result['chunks']} bloques, "
+            f"{result['files']} ficheros ({result['rows_per_second']} filas/s)"
+        )
+    return result
+
+
+def run_archive(policies: List[ArchivePolicy] = None, tables: Optional[List[str]] = None,
+                engine: Engine = None, **options) -> List[Dict[str, Any]]:
+    """
+    Archiva todas las tablas configuradas, una tras otra
+    Args:
+        policies: Políticas a aplicar (por defecto get_archive_policies())
+        tables: Limitar a estas tablas (opcional)
+        engine: Engine de base de datos (por defecto db.engine)
+        **options: archive_dir, chunk_size, throttle_ms, max_rows, dry_run (ver archive_table)
+    Returns:
+        list: Resultado de cada tabla
+    """
+    results = []
+    for policy in policies or get_archive_policies():
+        if tables and policy.table not in tables:
+            continue
+        try:
+            results.append(archive_table(policy, engine=engine, **options))
+        except Exception as e:
+            logger.error(f"Error archivando {policy.table}: {e}")
+            results.append({'table': policy.table, 'error': str(e)})
+    return results
+
+
+def iter_archive(table_name: str, phone_number: str = None, start: date = None, end: date = None,
+                 archive_dir: str = None, phone_column: str = None,
+                 key_column: str = 'id') -> Iterator[Dict[str, Any]]:
+    """
+    Recorre las filas archivadas de una tabla en orden de día, línea a línea
+    Solo abre los ficheros de los días del rango y nunca carga un fichero completo en memoria
+    Args:
+        table_name: Tabla archivada
+        phone_number: Filtrar por número (opcional)
+        start: Primer día incluido (opcional)
+        end: Último día incluido (opcional)
+        archive_dir: Directorio raíz del archivo (por defecto ARCHIVE_DIR)
+        phone_column: Columna del número (por defecto la de la política de la tabla)
+        key_column: Columna clave para descartar bloques archivados dos veces
+    Yields:
+        dict: Fila archivada (fechas como texto ISO 8601)
+    """
+    from config.default import DefaultConfig
+
+    root = os.path.join(archive_dir or DefaultConfig.ARCHIVE_DIR, table_name)
+    if not os.path.isdir(root):
+        return
+
+    if phone_number and phone_column is None:
+        policy = next((p for p in get_archive_policies() if p.table == table_name), None)
+        phone_column = policy.phone_column if policy else 'phone_number'
+        if phone_column is None:
+            raise ValueError(f"La tabla {table_name} no tiene columna de número para filtrar")
+
+    for year in sorted(os.listdir(root)):
+        for month in sorted(os.listdir(os.path.join(root, year))):
+            for name in sorted(os.listdir(os.path.join(root, year, month))):
+                if not name.endswith('.jsonl.gz'):
+                    continue
+                try:
+                    day = date(int(year), int(month), int(name.split('.')[0]))
+                except ValueError:
+                    continue
+                if (start and day < start) or (end and day > end):
+                    continue
+
+                seen = set()
+                with gzip.open(os.path.join(root, year, month, name), 'rt', encoding='utf-8') as fh:
+                    for line in fh:
+                        if phone_number and f'"{phone_number}"' not in line:
+                            continue
+                        row = json.loads(line)
+                        if phone_number and row.get(phone_column) != phone_number:
+                            continue
+                        row_key = row.get(key_column)
+                        if row_key in seen:
+                            continue
+                        seen.add(row_key)
+                        yield row
@@ -0,0 +1,227 @@
+"""
+Carga masiva de contactos, mensajes e interacciones desde CSV o JSONL
+En PostgreSQL usa COPY ... FROM STDIN (psycopg2) por lotes; en otros motores, INSERT con
+executemany. La entrada se lee en streaming y solo se mantiene en memoria el lote actual
+"""
+import csv
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, JSON, Numeric, Table, insert
+from sqlalchemy.engine import Engine
+
+from database.connection import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Destinos admitidos por la CLI -> tabla
+LOAD_TARGETS = {
+    'contacts': 'contacts',
+    'messages': 'messages',
+    'interactions': 'chatbot_interactions'
+}
+
+# Clave con la que csv.DictReader agrupa los campos de más de una fila respecto a la cabecera
+CSV_EXTRA_FIELDS = '(campos sin cabecera)'
+
+
+@contextmanager
+def _open_input(path: str) -> Iterator[TextIO]:
+    if path == '-':
+        yield sys.stdin
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as fh:
+        yield fh
+
+
+def iter_input(path: str, fmt: str = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lee filas de un fichero CSV (con cabecera) o JSONL de una en una
+    Args:
+        path: Ruta del fichero ('-' para la entrada estándar)
+        fmt: 'csv' o 'jsonl' (por defecto según la extensión)
+    Yields:
+        dict: Fila columna -> valor
+    """
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Formato no soportado: {fmt}")
+
+    with _open_input(path) as fh:
+        if fmt == 'csv':
+            for row in csv.DictReader(fh, restkey=CSV_EXTRA_FIELDS):
+                # En CSV el campo vacío es NULL
+                yield {key: (value if value != '' else None) for key, value in row.items()}
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _fill_defaults(table: Table, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Aplica a los valores ausentes o NULL los defaults de Python del modelo (id UUIDv7, created_at...)"""
+    for col in table.columns:
+        if row.get(col.name) is not None or col.default is None:
+            continue
+        if col.default.is_scalar:
+            row[col.name] = col.default.arg
+        elif col.default.is_callable:
+            row[col.name] = col.default.arg(None)
+    return row
+
+
+def _coerce(col, value: Any) -> Any:
+    """Convierte texto de la entrada al tipo Python de la columna (ruta executemany)"""
+    if value is None or not isinstance(value, str):
+        return value
+    col_type = col.type
+    if isinstance(col_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(col_type, Date):
+        return date.fromisoformat(value)
+    if isinstance(col_type, Boolean):
+        return value.strip().lower() in ('1', 'true', 't', 'yes', 'si', 'sí')
+    if isinstance(col_type, Integer):
+        return int(value)
+    if isinstance(col_type, (Float, Numeric)):
+        return float(value)
+    if isinstance(col_type, JSON):
+        return json.loads(value)
+    return value
+
+
+def _copy_field(value: Any) -> str:
+    """Campo CSV de COPY: vacío sin comillas es NULL, todo lo demás va entre comillas"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    elif not isinstance(value, str):
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _copy_batch(engine: Engine, table: Table, columns: List[str], batch: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write(','.join(_copy_field(row.get(name)) for name in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    quoted = ', '.join(f'"{name}"' for name in columns)
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.copy_expert(f'COPY "{table.name}" ({quoted}) FROM STDIN WITH (FORMAT csv)', buffer)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def _insert_batch(engine: Engine, table: Table, columns: List[str], batch: List[Dict[str, Any]]) -> None:
+    params = [{name: _coerce(table.c[name], row.get(name)) for name in columns} for row in batch]
+    with engine.begin() as conn:
+        conn.execute(insert(table), params)
+
+
+def load_rows(table: Table, rows: Iterable[Dict[str, Any]], engine: Engine = None,
+              batch_size: int = None, use_copy: bool = None) -> Dict[str, Any]:
+    """
+    Carga filas en una tabla por lotes, una transacción por lote
+    Args:
+        table: Tabla destino
+        rows: Filas columna -> valor (las columnas desconocidas se ignoran)
+        engine: Engine de base de datos (por defecto db.engine)
+        batch_size: Filas por lote (por defecto BULK_LOAD_BATCH_SIZE)
+        use_copy: Forzar o desactivar COPY (por defecto, si el motor es PostgreSQL con psycopg2)
+    Returns:
+        dict: Tabla, método, filas cargadas, lotes, columnas ignoradas, segundos y filas/s
+    """
+    from config.default import DefaultConfig
+
+    engine = engine or db.engine
+    batch_size = max(1, batch_size or DefaultConfig.BULK_LOAD_BATCH_SIZE)
+    if use_copy is None:
+        use_copy = engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+    write_batch = _copy_batch if use_copy else _insert_batch
+
+    result = {
+        'table': table.name,
+        'method': 'copy' if use_copy else 'executemany',
+        'loaded': 0,
+        'batches': 0,
+        'ignored_columns': [],
+        'elapsed_seconds': 0.0,
+        'rows_per_second': 0.0
+    }
+    ignored = set()
+
+    def flush(batch: List[Dict[str, Any]]) -> None:
+        # executemany y COPY necesitan el mismo conjunto de columnas en todo el lote
+        columns = sorted({name for row in batch for name in row})
+        write_batch(engine, table, columns, batch)
+        result['loaded'] += len(batch)
+        result['batches'] += 1
+
+    start = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        known = {}
+        for key, value in row.items():
+            if isinstance(key, str) and key in table.c:
+                known[key] = value
+            else:
+                ignored.add(str(key))
+        batch.append(_fill_defaults(table, known))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    elapsed = time.perf_counter() - start
+    result['ignored_columns'] = sorted(ignored)
+    result['elapsed_seconds'] = round(elapsed, 3)
+    result['rows_per_second'] = round(result['loaded'] / elapsed, 1) if elapsed > 0 else 0.0
+
+    logger.info(
+        f"Carga masiva {table.name} ({result['method']}): {result['loaded']} filas en "
+        f"{result['batches']} lotes ({result['rows_per_second']} filas/s)"
+    )
+    return result
+
+
+def bulk_load(target: str, path: str, fmt: str = None, engine: Engine = None,
+              batch_size: int = None, table: Optional[Table] = None) -> Dict[str, Any]:
+    """
+    Carga un fichero CSV o JSONL en la tabla de un destino
+    Args:
+        target: 'contacts', 'messages' o 'interactions'
+        path: Ruta del fichero ('-' para la entrada estándar)
+        fmt: 'csv' o 'jsonl' (por defecto según la extensión)
+        engine: Engine de base de datos (por defecto db.engine)
+        batch_size: Filas por lote (por defecto BULK_LOAD_BATCH_SIZE)
+        table: Tabla destino explícita (por defecto la del modelo del destino)
+    Returns:
+        dict: Resultado de load_rows
+    """
+    if table is None:
+        if target not in LOAD_TARGETS:
+            raise ValueError(f"Destino no soportado: {target}. Opciones: {', '.join(LOAD_TARGETS)}")
+        import database.models  # noqa: F401  registra los modelos en los metadatos
+        table = db.metadata.tables[LOAD_TARGETS[target]]
+
+    return load_rows(table, iter_input(path, fmt), engine=engine, batch_size=batch_size)
@@ -2,15 +2,231 @@
 Configuración de conexión a base de datos y extensiones SQLAlchemy
 Gestiona conexiones, sesiones y migraciones de base de datos
 """
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
-from flask import current_app
+from sqlalchemy.pool import QueuePool, StaticPool, SingletonThreadPool
+from flask import current_app, has_app_context
+from database.query_stats import instrument_engine_queries
 import logging
 
+# Opciones que solo aplican a pools con tamaño (QueuePool)
+_SIZED_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_use_lifo')
+
+# Registro de engines por URL, compartido por todo el proceso
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[int, sessionmaker] = {}
+_pool_metrics: Dict[str, Dict[str, Any]] = {}
+_registry_lock = threading.Lock()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide el tiempo de espera al obtener una conexión del pool"""
+
+    _metrics: Optional[Dict[str, Any]] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self._metrics is not None:
+                wait_ms = (time.perf_counter() - start) * 1000
+                self._metrics['wait_count'] += 1
+                self._metrics['wait_ms_total'] += wait_ms
+                if wait_ms > self._metrics['wait_ms_max']:
+                    self._metrics['wait_ms_max'] = wait_ms
+
+    def recreate(self):
+        # dispose() recrea el pool: conservar las métricas acumuladas
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        return pool
+
+
+def _registry_key(url) -> str:
+    """Clave del registro: URL completa renderizada (incluye credenciales)"""
+    return make_url(url).render_as_string(hide_password=False)
+
+
+def _prepare_engine_options(url, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Normaliza las opciones del engine según el tipo de pool
+    Args:
+        url: URL de la base de datos
+        options: Opciones de SQLALCHEMY_ENGINE_OPTIONS
+    Returns:
+        dict: Opciones listas para create_engine
+    """
+    options = dict(options or {})
+    options.pop('url', None)
+    sa_url = make_url(url)
+
+    is_sqlite_memory = sa_url.get_backend_name() == 'sqlite' and sa_url.database in (None, '', ':memory:')
+    if is_sqlite_memory and 'poolclass' not in options:
+        options['poolclass'] = StaticPool
+        options.setdefault('connect_args', {})['check_same_thread'] = False
+
+    poolclass = options.get('poolclass')
+    if poolclass in (StaticPool, SingletonThreadPool):
+        # Estos pools no aceptan opciones de tamaño
+        for key in _SIZED_POOL_OPTIONS:
+            options.pop(key, None)
+    elif poolclass is None:
+        options['poolclass'] = TimedQueuePool
+
+    return options
+
+
+def _new_metrics() -> Dict[str, Any]:
+    return {
+        'connects': 0,
+        'checkouts': 0,
+        'checkins': 0,
+        'invalidated': 0,
+        'wait_count': 0,
+        'wait_ms_total': 0.0,
+        'wait_ms_max': 0.0
+    }
+
+
+def _instrument_engine(engine: Engine, metrics: Dict[str, Any]) -> None:
+    """Registra eventos del pool para contar conexiones y checkouts"""
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        metrics['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics['checkouts'] += 1
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics['checkins'] += 1
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics['invalidated'] += 1
+
+
+def get_engine(url, options: Optional[Dict[str, Any]] = None) -> Engine:
+    """
+    Obtiene el engine compartido para una URL, creándolo una sola vez por proceso
+    Args:
+        url: URL de la base de datos
+        options: Opciones de engine (SQLALCHEMY_ENGINE_OPTIONS), usadas solo al crearlo
+    Returns:
+        Engine: Engine de SQLAlchemy con su pool de conexiones
+    """
+    key = _registry_key(url)
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _registry_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+
+        engine_options = _prepare_engine_options(url, options)
+        metrics = _new_metrics()
+        engine = create_engine(url, **engine_options)
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool._metrics = metrics
+
+        _instrument_engine(engine, metrics)
+        instrument_engine_queries(engine)
+        _engines[key] = engine
+        _pool_metrics[key] = metrics
+        logging.info(f"Engine de base de datos creado: {engine.url.render_as_string(hide_password=True)}")
+        return engine
+
+
+def get_session_factory(engine: Engine) -> sessionmaker:
+    """
+    Obtiene el sessionmaker cacheado para un engine
+    Args:
+        engine: Engine de SQLAlchemy
+    Returns:
+        sessionmaker: Fábrica de sesiones ligada al engine
+    """
+    factory = _session_factories.get(id(engine))
+    if factory is None:
+        with _registry_lock:
+            factory = _session_factories.get(id(engine))
+            if factory is None:
+                factory = sessionmaker(bind=engine)
+                _session_factories[id(engine)] = factory
+    return factory
+
+
+def get_pool_metrics() -> List[Dict[str, Any]]:
+    """
+    Obtiene métricas de los pools de conexiones registrados
+    Returns:
+        list: Estado y contadores de cada engine (checkouts, esperas, tamaño)
+    """
+    result = []
+    for key, engine in list(_engines.items()):
+        metrics = dict(_pool_metrics.get(key, {}))
+        pool = engine.pool
+        info = {
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool_class': type(pool).__name__,
+            'connects': metrics.get('connects', 0),
+            'checkouts': metrics.get('checkouts', 0),
+            'checkins': metrics.get('checkins', 0),
+            'invalidated': metrics.get('invalidated', 0)
+        }
+        if isinstance(pool, QueuePool):
+            wait_count = metrics.get('wait_count', 0)
+            info.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checked_in': pool.checkedin(),
+                'wait_ms_avg': round(metrics.get('wait_ms_total', 0.0) / wait_count, 3) if wait_count else 0.0,
+                'wait_ms_max': round(metrics.get('wait_ms_max', 0.0), 3)
+            })
+        result.append(info)
+    return result
+
+
+def _dispose_engines_after_fork() -> None:
+    """
+    Descarta los pools heredados tras un fork (p. ej. workers de gunicorn)
+    Las conexiones del padre no se cierran: solo se abandonan en el hijo
+    """
+    for engine in list(_engines.values()):
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+
+class RegistrySQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy que obtiene sus engines del registro compartido"""
+
+    def init_app(self, app):
+        super().init_app(app)
+        from database.replica import close_read_session
+        app.teardown_appcontext(close_read_session)
+
+    def _make_engine(self, bind_key, options, app):
+        return get_engine(options['url'], options)
+
+
 # Inicializar SQLAlchemy y Migrate
-db = SQLAlchemy()
+db = RegistrySQLAlchemy()
 migrate = Migrate()
 
 def init_database(app):
@@ -38,22 +254,27 @@ def init_database(app):
                 logging.info("Tablas SQLite creadas/verificadas")
         elif 'postgresql' in database_uri:
             logging.info("Usando PostgreSQL - tablas ya creadas con script SQL")
+    
+    # Crear por adelantado las particiones mensuales (solo PostgreSQL)
+    from database.partitions import start_partition_maintenance
+    start_partition_maintenance(app)
 
 def get_db_session():
     """
     Obtiene una sesión de base de datos independiente para operaciones fuera del contexto Flask
+    Usa el engine compartido del proceso; no crea pools nuevos por llamada
     Returns:
         Session: Sesión de SQLAlchemy
     """
-    if current_app:
-        # Si estamos en contexto Flask, usar la configuración de la app
-        engine = create_engine(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    if has_app_context():
+        # Si estamos en contexto Flask, usar el mismo engine que db.session
+        engine = db.engine
     else:
         # Fallback para casos sin contexto
         database_url = os.getenv('DATABASE_URL', 'sqlite:///whatsapp_dev.db')
-        engine = create_engine(database_url)
+        engine = get_engine(database_url)
     
-    Session = sessionmaker(bind=engine)
+    Session = get_session_factory(engine)
     return Session()
 
 def close_db_session(session):
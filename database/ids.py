@@ -0,0 +1,63 @@
+"""
+Identificadores UUID ordenados por tiempo (UUIDv7, RFC 9562)
+Los 48 bits altos son el timestamp Unix en milisegundos, así que las inserciones nuevas
+caen al final del índice B-tree de la clave primaria en lugar de en páginas aleatorias
+"""
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+# 12 bits de contador (rand_a) para ordenar los IDs generados en el mismo milisegundo
+_COUNTER_MAX = 0xFFF
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Genera un UUIDv7 monótono dentro del proceso
+    Dentro del mismo milisegundo incrementa un contador de 12 bits que arranca en un valor
+    aleatorio de la mitad inferior; si se agota, toma prestado el milisegundo siguiente
+    Returns:
+        uuid.UUID: Identificador versión 7
+    """
+    global _last_ms, _counter
+
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = secrets.randbits(11)
+        else:
+            # Mismo milisegundo o reloj hacia atrás: mantener el orden
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = secrets.randbits(11)
+        timestamp_ms, counter = _last_ms, _counter
+
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | secrets.randbits(62)
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7_datetime(value: uuid.UUID) -> datetime:
+    """
+    Extrae el instante de creación de un UUIDv7
+    Args:
+        value: UUID versión 7
+    Returns:
+        datetime: Instante UTC (precisión de milisegundos)
+    """
+    if value.version != 7:
+        raise ValueError(f"No es un UUIDv7: {value}")
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
@@ -3,6 +3,7 @@ Modelos de base de datos para el microservicio WhatsApp API
 Define la estructura de datos para mensajes, contactos, webhooks y líneas de mensajería
 """
 from database.connection import db
+from database.ids import uuid7
 from datetime import datetime, date
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy import func
@@ -16,7 +17,8 @@ class BaseModel(db.Model):
     """
     __abstract__ = True
     
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # UUIDv7: ordenado por tiempo para que los INSERT no fragmenten el índice de la PK
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(
         db.DateTime, 
@@ -187,6 +189,51 @@ class Message(BaseModel):
     def __repr__(self):
         return f'<Message {self.whatsapp_message_id}: {self.message_type} to {self.phone_number}>'
 
+class ConversationSummary(db.Model):
+    """
+    Resumen por conversación (línea + número) para las vistas de bandeja de entrada
+    Se mantiene incrementalmente con cada mensaje entrante/saliente; 'flask rebuild-conversations'
+    lo regenera desde el historial. Clave natural compuesta, sin UUID propio
+    """
+    __tablename__ = 'conversation_summaries'
+    
+    # Línea de mensajería ('' si el mensaje no tiene línea) y número del contacto
+    line_id = db.Column(db.String(50), primary_key=True, default='')
+    phone_number = db.Column(db.String(20), primary_key=True)
+    
+    # Último mensaje de la conversación
+    last_message_id = db.Column(db.String(255))
+    last_message_preview = db.Column(db.String(255))
+    last_message_type = db.Column(db.String(50))
+    last_direction = db.Column(db.String(10))
+    last_status = db.Column(db.String(20))
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    
+    # Contadores
+    unread_count = db.Column(db.Integer, nullable=False, default=0)  # entrantes sin responder
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Representación para la API de bandeja de entrada"""
+        return {
+            'line_id': self.line_id or None,
+            'phone_number': self.phone_number,
+            'last_message_id': self.last_message_id,
+            'last_message_preview': self.last_message_preview,
+            'last_message_type': self.last_message_type,
+            'last_direction': self.last_direction,
+            'last_status': self.last_status,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'unread_count': self.unread_count,
+            'message_count': self.message_count
+        }
+    
+    def __repr__(self):
+        return f'<ConversationSummary {self.line_id}/{self.phone_number}: {self.unread_count} sin leer>'
+
 class Contact(BaseModel):
     """
     Modelo para contactos de WhatsApp
@@ -304,10 +351,15 @@ class MediaFile(BaseModel):
 
 # Índices para optimización de consultas
 db.Index('idx_messages_phone_created', Message.phone_number, Message.created_at)
+db.Index('idx_messages_created_id', Message.created_at.desc(), Message.id.desc())
 db.Index('idx_messages_status_direction', Message.status, Message.direction)
 db.Index('idx_webhook_events_type_processed', WebhookEvent.event_type, WebhookEvent.processed)
 db.Index('idx_contacts_last_seen', Contact.last_seen)
 db.Index('idx_media_files_type_downloaded', MediaFile.file_type, MediaFile.downloaded)
+db.Index('idx_conversation_summaries_inbox', ConversationSummary.line_id,
+         ConversationSummary.last_message_at.desc(), ConversationSummary.phone_number.desc())
+db.Index('idx_conversation_summaries_recent', ConversationSummary.last_message_at.desc(),
+         ConversationSummary.phone_number.desc(), ConversationSummary.line_id.desc())
 
 
 class ConversationFlow(BaseModel):
@@ -346,6 +398,17 @@ class ConversationFlow(BaseModel):
         })
         return data
 
+class FlowRevision(db.Model):
+    """Revisión global de los flujos; sube con cada cambio que afecta al cerebro RiveScript"""
+    __tablename__ = 'conversation_flow_revision'
+    
+    id = db.Column(db.Integer, primary_key=True, default=1)
+    revision = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FlowRevision {self.revision}>'
+
 class ConversationContext(BaseModel):
     """Modelo para contexto de conversaciones de usuarios"""
     __tablename__ = 'conversation_contexts'
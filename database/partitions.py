@@ -0,0 +1,296 @@
+"""
+Particionado mensual por rango (created_at) de las tablas de series temporales en PostgreSQL
+Crea particiones por adelantado y aplica retención separando (DETACH) o eliminando
+(DROP) particiones completas en lugar de borrar filas
+"""
+import re
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from database.connection import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tablas particionadas por mes sobre created_at
+PARTITIONED_TABLES = ('messages', 'webhook_events', 'chatbot_interactions')
+
+_PARTITION_NAME = re.compile(r'^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+# Clave del advisory lock que serializa el mantenimiento entre workers
+_MAINTENANCE_LOCK_KEY = 7203114
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    """
+    Obtiene el primer día del mes de una fecha, desplazado en meses
+    Args:
+        value: Fecha de referencia
+        offset: Meses a sumar (negativo para restar)
+    Returns:
+        date: Primer día del mes resultante
+    """
+    index = value.year * 12 + (value.month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Nombre de la partición mensual, p. ej. messages_p2025_01"""
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_ddl(table: str, month: date) -> str:
+    """
+    Genera el DDL de la partición mensual de una tabla
+    Args:
+        table: Tabla padre particionada
+        month: Primer día del mes de la partición
+    Returns:
+        str: Sentencia CREATE TABLE ... PARTITION OF
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+    )
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    """
+    Indica si una tabla existe y está particionada
+    Args:
+        conn: Conexión abierta
+        table: Nombre de la tabla
+    Returns:
+        bool: True si es una tabla particionada
+    """
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {'table': table}
+    ).scalar()
+    return relkind == 'p'
+
+
+def list_partitions(conn: Connection, table: str) -> List[Dict[str, Any]]:
+    """
+    Lista las particiones mensuales adjuntas a una tabla
+    Args:
+        conn: Conexión abierta
+        table: Tabla padre
+    Returns:
+        list: Diccionarios con name y month, ordenados por mes
+    """
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {'table': table}).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_NAME.match(name)
+        if match and match.group('table') == table:
+            partitions.append({
+                'name': name,
+                'month': date(int(match.group('year')), int(match.group('month')), 1)
+            })
+    return sorted(partitions, key=lambda item: item['month'])
+
+
+def ensure_partitions(engine: Engine = None, months_ahead: int = None,
+                      tables: List[str] = None, today: date = None) -> List[str]:
+    """
+    Crea las particiones del mes actual y de los próximos meses si no existen
+    Args:
+        engine: Engine de base de datos (por defecto db.engine)
+        months_ahead: Meses a crear por adelantado (por defecto PARTITION_MONTHS_AHEAD)
+        tables: Tablas a mantener (por defecto PARTITIONED_TABLES)
+        today: Fecha de referencia (para tests)
+    Returns:
+        list: Particiones creadas
+    """
+    from config.default import DefaultConfig
+
+    engine = engine or db.engine
+    if engine.dialect.name != 'postgresql':
+        return []
+
+    months_ahead = DefaultConfig.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(today or datetime.utcnow().date())
+    created = []
+
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _MAINTENANCE_LOCK_KEY})
+
+        for table in tables or PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                continue
+
+            existing = {item['name'] for item in list_partitions(conn, table)}
+            for offset in range(months_ahead + 1):
+                month = month_start(current, offset)
+                name = partition_name(table, month)
+                if name not in existing:
+                    moved = _create_partition(conn, table, month)
+                    created.append(name)
+                    if moved:
+                        logger.warning(f"{moved} filas movidas de {table}_default a {name}")
+
+    if created:
+        logger.info(f"Particiones creadas: {', '.join(created)}")
+    return created
+
+
+def _create_partition(conn: Connection, table: str, month: date) -> int:
+    """
+    Crea la partición de un mes sacando antes de la partición DEFAULT las filas de ese mes
+    PostgreSQL rechaza la nueva partición si la DEFAULT ya contiene filas de su rango, así
+    que se copian a una tabla temporal, se borran de la DEFAULT y se reinsertan por la
+    tabla padre una vez creada la partición (todo en la transacción del llamador)
+    Args:
+        conn: Conexión con transacción abierta
+        table: Tabla padre particionada
+        month: Primer día del mes
+    Returns:
+        int: Filas movidas desde la partición DEFAULT
+    """
+    default = f"{table}_default"
+    bounds = {'start': month, 'end': month_start(month, 1)}
+    in_range = "created_at >= :start AND created_at < :end"
+
+    moved = 0
+    if conn.execute(text("SELECT to_regclass(:name)"), {'name': default}).scalar() is not None:
+        # Bloquear la DEFAULT para que no entren filas del mes mientras se mueven
+        conn.execute(text(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE"))
+        moved = conn.execute(text(f"SELECT count(*) FROM {default} WHERE {in_range}"), bounds).scalar()
+
+    if not moved:
+        conn.execute(text(partition_ddl(table, month)))
+        return 0
+
+    # Columnas no generadas (search_vector se recalcula al reinsertar)
+    columns = ', '.join(conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER' "
+        "ORDER BY ordinal_position"
+    ), {'table': table}).scalars().all())
+    staging = f"{table}_default_moving"
+    conn.execute(text(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                      f"SELECT {columns} FROM {default} WHERE {in_range}"), bounds)
+    conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+    conn.execute(text(partition_ddl(table, month)))
+    conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}"))
+    conn.execute(text(f"DROP TABLE {staging}"))
+    return moved
+
+
+def apply_partition_retention(engine: Engine = None, retention_months: Dict[str, int] = None,
+                              mode: str = None, dry_run: bool = False,
+                              today: date = None) -> List[Dict[str, Any]]:
+    """
+    Separa o elimina las particiones completas más antiguas que la retención
+    Args:
+        engine: Engine de base de datos (por defecto db.engine)
+        retention_months: Meses a conservar por tabla (por defecto PARTITION_RETENTION_MONTHS)
+        mode: 'detach' (conserva la tabla separada para archivarla) o 'drop'
+        dry_run: Si True, solo informa qué particiones se procesarían
+        today: Fecha de referencia (para tests)
+    Returns:
+        list: Particiones procesadas con tabla, nombre, mes y acción
+    """
+    from config.default import DefaultConfig
+
+    engine = engine or db.engine
+    if engine.dialect.name != 'postgresql':
+        return []
+
+    retention_months = retention_months or DefaultConfig.PARTITION_RETENTION_MONTHS
+    mode = mode or DefaultConfig.PARTITION_RETENTION_MODE
+    if mode not in ('detach', 'drop'):
+        raise ValueError("mode debe ser 'detach' o 'drop'")
+
+    current = month_start(today or datetime.utcnow().date())
+    processed = []
+
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _MAINTENANCE_LOCK_KEY})
+
+        for table, months in retention_months.items():
+            if not months or months <= 0 or not is_partitioned(conn, table):
+                continue
+
+            # Se conservan el mes actual y los (months - 1) anteriores
+            cutoff = month_start(current, -(months - 1))
+            for partition in list_partitions(conn, table):
+                if partition['month'] >= cutoff:
+                    continue
+
+                processed.append({'table': table, 'partition': partition['name'],
+                                  'month': partition['month'].isoformat(), 'action': mode})
+                if dry_run:
+                    continue
+
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition['name']}"))
+                if mode == 'drop':
+                    conn.execute(text(f"DROP TABLE {partition['name']}"))
+                logger.info(f"Partición {partition['name']} procesada ({mode})")
+
+    return processed
+
+
+class PartitionMaintainer:
+    """Hilo en segundo plano que crea particiones futuras periódicamente"""
+
+    def __init__(self, app, interval_hours: float = 24):
+        """
+        Inicializa el mantenedor de particiones
+        Args:
+            app: Aplicación Flask (para el contexto de base de datos)
+            interval_hours: Horas entre ejecuciones
+        """
+        self.app = app
+        self.interval_seconds = max(60.0, interval_hours * 3600)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Arranca el hilo de mantenimiento"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='partition-maintainer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo de mantenimiento"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    ensure_partitions()
+            except Exception as e:
+                logger.error(f"Error en mantenimiento de particiones: {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+def start_partition_maintenance(app) -> Optional[PartitionMaintainer]:
+    """
+    Arranca el mantenimiento automático de particiones si aplica
+    Args:
+        app: Aplicación Flask
+    Returns:
+        PartitionMaintainer o None si está deshabilitado o no es PostgreSQL
+    """
+    if not app.config.get('PARTITION_MAINTENANCE_ENABLED', True):
+        return None
+    if 'postgresql' not in app.config.get('SQLALCHEMY_DATABASE_URI', ''):
+        return None
+
+    maintainer = PartitionMaintainer(app, app.config.get('PARTITION_MAINTENANCE_INTERVAL_HOURS', 24))
+    maintainer.start()
+    app.extensions['partition_maintainer'] = maintainer
+    return maintainer
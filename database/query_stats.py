@@ -0,0 +1,266 @@
+"""
+Instrumentación de SQL por request y por webhook
+Hooks de engine (before/after_cursor_execute) que cuentan consultas y tiempo de base de
+datos dentro de cada ámbito (scope) activo, detectan sentencias idénticas repetidas (N+1)
+y guardan muestras de consultas lentas con la forma de sus parámetros
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+_active_scopes: ContextVar[Tuple['QueryScope', ...]] = ContextVar('active_query_scopes', default=())
+
+# Agregados del proceso por nombre de ámbito (endpoint o 'webhook')
+_metrics_lock = threading.Lock()
+_aggregates: Dict[str, Dict[str, Any]] = {}
+# Sentencias N+1 por (ámbito, sentencia), acotadas como las muestras lentas: al llegar al
+# máximo sale la vista hace más tiempo
+_N_PLUS_ONE_MAX = 200
+_n_plus_one: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+_slow_samples: deque = deque(maxlen=50)
+
+
+def _settings() -> Dict[str, Any]:
+    from config.default import DefaultConfig
+
+    return {
+        'enabled': DefaultConfig.SQL_METRICS_ENABLED,
+        'slow_ms': DefaultConfig.SQL_SLOW_QUERY_MS,
+        'n_plus_one': DefaultConfig.SQL_N_PLUS_ONE_THRESHOLD
+    }
+
+
+def _param_shape(parameters: Any, executemany: bool) -> Any:
+    """Describe los parámetros por tipo, sin exponer valores"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return {'rows': len(parameters), 'row': _param_shape(first, False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryScope:
+    """Consultas ejecutadas durante un request o un webhook"""
+
+    def __init__(self, name: str, key: Optional[str] = None):
+        """
+        Inicializa el ámbito
+        Args:
+            name: Nombre agregable (endpoint, 'webhook')
+            key: Identificador de la ejecución (g.request_id)
+        """
+        self.name = name
+        self.key = key
+        self.queries = 0
+        self.db_ms = 0.0
+        self.statements: Dict[str, List[float]] = {}
+        self.slow: List[Dict[str, Any]] = []
+
+    def record(self, statement: str, elapsed_ms: float, sample: Optional[Dict[str, Any]]) -> None:
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        stats = self.statements.setdefault(statement, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        if sample is not None:
+            self.slow.append(sample)
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """
+        Sentencias idénticas ejecutadas al menos threshold veces (posible N+1)
+        Args:
+            threshold: Repeticiones mínimas
+        Returns:
+            list: Sentencia, repeticiones y tiempo total
+        """
+        return [
+            {'statement': statement, 'count': count, 'db_ms': round(total, 3)}
+            for statement, (count, total) in self.statements.items()
+            if count >= threshold
+        ]
+
+    def summary(self, threshold: int) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'key': self.key,
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 3),
+            'n_plus_one': self.repeated(threshold),
+            'slow_queries': len(self.slow)
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+    scopes = _active_scopes.get()
+    if not scopes:
+        return
+
+    sample = None
+    settings = _settings()
+    if elapsed_ms >= settings['slow_ms']:
+        # Los parámetros compilados conservan los nombres aunque el driver sea posicional
+        compiled = getattr(context, 'compiled_parameters', None)
+        if compiled:
+            parameters = compiled if executemany else compiled[0]
+        sample = {
+            'statement': statement,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'params': _param_shape(parameters, executemany),
+            'scope': scopes[0].name,
+            'key': scopes[0].key
+        }
+        with _metrics_lock:
+            _slow_samples.append(sample)
+        logger.warning(f"Consulta lenta ({elapsed_ms:.1f} ms) en {scopes[0].name}: {statement[:200]}")
+
+    for scope in scopes:
+        scope.record(statement, elapsed_ms, sample)
+
+
+def instrument_engine_queries(engine: Engine) -> None:
+    """
+    Registra los hooks de ejecución en un engine (una vez por engine)
+    Args:
+        engine: Engine de SQLAlchemy
+    """
+    if not _settings()['enabled'] or event.contains(engine, 'after_cursor_execute', _after_cursor_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def start_scope(name: str, key: Optional[str] = None) -> Tuple[QueryScope, Any]:
+    """
+    Abre un ámbito de medición; los ámbitos anidados miden las mismas consultas
+    Args:
+        name: Nombre agregable
+        key: Identificador de la ejecución
+    Returns:
+        tuple: (ámbito, token para end_scope)
+    """
+    scope = QueryScope(name, key)
+    token = _active_scopes.set(_active_scopes.get() + (scope,))
+    return scope, token
+
+
+def end_scope(scope: QueryScope, token: Any = None) -> Dict[str, Any]:
+    """
+    Cierra un ámbito, lo agrega a las métricas y avisa de posibles N+1
+    Args:
+        scope: Ámbito abierto con start_scope
+        token: Token devuelto por start_scope
+    Returns:
+        dict: Resumen del ámbito
+    """
+    if token is not None:
+        try:
+            _active_scopes.reset(token)
+        except ValueError:
+            # Cerrado desde otro contexto (p. ej. teardown): quitarlo de la pila
+            _active_scopes.set(tuple(s for s in _active_scopes.get() if s is not scope))
+
+    threshold = _settings()['n_plus_one']
+    summary = scope.summary(threshold)
+
+    with _metrics_lock:
+        agg = _aggregates.setdefault(scope.name, {
+            'executions': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0, 'n_plus_one': 0
+        })
+        agg['executions'] += 1
+        agg['queries'] += scope.queries
+        agg['db_ms'] += scope.db_ms
+        agg['max_queries'] = max(agg['max_queries'], scope.queries)
+        if summary['n_plus_one']:
+            agg['n_plus_one'] += 1
+        for item in summary['n_plus_one']:
+            key = (scope.name, item['statement'])
+            entry = _n_plus_one.get(key)
+            if entry is None:
+                entry = _n_plus_one[key] = {
+                    'scope': scope.name, 'statement': item['statement'], 'occurrences': 0, 'max_repeats': 0
+                }
+                if len(_n_plus_one) > _N_PLUS_ONE_MAX:
+                    _n_plus_one.popitem(last=False)
+            else:
+                _n_plus_one.move_to_end(key)
+            entry['occurrences'] += 1
+            entry['max_repeats'] = max(entry['max_repeats'], item['count'])
+
+    for item in summary['n_plus_one']:
+        logger.warning(
+            f"Posible N+1 en {scope.name} ({scope.key}): {item['count']} ejecuciones de "
+            f"{item['statement'][:200]}"
+        )
+    return summary
+
+
+@contextmanager
+def query_scope(name: str, key: Optional[str] = None) -> Iterator[QueryScope]:
+    """
+    Context manager que mide las consultas de un bloque
+    Args:
+        name: Nombre agregable (p. ej. 'webhook')
+        key: Identificador de la ejecución (p. ej. g.request_id)
+    """
+    scope, token = start_scope(name, key)
+    try:
+        yield scope
+    finally:
+        end_scope(scope, token)
+
+
+def get_query_metrics() -> Dict[str, Any]:
+    """
+    Métricas agregadas de SQL del proceso
+    Returns:
+        dict: Agregados por ámbito, sentencias N+1 más frecuentes y últimas consultas lentas
+    """
+    with _metrics_lock:
+        scopes = {}
+        for name, agg in _aggregates.items():
+            executions = agg['executions'] or 1
+            scopes[name] = {
+                **agg,
+                'db_ms': round(agg['db_ms'], 3),
+                'avg_queries': round(agg['queries'] / executions, 2),
+                'avg_db_ms': round(agg['db_ms'] / executions, 3)
+            }
+        n_plus_one = sorted(_n_plus_one.values(), key=lambda item: item['occurrences'], reverse=True)[:20]
+        slow = list(_slow_samples)
+
+    settings = _settings()
+    return {
+        'scopes': scopes,
+        'n_plus_one': [dict(item) for item in n_plus_one],
+        'slow_queries': slow,
+        'thresholds': {'slow_query_ms': settings['slow_ms'], 'n_plus_one_repeats': settings['n_plus_one']}
+    }
+
+
+def reset_query_metrics() -> None:
+    """Reinicia los agregados (tests y despliegues)"""
+    with _metrics_lock:
+        _aggregates.clear()
+        _n_plus_one.clear()
+        _slow_samples.clear()
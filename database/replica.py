@@ -0,0 +1,171 @@
+"""
+Enrutado de lecturas a una réplica de solo lectura
+Las lecturas de los repositorios usan la réplica configurada en SQLALCHEMY_REPLICA_URI,
+salvo dentro de una unidad de trabajo o después de una escritura en el mismo contexto
+(read-your-writes), o cuando el retraso de la réplica supera REPLICA_MAX_LAG_SECONDS
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database.connection import db, get_engine, get_session_factory
+import logging
+
+logger = logging.getLogger(__name__)
+
+_lag_lock = threading.Lock()
+_lag_state: Dict[str, Any] = {'checked_at': 0.0, 'lag_seconds': None, 'error': None}
+
+_stats_lock = threading.Lock()
+_stats = {'replica_reads': 0, 'primary_reads': 0, 'sticky_reads': 0, 'lag_fallbacks': 0}
+
+
+def _bump(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get_replica_engine() -> Optional[Engine]:
+    """
+    Obtiene el engine de la réplica configurada en la aplicación actual
+    Returns:
+        Engine o None si no hay réplica configurada
+    """
+    if not has_app_context():
+        return None
+    url = current_app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not url:
+        return None
+    return get_engine(url, current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+
+
+def measure_replica_lag(engine: Engine) -> float:
+    """
+    Mide el retraso de replicación en segundos
+    Args:
+        engine: Engine de la réplica
+    Returns:
+        float: Segundos desde la última transacción aplicada (0 si no es una réplica en recuperación)
+    """
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        lag = conn.execute(text(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        )).scalar()
+    return float(lag or 0.0)
+
+
+def get_replica_lag(engine: Engine, max_age_seconds: float = None) -> Optional[float]:
+    """
+    Obtiene el retraso de la réplica, cacheado durante REPLICA_LAG_CHECK_SECONDS
+    Args:
+        engine: Engine de la réplica
+        max_age_seconds: Antigüedad máxima de la medición cacheada
+    Returns:
+        float con el retraso, o None si la réplica no responde
+    """
+    if max_age_seconds is None:
+        max_age_seconds = current_app.config.get('REPLICA_LAG_CHECK_SECONDS', 5)
+
+    now = time.monotonic()
+    if now - _lag_state['checked_at'] < max_age_seconds:
+        return _lag_state['lag_seconds']
+
+    with _lag_lock:
+        if now - _lag_state['checked_at'] < max_age_seconds:
+            return _lag_state['lag_seconds']
+        try:
+            _lag_state.update(lag_seconds=measure_replica_lag(engine), error=None)
+        except Exception as e:
+            logger.warning(f"No se pudo medir el retraso de la réplica: {e}")
+            _lag_state.update(lag_seconds=None, error=str(e))
+        _lag_state['checked_at'] = time.monotonic()
+        return _lag_state['lag_seconds']
+
+
+def mark_primary_write() -> None:
+    """Marca el contexto actual como escrito: sus lecturas siguientes van al primario"""
+    if has_app_context():
+        g._replica_sticky = True
+
+
+def get_read_session() -> Session:
+    """
+    Obtiene la sesión para lecturas según las reglas de enrutado
+    Returns:
+        Session: Sesión de la réplica, o la sesión del primario si no procede usarla
+    """
+    from database.unit_of_work import get_current_uow
+
+    uow = get_current_uow()
+    if uow is not None:
+        _bump('sticky_reads')
+        return uow.session
+
+    engine = get_replica_engine()
+    if engine is None:
+        _bump('primary_reads')
+        return db.session
+
+    if g.get('_replica_sticky'):
+        _bump('sticky_reads')
+        return db.session
+
+    lag = get_replica_lag(engine)
+    if lag is None or lag > current_app.config.get('REPLICA_MAX_LAG_SECONDS', 30):
+        _bump('lag_fallbacks')
+        return db.session
+
+    session = g.get('_replica_session')
+    if session is None:
+        session = get_session_factory(engine)(info={'replica': True})
+        g._replica_session = session
+    _bump('replica_reads')
+    return session
+
+
+def close_read_session(exception=None) -> None:
+    """Cierra la sesión de réplica del contexto actual (teardown de la aplicación)"""
+    session = g.pop('_replica_session', None)
+    if session is not None:
+        session.close()
+
+
+def get_replica_status() -> Dict[str, Any]:
+    """
+    Estado de la réplica para el health check
+    Returns:
+        dict: Si está configurada, retraso, si está en uso y contadores de enrutado
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    engine = get_replica_engine()
+    if engine is None:
+        return {'configured': False, **stats}
+
+    lag = get_replica_lag(engine, max_age_seconds=0)
+    max_lag = current_app.config.get('REPLICA_MAX_LAG_SECONDS', 30)
+    return {
+        'configured': True,
+        'url': engine.url.render_as_string(hide_password=True),
+        'lag_seconds': round(lag, 3) if lag is not None else None,
+        'max_lag_seconds': max_lag,
+        'serving_reads': lag is not None and lag <= max_lag,
+        'error': _lag_state['error'],
+        **stats
+    }
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session: Session) -> None:
+    if not session.info.get('replica'):
+        mark_primary_write()
@@ -0,0 +1,167 @@
+"""
+Retención por políticas de tabla con borrado en bloques acotados
+Cada bloque es una sola sentencia DELETE ... WHERE id IN (SELECT id ... ORDER BY id LIMIT n)
+en su propia transacción corta, con una pausa entre bloques para no saturar la base de datos.
+Si otras tablas guardan más tiempo filas que apuntan a la purgada (chatbot_interactions ->
+conversation_contexts), esas referencias se ponen a NULL en la misma transacción del bloque
+En PostgreSQL, los meses completos de las tablas particionadas se retiran antes con
+apply_partition_retention (database/partitions.py); este módulo limpia el resto
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, column, delete, func, select, table, update
+from sqlalchemy.engine import Engine
+
+from database.connection import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Política de retención de una tabla
+    """
+    table: str
+    max_age: timedelta
+    timestamp_column: str = 'created_at'
+    key_column: str = 'id'
+    # (tabla, columna) con claves foráneas hacia esta tabla sin ON DELETE
+    references: Tuple[Tuple[str, str], ...] = ()
+
+    def cutoff(self, now: datetime = None) -> datetime:
+        """Fecha límite: se eliminan las filas anteriores"""
+        return (now or datetime.utcnow()) - self.max_age
+
+
+def get_default_policies() -> List[RetentionPolicy]:
+    """
+    Construye las políticas a partir de la configuración
+    Returns:
+        list: Políticas de messages, webhook_events, chatbot_interactions y conversation_contexts
+    """
+    from config.default import DefaultConfig
+
+    days = DefaultConfig.RETENTION_DAYS
+    return [
+        RetentionPolicy('messages', timedelta(days=days['messages'])),
+        RetentionPolicy('webhook_events', timedelta(days=days['webhook_events'])),
+        RetentionPolicy('chatbot_interactions', timedelta(days=days['chatbot_interactions'])),
+        context_policy(DefaultConfig.CONTEXT_RETENTION_HOURS)
+    ]
+
+
+def context_policy(hours: int) -> RetentionPolicy:
+    """
+    Política de conversation_contexts: por última interacción, soltando las interacciones
+    (retenidas más tiempo) que apuntan a cada contexto eliminado
+    Args:
+        hours: Horas sin interacción tras las que se elimina el contexto
+    Returns:
+        RetentionPolicy: Política de la tabla
+    """
+    return RetentionPolicy('conversation_contexts', timedelta(hours=hours), timestamp_column='last_interaction',
+                           references=(('chatbot_interactions', 'context_id'),))
+
+
+def purge_table(policy: RetentionPolicy, engine: Engine = None, chunk_size: int = None,
+                throttle_ms: int = None, max_rows: int = None, dry_run: bool = False,
+                now: datetime = None) -> Dict[str, Any]:
+    """
+    Elimina las filas fuera de retención de una tabla en bloques ordenados por clave
+    Args:
+        policy: Política de retención
+        engine: Engine de base de datos (por defecto db.engine)
+        chunk_size: Filas por sentencia (por defecto RETENTION_CHUNK_SIZE)
+        throttle_ms: Pausa entre bloques en milisegundos (por defecto RETENTION_THROTTLE_MS)
+        max_rows: Máximo de filas a eliminar en esta ejecución (opcional)
+        dry_run: Si True, solo cuenta las filas afectadas
+        now: Fecha de referencia (para tests)
+    Returns:
+        dict: Tabla, fecha límite, filas eliminadas, bloques, segundos y filas/s
+    """
+    from config.default import DefaultConfig
+
+    engine = engine or db.engine
+    chunk_size = chunk_size or DefaultConfig.RETENTION_CHUNK_SIZE
+    throttle_ms = DefaultConfig.RETENTION_THROTTLE_MS if throttle_ms is None else throttle_ms
+
+    target = table(policy.table, column(policy.key_column), column(policy.timestamp_column, DateTime))
+    key = target.c[policy.key_column]
+    expired = target.c[policy.timestamp_column] < policy.cutoff(now)
+
+    result = {
+        'table': policy.table,
+        'cutoff': policy.cutoff(now).isoformat(),
+        'deleted': 0,
+        'chunks': 0,
+        'elapsed_seconds': 0.0,
+        'rows_per_second': 0.0
+    }
+
+    if dry_run:
+        with engine.connect() as conn:
+            result['expired'] = conn.execute(select(func.count()).select_from(target).where(expired)).scalar()
+        return result
+
+    start = time.perf_counter()
+    while max_rows is None or result['deleted'] < max_rows:
+        limit = chunk_size if max_rows is None else min(chunk_size, max_rows - result['deleted'])
+        batch = select(key).where(expired).order_by(key).limit(limit)
+
+        with engine.begin() as conn:
+            if policy.references:
+                # Claves fijadas una vez para soltar y borrar exactamente las mismas filas
+                batch = conn.execute(batch).scalars().all()
+                for ref_table, ref_column in policy.references:
+                    ref = table(ref_table, column(ref_column)).c[ref_column]
+                    conn.execute(update(ref.table).where(ref.in_(batch)).values({ref_column: None}))
+            else:
+                batch = batch.scalar_subquery()
+            deleted = conn.execute(delete(target).where(key.in_(batch))).rowcount
+
+        result['deleted'] += deleted
+        result['chunks'] += 1
+        if deleted < limit:
+            break
+        if throttle_ms:
+            time.sleep(throttle_ms / 1000.0)
+
+    elapsed = time.perf_counter() - start
+    result['elapsed_seconds'] = round(elapsed, 3)
+    result['rows_per_second'] = round(result['deleted'] / elapsed, 1) if elapsed > 0 else 0.0
+
+    if result['deleted']:
+        logger.info(
+            f"Retención {policy.table}: {result['deleted']} filas en {result['chunks']} bloques "
+            f"({result['rows_per_second']} filas/s)"
+        )
+    return result
+
+
+def run_retention(policies: List[RetentionPolicy] = None, tables: Optional[List[str]] = None,
+                  engine: Engine = None, **options) -> List[Dict[str, Any]]:
+    """
+    Aplica todas las políticas de retención, una tabla tras otra
+    Args:
+        policies: Políticas a aplicar (por defecto get_default_policies())
+        tables: Limitar a estas tablas (opcional)
+        engine: Engine de base de datos (por defecto db.engine)
+        **options: chunk_size, throttle_ms, max_rows, dry_run (ver purge_table)
+    Returns:
+        list: Resultado de cada tabla
+    """
+    results = []
+    for policy in policies or get_default_policies():
+        if tables and policy.table not in tables:
+            continue
+        try:
+            results.append(purge_table(policy, engine=engine, **options))
+        except Exception as e:
+            logger.error(f"Error aplicando retención en {policy.table}: {e}")
+            results.append({'table': policy.table, 'error': str(e)})
+    return results
@@ -0,0 +1,181 @@
+"""
+Búsqueda de texto completo sobre mensajes e interacciones del chatbot
+PostgreSQL: columna tsvector generada (STORED) + índice GIN
+SQLite: tablas virtuales FTS5 de contenido externo sincronizadas con triggers
+En ambos casos el índice se mantiene al insertar/actualizar/eliminar, sin reindexar
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, column, text
+from sqlalchemy.engine import Engine
+
+from app.utils.exceptions import DatabaseError
+from database.connection import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tablas indexadas: columnas de texto y peso relativo de cada una (la primera pesa más)
+SEARCH_INDEXES: Dict[str, List[str]] = {
+    'messages': ['content'],
+    'chatbot_interactions': ['user_message', 'bot_response']
+}
+
+_PG_WEIGHTS = ('A', 'B', 'C', 'D')
+
+
+def _language(language: Optional[str]) -> str:
+    """Valida la configuración de text search de PostgreSQL (se interpola en DDL)"""
+    from config.default import DefaultConfig
+
+    language = language or DefaultConfig.SEARCH_LANGUAGE
+    if not re.fullmatch(r'[a-z_]+', language):
+        raise ValueError(f"Configuración de búsqueda inválida: {language}")
+    return language
+
+
+def _postgresql_ddl(table: str, columns: List[str], language: str) -> List[str]:
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{language}'::regconfig, coalesce({col}, '')), '{_PG_WEIGHTS[i]}')"
+        for i, col in enumerate(columns)
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING GIN (search_vector)"
+    ]
+
+
+def _sqlite_ddl(table: str, columns: List[str]) -> List[str]:
+    fts = f"{table}_fts"
+    cols = ', '.join(columns)
+    new_values = ', '.join(f"new.{col}" for col in columns)
+    old_values = ', '.join(f"old.{col}" for col in columns)
+    watched = ', '.join(columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', "
+        f"content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {watched} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END",
+        # Indexar las filas que ya existían antes de crear la tabla FTS
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+    ]
+
+
+def setup_search_indexes(engine: Engine = None, language: str = None,
+                         tables: List[str] = None) -> List[str]:
+    """
+    Crea (de forma idempotente) los índices de texto completo
+    Args:
+        engine: Engine de base de datos (por defecto db.engine)
+        language: Configuración de text search de PostgreSQL (por defecto SEARCH_LANGUAGE)
+        tables: Tablas a indexar (por defecto todas las de SEARCH_INDEXES)
+    Returns:
+        list: Sentencias ejecutadas
+    Raises:
+        DatabaseError: Si el dialecto no tiene búsqueda de texto completo
+    """
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    executed = []
+
+    with engine.begin() as conn:
+        for table in tables or SEARCH_INDEXES:
+            columns = SEARCH_INDEXES[table]
+            if dialect == 'postgresql':
+                statements = _postgresql_ddl(table, columns, _language(language))
+            elif dialect == 'sqlite':
+                statements = _sqlite_ddl(table, columns)
+            else:
+                raise DatabaseError(f"Búsqueda de texto completo no soportada en {dialect}",
+                                    "setup_search_indexes")
+
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+                executed.append(statement)
+            logger.info(f"Índice de búsqueda listo para {table} ({dialect})")
+
+    return executed
+
+
+def _fts5_query(query: str) -> str:
+    """Convierte texto libre en una consulta FTS5 segura (AND de términos literales)"""
+    terms = re.findall(r'\w+', query, flags=re.UNICODE)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_ranked(model, query: str, phone_number: str = None, date_from: datetime = None,
+                  date_to: datetime = None, limit: int = 20, offset: int = 0) -> List[Tuple[Any, float]]:
+    """
+    Busca instancias de un modelo indexado ordenadas por relevancia
+    Args:
+        model: Modelo con tabla en SEARCH_INDEXES (Message o ChatbotInteraction)
+        query: Texto a buscar
+        phone_number: Filtrar por número de teléfono (opcional)
+        date_from: Fecha mínima de creación, inclusive (opcional)
+        date_to: Fecha máxima de creación, exclusiva (opcional)
+        limit: Máximo de resultados
+        offset: Resultados a omitir
+    Returns:
+        list: Tuplas (instancia, puntuación) de mayor a menor relevancia
+    Raises:
+        DatabaseError: Si el dialecto no tiene búsqueda de texto completo
+    """
+    table = model.__tablename__
+    columns = SEARCH_INDEXES[table]
+    session = db.session
+    dialect = session.get_bind().dialect.name
+
+    filters = []
+    params: Dict[str, Any] = {'limit': limit, 'offset': offset}
+    if phone_number:
+        filters.append('t.phone_number = :phone_number')
+        params['phone_number'] = phone_number
+    if date_from:
+        filters.append('t.created_at >= :date_from')
+        params['date_from'] = date_from
+    if date_to:
+        filters.append('t.created_at < :date_to')
+        params['date_to'] = date_to
+    extra = ''.join(f' AND {condition}' for condition in filters)
+
+    if dialect == 'postgresql':
+        params.update({'query': query, 'language': _language(None)})
+        sql = (
+            f"SELECT t.id, ts_rank_cd(t.search_vector, q) AS rank "
+            f"FROM {table} t, websearch_to_tsquery(CAST(:language AS regconfig), :query) q "
+            f"WHERE t.search_vector @@ q{extra} "
+            f"ORDER BY rank DESC, t.created_at DESC LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return []
+        params['query'] = match
+        fts = f"{table}_fts"
+        weights = ', '.join(str(float(len(columns) - i)) for i in range(len(columns)))
+        # bm25() es menor cuanto más relevante: se invierte el signo
+        sql = (
+            f"SELECT t.id, -bm25({fts}, {weights}) AS rank "
+            f"FROM {fts} JOIN {table} t ON t.rowid = {fts}.rowid "
+            f"WHERE {fts} MATCH :query{extra} "
+            f"ORDER BY rank DESC, t.created_at DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        raise DatabaseError(f"Búsqueda de texto completo no soportada en {dialect}", "search_ranked")
+
+    stmt = text(sql).columns(model.__table__.c.id, column('rank', Float))
+    ranked = session.execute(stmt, params).all()
+    if not ranked:
+        return []
+
+    instances = {instance.id: instance for instance in
+                 model.query.filter(model.id.in_([row.id for row in ranked])).all()}
+    return [(instances[row.id], float(row.rank)) for row in ranked if row.id in instances]
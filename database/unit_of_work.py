@@ -0,0 +1,249 @@
+"""
+Unidad de trabajo (unit of work) para agrupar escrituras en una sola transacción
+Las escrituras de los repositorios dentro de un mismo webhook o request se confirman
+con un único commit al final, o se revierten todas juntas si algo falla
+"""
+import threading
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session, scoped_session
+
+from database.connection import db, safe_commit, safe_rollback
+import logging
+
+logger = logging.getLogger(__name__)
+
+_current_uow: ContextVar[Optional['UnitOfWork']] = ContextVar('current_unit_of_work', default=None)
+
+# Métricas acumuladas del proceso
+_stats_lock = threading.Lock()
+_stats = {
+    'units': 0,
+    'commits': 0,
+    'rollbacks': 0,
+    'writes': 0,
+    'commits_saved': 0
+}
+
+
+def _bump(**counters) -> None:
+    with _stats_lock:
+        for key, value in counters.items():
+            _stats[key] += value
+
+
+class UnitOfWork(ContextDecorator):
+    """
+    Contexto transaccional para un webhook o request
+
+    Dentro del contexto, BaseRepository y FlowRepository usan la misma sesión y
+    solo hacen flush; SQLAlchemy ordena los INSERT/UPDATE/DELETE según las
+    dependencias entre tablas al hacer flush. Al salir se hace un único commit,
+    o rollback si hubo una excepción o un error de base de datos.
+    Los contextos anidados se unen a la unidad exterior; savepoint() aísla un bloque
+    que puede fallar sin revertir el resto, y on_commit() difiere efectos hasta el commit.
+    """
+
+    def __init__(self, name: str = 'unit_of_work'):
+        """
+        Inicializa la unidad de trabajo
+        Args:
+            name: Nombre descriptivo para logs (p. ej. 'webhook_message')
+        """
+        self.name = name
+        self.session: Optional[Session] = None
+        self.writes = 0
+        self.error: Optional[Exception] = None
+        self._token = None
+        self._outer: Optional['UnitOfWork'] = None
+        self._on_commit: List[Callable[[], Any]] = []
+
+    def __enter__(self) -> 'UnitOfWork':
+        outer = _current_uow.get()
+        if outer is not None:
+            # Anidado: delegar en la unidad exterior
+            self._outer = outer
+            return outer
+
+        self.session = db.session
+        self.writes = 0
+        self.error = None
+        self._on_commit = []
+        self._token = _current_uow.set(self)
+        _bump(units=1)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if self._outer is not None:
+            self._outer = None
+            return False
+
+        committed = False
+        try:
+            if exc_type is not None or self.error is not None:
+                safe_rollback(self.session)
+                _bump(rollbacks=1)
+                logger.warning(
+                    f"Unidad de trabajo '{self.name}' revertida ({self.writes} escrituras): "
+                    f"{exc_value or self.error}"
+                )
+            elif self.writes:
+                committed = safe_commit(self.session)
+                if committed:
+                    _bump(commits=1, commits_saved=self.writes - 1)
+                else:
+                    _bump(rollbacks=1)
+            else:
+                committed = True
+        finally:
+            _current_uow.reset(self._token)
+            self._token = None
+            callbacks, self._on_commit = self._on_commit, []
+        if committed:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Error tras confirmar la unidad de trabajo '{self.name}': {e}")
+        return False
+
+    def record_write(self) -> None:
+        """Registra una escritura pendiente de confirmar"""
+        self.writes += 1
+        _bump(writes=1)
+
+    def mark_failed(self, error: Exception) -> None:
+        """
+        Marca la unidad como fallida para revertirla completa al salir
+        Args:
+            error: Error de base de datos ocurrido durante una escritura
+        """
+        if self.error is None:
+            self.error = error
+
+    def on_commit(self, callback: Callable[[], Any]) -> None:
+        """
+        Ejecuta callback cuando la unidad se confirme; si se revierte se descarta
+        Args:
+            callback: Función sin argumentos
+        """
+        self._on_commit.append(callback)
+
+    @contextmanager
+    def savepoint(self) -> Iterator['UnitOfWork']:
+        """
+        Bloque con su propio SAVEPOINT: si lanza una excepción o un repositorio marca un
+        error dentro, se revierten solo sus escrituras y la unidad sigue adelante
+        Las escrituras del bloque se vuelcan al salir para que sus errores salgan aquí y
+        no en el commit final; la excepción se propaga para que el llamador la registre
+        """
+        outer_error, self.error = self.error, None
+        pending = len(self._on_commit)
+        nested = self.session.begin_nested()
+        try:
+            yield self
+            if self.error is None:
+                self.session.flush()
+        except BaseException:
+            self._rollback_savepoint(nested, pending)
+            raise
+        else:
+            if self.error is not None:
+                logger.warning(f"Savepoint de '{self.name}' revertido: {self.error}")
+                self._rollback_savepoint(nested, pending)
+            else:
+                nested.commit()
+        finally:
+            self.error = outer_error
+
+    def _rollback_savepoint(self, nested, pending: int) -> None:
+        # Tras un flush fallido el savepoint queda inactivo pero sigue pendiente de rollback
+        if nested.session.get_nested_transaction() is nested:
+            nested.rollback()
+        del self._on_commit[pending:]
+
+
+def unit_of_work(name: str = 'unit_of_work') -> UnitOfWork:
+    """
+    Crea una unidad de trabajo usable como context manager o decorador
+    Args:
+        name: Nombre descriptivo para logs
+    Returns:
+        UnitOfWork: Contexto transaccional
+    """
+    return UnitOfWork(name)
+
+
+def get_current_uow() -> Optional[UnitOfWork]:
+    """
+    Obtiene la unidad de trabajo activa en el contexto actual
+    Returns:
+        UnitOfWork o None si no hay ninguna activa
+    """
+    return _current_uow.get()
+
+
+def commit_or_defer(session: Session, flush: bool = False) -> bool:
+    """
+    Confirma la sesión, o difiere el commit si hay una unidad de trabajo activa
+    Args:
+        session: Sesión usada para la escritura
+        flush: Si True, hace flush inmediato dentro de la unidad (p. ej. para obtener IDs)
+    Returns:
+        bool: True si la escritura quedó confirmada o pendiente en la unidad
+    """
+    uow = _current_uow.get()
+    if uow is not None and uow.session is session:
+        uow.record_write()
+        if flush:
+            session.flush()
+        return True
+    return safe_commit(session)
+
+
+def rollback_or_fail(session: Session, error: Exception) -> None:
+    """
+    Revierte la sesión, o marca la unidad de trabajo activa como fallida
+    Revertir a mitad de la unidad descartaría escrituras previas y confirmaría las
+    siguientes, por eso dentro de una unidad el rollback se hace al salir
+    Args:
+        session: Sesión usada para la escritura
+        error: Error ocurrido
+    """
+    uow = _current_uow.get()
+    if uow is not None and uow.session is session:
+        uow.mark_failed(error)
+        return
+    safe_rollback(session)
+
+
+def release_connection(session: Session = None) -> None:
+    """
+    Cierra la transacción implícita que dejan abierta las lecturas fuera de una unidad
+    de trabajo, para no retener la conexión del pool ni bloqueos durante una llamada
+    externa (p. ej. un envío por la API de WhatsApp). Dentro de una unidad no hace nada
+    Args:
+        session: Sesión a liberar (por defecto db.session)
+    """
+    session = session or db.session
+    if isinstance(session, scoped_session):
+        session = session()
+    if _current_uow.get() is not None or not session.in_transaction():
+        return
+    safe_commit(session)
+
+
+def get_uow_stats() -> Dict[str, Any]:
+    """
+    Obtiene métricas de las unidades de trabajo del proceso
+    Returns:
+        dict: Unidades, commits, rollbacks, escrituras y commits evitados
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    units = stats['units'] or 1
+    stats['writes_per_unit'] = round(stats['writes'] / units, 2)
+    stats['commits_per_unit'] = round(stats['commits'] / units, 2)
+    return stats
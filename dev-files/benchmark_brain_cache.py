@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark del arranque del cerebro RiveScript: compilación completa vs caché en disco
+Genera flujos sintéticos con muchos triggers y mide stream()+sort_replies() frente a
+la carga de la caché (app/services/brain_cache.py) y la latencia de la primera respuesta
+Uso:
+    python dev-files/benchmark_brain_cache.py [flujos] [triggers_por_flujo]
+"""
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+
+from app.services.rivescript_brain import compile_brain
+
+
+def _flows(count, triggers):
+    flows = []
+    for f in range(count):
+        lines = []
+        for t in range(triggers):
+            lines.append(f'+ [*] consulta {f} tema {t} [*]\n- Respuesta {f}.{t}\n')
+            lines.append(f'+ quiero * del plan {f} {t}\n- Plan {f}.{t}: <star>\n')
+        flows.append(SimpleNamespace(id=f'flow-{f}', name=f'Flujo {f}', priority=f,
+                                     rivescript_content='\n'.join(lines)))
+    return flows
+
+
+def _first_reply_ms(brain):
+    start = time.perf_counter()
+    brain.reply('bench', 'quiero algo del plan 3 7', flow_id='flow-3')
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    triggers = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    flows = _flows(count, triggers)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = compile_brain(flows, 1, cache_dir=cache_dir)
+        compiled_reply = _first_reply_ms(compiled)
+        cached = compile_brain(flows, 2, cache_dir=cache_dir)
+        cached_reply = _first_reply_ms(cached)
+
+    print(f"📊 {count} flujos, {compiled.trigger_count} triggers")
+    print(f"   Compilación completa     {compiled.compile_ms:>9.1f} ms   primera respuesta {compiled_reply:>7.1f} ms")
+    print(f"   Carga desde caché        {cached.compile_ms:>9.1f} ms   primera respuesta {cached_reply:>7.1f} ms")
+    print(f"\n⚡ Arranque {compiled.compile_ms / max(cached.compile_ms, 0.001):.1f}x más rápido con caché")
+
+
+if __name__ == '__main__':
+    main()
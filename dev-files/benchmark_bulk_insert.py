@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inserciones: create() por fila vs create_many / upsert_many
+Uso:
+    python dev-files/benchmark_bulk_insert.py [filas] [url_base_de_datos]
+Por defecto usa SQLite en un archivo temporal; con una URL de PostgreSQL mide el caso real
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+from flask import Flask
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db
+from database.unit_of_work import unit_of_work
+
+
+class BenchItem(db.Model):
+    """Tabla temporal del benchmark"""
+    __tablename__ = 'bench_bulk_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True)
+    value = db.Column(db.Integer, default=0)
+
+
+def _rows(prefix, count):
+    return [{'name': f'{prefix}-{i}', 'value': i} for i in range(count)]
+
+
+def _measure(label, count, func):
+    BenchItem.query.delete()
+    db.session.commit()
+
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    assert BenchItem.query.count() == count, label
+    print(f"   {label:<28} {elapsed * 1000:>9.1f} ms   {count / elapsed:>10.0f} filas/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    url = sys.argv[2] if len(sys.argv) > 2 else f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+
+    with app.app_context():
+        BenchItem.__table__.drop(db.engine, checkfirst=True)
+        BenchItem.__table__.create(db.engine)
+        repo = BaseRepository(BenchItem)
+
+        print(f"📊 Insertando {count} filas en {db.engine.url.render_as_string(hide_password=True)}")
+
+        def per_row():
+            for row in _rows('row', count):
+                repo.create(**row)
+
+        def per_row_uow():
+            with unit_of_work('benchmark'):
+                for row in _rows('uow', count):
+                    repo.create(**row)
+
+        def bulk():
+            repo.create_many(_rows('bulk', count))
+
+        def bulk_returning():
+            repo.create_many(_rows('ret', count), returning=True)
+
+        def upsert():
+            repo.upsert_many(_rows('up', count), conflict_columns=['name'])
+
+        baseline = _measure('create() + commit por fila', count, per_row)
+        _measure('create() en unit_of_work', count, per_row_uow)
+        fastest = _measure('create_many', count, bulk)
+        _measure('create_many RETURNING', count, bulk_returning)
+        _measure('upsert_many', count, upsert)
+
+        print(f"\n⚡ create_many es {baseline / fastest:.1f}x más rápido que el camino por fila")
+        BenchItem.__table__.drop(db.engine)
+
+
+if __name__ == '__main__':
+    main()
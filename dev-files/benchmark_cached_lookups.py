@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de búsquedas por columna: Model.query.filter_by().first() vs first_by()
+(sentencia lambda cacheada). SQLite en memoria con una tabla pequeña, para que el tiempo
+medido sea casi todo sobrecarga de Python (construcción, clave de caché y compilación)
+Uso:
+    python dev-files/benchmark_cached_lookups.py [búsquedas]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from flask import Flask
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db
+
+
+class BenchLine(db.Model):
+    """Tabla temporal del benchmark"""
+    __tablename__ = 'bench_lookup_lines'
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number_id = db.Column(db.String(64), nullable=False, unique=True)
+    name = db.Column(db.String(64))
+
+
+def _measure(label, count, func):
+    # Calentamiento: llena la caché de compilación
+    for i in range(100):
+        func(f'pn-{i % 50}')
+
+    start = time.perf_counter()
+    for i in range(count):
+        assert func(f'pn-{i % 50}') is not None
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<34} {elapsed / count * 1e6:>8.1f} µs/búsqueda")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        BenchLine.__table__.create(db.engine)
+        repo = BaseRepository(BenchLine)
+        repo.create_many([{'phone_number_id': f'pn-{i}', 'name': f'Línea {i}'} for i in range(50)])
+
+        print(f"📊 {count} búsquedas por phone_number_id")
+        before = _measure('Model.query.filter_by().first()', count,
+                          lambda value: BenchLine.query.filter_by(phone_number_id=value).first())
+        after = _measure('first_by() (lambda_stmt)', count,
+                         lambda value: repo.first_by('phone_number_id', value))
+
+        print(f"\n⚡ first_by reduce la sobrecarga por búsqueda un {(1 - after / before) * 100:.0f}%")
+        BenchLine.__table__.drop(db.engine)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark del buscador de palabras clave (app/utils/keyword_matcher.py)
+Compara, para cada mensaje, las categorías encontradas con un any(palabra in mensaje) por
+lista (como hacían ChatbotService y WebhookProcessor) frente a una sola pasada del autómata,
+comprueba que coinciden y muestra la latencia por mensaje. El corpus es un fichero con un
+mensaje por línea, por ejemplo:
+    psql -At -c "SELECT content FROM messages WHERE direction = 'inbound'
+                 AND message_type = 'text'" > corpus.txt
+Uso:
+    python dev-files/benchmark_keyword_matcher.py [corpus.txt] [repeticiones] [palabras extra por categoría]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from app.utils.keyword_matcher import DEFAULT_KEYWORDS, KeywordMatcher
+
+SAMPLE_CORPUS = [
+    'hola', 'Hola buenos días, quisiera información', 'menu', '1', 'gracias!',
+    'cuanto cuesta el producto a', 'tengo un problema con mi factura',
+    'quiero hablar con un agente por favor', 'a qué hora abren mañana?', 'salir',
+    'necesito ayuda con mi contraseña', 'ok', 'me pueden enviar el catálogo de precios',
+    'Buenas tardes, mi pedido no ha llegado todavía y ya pasaron cinco días hábiles'
+]
+
+
+def _linear(table, message):
+    """Enfoque anterior: un recorrido del mensaje por cada palabra de cada lista"""
+    message_lower = message.lower()
+    return {category for category, words in table.items() if any(word in message_lower for word in words)}
+
+
+def _corpus(path):
+    if not path:
+        return SAMPLE_CORPUS
+    with open(path, encoding='utf-8') as fh:
+        return [line.strip() for line in fh if line.strip()]
+
+
+def _table(extra):
+    """Tabla por defecto, opcionalmente con palabras sintéticas para simular listas largas"""
+    table = {category: list(words) for category, words in DEFAULT_KEYWORDS.items()}
+    for category in table:
+        table[category] += [f'{category}{index:03d}' for index in range(extra)]
+    return table
+
+
+def _time(function, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in corpus:
+            function(message)
+    return (time.perf_counter() - start) * 1e6 / (len(corpus) * repeat)
+
+
+def main():
+    corpus = _corpus(sys.argv[1] if len(sys.argv) > 1 else None)
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    extras = [int(sys.argv[3])] if len(sys.argv) > 3 else [0, 20, 100]
+
+    print(f"📊 Corpus: {len(corpus)} mensajes x {repeat}, "
+          f"{sum(len(message) for message in corpus) / len(corpus):.0f} caracteres de media")
+    for extra in extras:
+        table = _table(extra)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(table)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        mismatches = sum(1 for message in corpus if _linear(table, message) != matcher.categories(message))
+        linear_us = _time(lambda message: _linear(table, message), corpus, repeat)
+        matcher_us = _time(matcher.categories, corpus, repeat)
+
+        words = sum(len(words) for words in table.values())
+        print(f"\n   {len(table)} categorías, {words} palabras (autómata en {build_ms:.1f} ms)")
+        print(f"   any() por lista         {linear_us:>8.2f} µs/mensaje")
+        print(f"   Aho-Corasick            {matcher_us:>8.2f} µs/mensaje")
+        print(f"   Resultados distintos    {mismatches:>8}")
+        print(f"   ⚡ {linear_us / max(matcher_us, 1e-9):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark del atajo de triggers literales (app/services/literal_triggers.py)
+Responde un corpus de mensajes con los flujos de static/rivescript con y sin la tabla
+literal, comprueba que las respuestas coinciden y muestra el porcentaje de aciertos y la
+latencia ahorrada. El corpus es un fichero con un mensaje por línea, por ejemplo:
+    psql -At -c "SELECT content FROM messages WHERE direction = 'inbound'
+                 AND message_type = 'text'" > corpus.txt
+Uso:
+    python dev-files/benchmark_literal_triggers.py [corpus.txt] [repeticiones]
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+
+from app.services.rivescript_brain import compile_brain, flow_latency
+
+FLOW_FILES = ['basic_flow', 'sales_flow', 'technical_support_flow', 'billing_flow', 'hr_flow']
+
+# Muestra con la mezcla habitual del tráfico si no se pasa corpus
+SAMPLE_CORPUS = (
+    ['hola'] * 30 + ['menu'] * 10 + ['1'] * 12 + ['2'] * 10 + ['3'] * 6 + ['gracias'] * 8 +
+    ['adios'] * 4 + ['buenos dias'] * 5 + ['salir'] * 3 + ['Hola!'] * 4 +
+    ['cuanto cuesta el producto a'] * 3 + ['tengo un problema con mi factura'] * 3 +
+    ['quiero hablar con un agente por favor'] * 2 + ['necesito ayuda con mi contraseña'] * 2
+)
+
+
+def _flows():
+    flows = []
+    for priority, name in enumerate(FLOW_FILES, start=1):
+        with open(os.path.join('static', 'rivescript', f'{name}.rive'), encoding='utf-8') as fh:
+            flows.append(SimpleNamespace(id=name, name=name, priority=priority, rivescript_content=fh.read(),
+                                         is_default=name == 'basic_flow'))
+    return flows
+
+
+def _corpus(path):
+    if not path:
+        return SAMPLE_CORPUS
+    with open(path, encoding='utf-8') as fh:
+        return [line.strip() for line in fh if line.strip()]
+
+
+def _run(brain, corpus, repeat):
+    """Responde el corpus; devuelve (respuestas, ms por mensaje)"""
+    replies = []
+    start = time.perf_counter()
+    for round_ in range(repeat):
+        for index, message in enumerate(corpus):
+            random.seed(index)
+            result = brain.reply(f'user-{index % 50}', message)
+            if round_ == 0:
+                replies.append(result.reply if result else None)
+    return replies, (time.perf_counter() - start) * 1000 / (len(corpus) * repeat)
+
+
+def main():
+    corpus = _corpus(sys.argv[1] if len(sys.argv) > 1 else None)
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    flows = _flows()
+
+    engine = compile_brain(flows, 1, literal_fast_path=False)
+    fast = compile_brain(flows, 2)
+    engine_replies, engine_ms = _run(engine, corpus, repeat)
+    flow_latency.reset()
+    fast_replies, fast_ms = _run(fast, corpus, repeat)
+
+    hits = sum(flow['literal_hits'] for flow in flow_latency.snapshot().values())
+    mismatches = sum(1 for a, b in zip(engine_replies, fast_replies) if a != b)
+
+    print(f"📊 {len(flows)} flujos, {fast.trigger_count} triggers, "
+          f"{sum(flow['literal_count'] for flow in fast.flows)} textos literales")
+    print(f"   Corpus: {len(corpus)} mensajes x {repeat}")
+    print(f"   Motor RiveScript        {engine_ms * 1000:>8.1f} µs/mensaje")
+    print(f"   Con tabla literal       {fast_ms * 1000:>8.1f} µs/mensaje")
+    print(f"   Aciertos de la tabla    {hits / (len(corpus) * repeat) * 100:>8.1f} % de los mensajes")
+    print(f"   Respuestas distintas    {mismatches:>8}")
+    print(f"\n⚡ {(engine_ms - fast_ms) * 1000:.1f} µs ahorrados por mensaje ({engine_ms / max(fast_ms, 1e-9):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inserción con claves UUIDv4 (aleatorias) vs UUIDv7 (ordenadas por tiempo)
+Uso:
+    python dev-files/benchmark_uuid_keys.py [filas] [url_base_de_datos]
+Por defecto usa SQLite en un archivo temporal; con una URL de PostgreSQL mide además el
+tamaño del índice de la clave primaria, que es donde se nota la fragmentación
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Uuid, create_engine, insert, text
+from datetime import datetime
+
+from database.ids import uuid7
+
+BATCH = 1000
+
+
+def _table(metadata, name):
+    return Table(
+        name, metadata,
+        Column('id', Uuid, primary_key=True),
+        Column('phone_number', String(20), nullable=False),
+        Column('content', String(255)),
+        Column('seq', Integer),
+        Column('created_at', DateTime, nullable=False)
+    )
+
+
+def _index_size(conn, table):
+    if conn.dialect.name == 'postgresql':
+        return conn.execute(text("SELECT pg_relation_size(:index)"), {'index': f'{table}_pkey'}).scalar()
+    return None
+
+
+def _measure(engine, table, generator, count):
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+
+    start = time.perf_counter()
+    for offset in range(0, count, BATCH):
+        rows = [{
+            'id': generator(),
+            'phone_number': f'5917{(offset + i) % 10000:07d}',
+            'content': 'mensaje de prueba',
+            'seq': offset + i,
+            'created_at': datetime.utcnow()
+        } for i in range(min(BATCH, count - offset))]
+        # Un commit por lote, como el webhook con unit_of_work
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        size = _index_size(conn, table.name)
+    table.drop(engine)
+    return elapsed, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    url = sys.argv[2] if len(sys.argv) > 2 else f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    engine = create_engine(url)
+    metadata = MetaData()
+    print(f"📊 Insertando {count} filas en {engine.url.render_as_string(hide_password=True)}")
+
+    results = {}
+    for label, generator in (('uuid4 (aleatorio)', uuid.uuid4), ('uuid7 (ordenado)', uuid7)):
+        elapsed, size = _measure(engine, _table(metadata, f"bench_keys_{label[:5]}"), generator, count)
+        results[label] = elapsed
+        size_info = f"   índice PK {size / 1024 / 1024:>7.1f} MB" if size else ''
+        print(f"   {label:<20} {elapsed:>8.2f} s   {count / elapsed:>10.0f} filas/s{size_info}")
+
+    ratio = results['uuid4 (aleatorio)'] / results['uuid7 (ordenado)']
+    print(f"\n⚡ uuid7 inserta {ratio:.2f}x respecto a uuid4")
+
+
+if __name__ == '__main__':
+    main()
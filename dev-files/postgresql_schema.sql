@@ -4,6 +4,19 @@
 -- Habilitar extensión UUID
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- UUIDv7 (RFC 9562): timestamp Unix en ms en los 48 bits altos + bits aleatorios
+-- Las tablas de alto volumen lo usan para que los INSERT sean secuenciales en el índice de la PK
+CREATE OR REPLACE FUNCTION uuid_generate_v7()
+RETURNS UUID AS $$
+DECLARE
+    value BYTEA := uuid_send(gen_random_uuid());
+BEGIN
+    value := overlay(value PLACING substring(int8send((extract(epoch FROM clock_timestamp()) * 1000)::BIGINT) FROM 3) FROM 1 FOR 6);
+    value := set_byte(value, 6, (get_byte(value, 6) & 15) | 112);
+    RETURN encode(value, 'hex')::UUID;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
 -- Tabla de líneas de mensajería
 CREATE TABLE IF NOT EXISTS messaging_lines (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -20,10 +33,11 @@ CREATE TABLE IF NOT EXISTS messaging_lines (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Tabla de mensajes
+-- Tabla de mensajes (particionada por mes sobre created_at)
+-- La clave primaria y las restricciones UNIQUE deben incluir la columna de partición
 CREATE TABLE IF NOT EXISTS messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    whatsapp_msg_id VARCHAR(255) UNIQUE,
+    id UUID NOT NULL DEFAULT uuid_generate_v7(),
+    whatsapp_msg_id VARCHAR(255),
     phone_number VARCHAR(20) NOT NULL,
     contact_name VARCHAR(255),
     message_type VARCHAR(50) NOT NULL,
@@ -36,8 +50,27 @@ CREATE TABLE IF NOT EXISTS messages (
     webhook_id UUID,
     error_message TEXT,
     retry_count INTEGER DEFAULT 0,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    UNIQUE (whatsapp_msg_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Resumen por conversación para la bandeja de entrada (mantenido por la aplicación)
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    line_id VARCHAR(50) NOT NULL DEFAULT '',
+    phone_number VARCHAR(20) NOT NULL,
+    last_message_id VARCHAR(255),
+    last_message_preview VARCHAR(255),
+    last_message_type VARCHAR(50),
+    last_direction VARCHAR(10),
+    last_status VARCHAR(20),
+    last_message_at TIMESTAMP NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (line_id, phone_number)
 );
 
 -- Tabla de contactos
@@ -54,9 +87,9 @@ CREATE TABLE IF NOT EXISTS contacts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Tabla de eventos de webhook
+-- Tabla de eventos de webhook (particionada por mes sobre created_at)
 CREATE TABLE IF NOT EXISTS webhook_events (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v7(),
     webhook_id VARCHAR(255) NOT NULL,
     event_type VARCHAR(50) NOT NULL,
     payload JSONB NOT NULL,
@@ -65,9 +98,10 @@ CREATE TABLE IF NOT EXISTS webhook_events (
     last_processing_attempt TIMESTAMP,
     error_message TEXT,
     line_id UUID REFERENCES messaging_lines(id),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 -- Tabla de archivos multimedia
 CREATE TABLE IF NOT EXISTS media_files (
@@ -101,6 +135,15 @@ CREATE TABLE IF NOT EXISTS conversation_flows (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Revisión global de los flujos (una fila): cada worker recompila su cerebro RiveScript
+-- cuando la revisión supera la del cerebro que tiene publicado
+CREATE TABLE IF NOT EXISTS conversation_flow_revision (
+    id INTEGER PRIMARY KEY DEFAULT 1,
+    revision BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO conversation_flow_revision (id, revision) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
 -- Tabla de contextos de conversación
 CREATE TABLE IF NOT EXISTS conversation_contexts (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -114,9 +157,9 @@ CREATE TABLE IF NOT EXISTS conversation_contexts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Tabla de interacciones del chatbot
+-- Tabla de interacciones del chatbot (particionada por mes sobre created_at)
 CREATE TABLE IF NOT EXISTS chatbot_interactions (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v7(),
     phone_number VARCHAR(20) NOT NULL,
     user_message TEXT NOT NULL,
     bot_response TEXT,
@@ -125,16 +168,54 @@ CREATE TABLE IF NOT EXISTS chatbot_interactions (
     flow_id UUID REFERENCES conversation_flows(id),
     context_id UUID REFERENCES conversation_contexts(id),
     processing_time_ms INTEGER,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Particiones: DEFAULT recoge filas fuera de rango; las mensuales se crean por adelantado
+-- (mes actual + 3) y luego las mantiene la aplicación (flask partitions-ensure)
+CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
+CREATE TABLE IF NOT EXISTS webhook_events_default PARTITION OF webhook_events DEFAULT;
+CREATE TABLE IF NOT EXISTS chatbot_interactions_default PARTITION OF chatbot_interactions DEFAULT;
+
+DO $$
+DECLARE
+    parent TEXT;
+    month_start DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['messages', 'webhook_events', 'chatbot_interactions'] LOOP
+        FOR i IN 0..3 LOOP
+            month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_p' || to_char(month_start, 'YYYY_MM'), parent,
+                month_start, (month_start + INTERVAL '1 month')::date
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Búsqueda de texto completo (columnas generadas: se mantienen al escribir cada fila)
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('spanish'::regconfig, coalesce(content, '')), 'A')) STORED;
+ALTER TABLE chatbot_interactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish'::regconfig, coalesce(user_message, '')), 'A') ||
+        setweight(to_tsvector('spanish'::regconfig, coalesce(bot_response, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_messages_search ON messages USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_chatbot_interactions_search ON chatbot_interactions USING GIN (search_vector);
 
 -- Índices para mejorar rendimiento
 CREATE INDEX IF NOT EXISTS idx_messages_phone_created ON messages(phone_number, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_created_id ON messages(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_whatsapp_id ON messages(whatsapp_msg_id);
 CREATE INDEX IF NOT EXISTS idx_messages_status ON messages(status);
 CREATE INDEX IF NOT EXISTS idx_webhook_events_processed ON webhook_events(processed, created_at);
 CREATE INDEX IF NOT EXISTS idx_webhook_events_type ON webhook_events(event_type);
 CREATE INDEX IF NOT EXISTS idx_contacts_phone ON contacts(phone_number);
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_inbox ON conversation_summaries(line_id, last_message_at DESC, phone_number DESC);
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_recent ON conversation_summaries(last_message_at DESC, phone_number DESC, line_id DESC);
 CREATE INDEX IF NOT EXISTS idx_media_files_whatsapp_id ON media_files(whatsapp_media_id);
 CREATE INDEX IF NOT EXISTS idx_conversation_flows_active ON conversation_flows(is_active, priority);
 CREATE INDEX IF NOT EXISTS idx_conversation_contexts_phone ON conversation_contexts(phone_number);
@@ -153,6 +234,7 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_messaging_lines_updated_at BEFORE UPDATE ON messaging_lines FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_messages_updated_at BEFORE UPDATE ON messages FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_contacts_updated_at BEFORE UPDATE ON contacts FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_conversation_summaries_updated_at BEFORE UPDATE ON conversation_summaries FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_webhook_events_updated_at BEFORE UPDATE ON webhook_events FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_media_files_updated_at BEFORE UPDATE ON media_files FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_conversation_flows_updated_at BEFORE UPDATE ON conversation_flows FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
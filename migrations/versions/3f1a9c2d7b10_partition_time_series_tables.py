@@ -0,0 +1,170 @@
+"""Particionar messages, webhook_events y chatbot_interactions por mes
+
+Convierte las tablas existentes (creadas con postgresql_schema.sql anterior) en tablas
+particionadas por rango de created_at. Los datos se copian a particiones mensuales que
+cubren todo el rango existente más PARTITION_MONTHS_AHEAD meses futuros.
+Es idempotente: las tablas que ya están particionadas se omiten. Solo PostgreSQL.
+
+Revision ID: 3f1a9c2d7b10
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Restricciones e índices a recrear en cada tabla particionada
+TABLES = {
+    'messages': {
+        'constraints': [
+            'PRIMARY KEY (id, created_at)',
+            'UNIQUE (whatsapp_msg_id, created_at)'
+        ],
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS idx_messages_phone_created ON messages(phone_number, created_at DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_messages_created_id ON messages(created_at DESC, id DESC)',
+            'CREATE INDEX IF NOT EXISTS idx_messages_whatsapp_id ON messages(whatsapp_msg_id)',
+            'CREATE INDEX IF NOT EXISTS idx_messages_status ON messages(status)'
+        ],
+        'updated_at_trigger': True
+    },
+    'webhook_events': {
+        'constraints': ['PRIMARY KEY (id, created_at)'],
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS idx_webhook_events_processed ON webhook_events(processed, created_at)',
+            'CREATE INDEX IF NOT EXISTS idx_webhook_events_type ON webhook_events(event_type)'
+        ],
+        'updated_at_trigger': True
+    },
+    'chatbot_interactions': {
+        'constraints': ['PRIMARY KEY (id, created_at)'],
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS idx_chatbot_interactions_phone_created '
+            'ON chatbot_interactions(phone_number, created_at DESC)'
+        ],
+        'updated_at_trigger': False
+    }
+}
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(value, offset=0):
+    index = value.year * 12 + (value.month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _relkind(conn, table):
+    return conn.execute(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {'table': table}
+    ).scalar()
+
+
+def _copy_columns(conn, table):
+    """Columnas a copiar (las generadas como search_vector se recalculan solas)"""
+    return conn.execute(sa.text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER' "
+        "ORDER BY ordinal_position"
+    ), {'table': table}).scalars().all()
+
+
+def _has_column(conn, table, column):
+    return conn.execute(sa.text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+    ), {'table': table, 'column': column}).scalar() is not None
+
+
+def _recreate_indexes_and_triggers(conn, table, spec):
+    for statement in spec['indexes']:
+        op.execute(statement)
+    # search_vector solo existe si ya se ejecutó flask setup-search
+    if _has_column(conn, table, 'search_vector'):
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING GIN (search_vector)")
+    if spec['updated_at_trigger']:
+        op.execute(
+            f"CREATE TRIGGER update_{table}_updated_at BEFORE UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+        )
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    for table, spec in TABLES.items():
+        kind = _relkind(conn, table)
+        if kind is None or kind == 'p':
+            continue
+
+        legacy = f"{table}_unpartitioned"
+        columns = ', '.join(_copy_columns(conn, table))
+
+        op.execute(f"UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+
+        # Estructura (tipos, defaults, CHECK y columnas generadas) sin PK ni índices
+        constraints = ', '.join(spec['constraints'])
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+            f"INCLUDING GENERATED INCLUDING COMMENTS, {constraints}) PARTITION BY RANGE (created_at)"
+        )
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL")
+
+        # Particiones mensuales desde el dato más antiguo hasta MONTHS_AHEAD meses futuros
+        oldest = conn.execute(sa.text(f"SELECT min(created_at) FROM {legacy}")).scalar()
+        current = _month_start(date.today())
+        month = _month_start(oldest.date()) if oldest else current
+        while month <= _month_start(current, MONTHS_AHEAD):
+            op.execute(
+                f"CREATE TABLE {table}_p{month.year:04d}_{month.month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month_start(month, 1).isoformat()}')"
+            )
+            month = _month_start(month, 1)
+        # Red de seguridad para filas fuera de rango; ensure_partitions saca de ella las
+        # filas de cada mes antes de crear su partición
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+        op.execute(f"DROP TABLE {legacy} CASCADE")
+
+        _recreate_indexes_and_triggers(conn, table, spec)
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    for table, spec in TABLES.items():
+        if _relkind(conn, table) != 'p':
+            continue
+
+        partitioned = f"{table}_partitioned"
+        columns = ', '.join(_copy_columns(conn, table))
+
+        op.execute(f"ALTER TABLE {table} RENAME TO {partitioned}")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+            f"INCLUDING GENERATED INCLUDING COMMENTS, PRIMARY KEY (id))"
+        )
+        if table == 'messages':
+            op.execute("ALTER TABLE messages ADD UNIQUE (whatsapp_msg_id)")
+
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {partitioned}")
+        op.execute(f"DROP TABLE {partitioned} CASCADE")
+
+        _recreate_indexes_and_triggers(conn, table, spec)
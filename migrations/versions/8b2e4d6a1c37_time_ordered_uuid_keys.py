@@ -0,0 +1,55 @@
+"""Claves UUIDv7 ordenadas por tiempo en messages, webhook_events y chatbot_interactions
+
+Crea la función uuid_generate_v7() y la usa como DEFAULT del id en las tablas de alto
+volumen. Las filas existentes conservan sus UUIDv4: no se reescriben claves primarias
+(referenciadas desde otras tablas y desde WhatsApp); las filas nuevas se insertan al
+final del índice y, a medida que la retención elimina las antiguas, el índice queda
+compacto. Para recuperar espacio antes puede ejecutarse REINDEX CONCURRENTLY.
+
+Revision ID: 8b2e4d6a1c37
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6a1c37'
+down_revision = '3f1a9c2d7b10'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('messages', 'webhook_events', 'chatbot_interactions')
+
+UUID_V7_FUNCTION = """
+CREATE OR REPLACE FUNCTION uuid_generate_v7()
+RETURNS UUID AS $$
+DECLARE
+    value BYTEA := uuid_send(gen_random_uuid());
+BEGIN
+    value := overlay(value PLACING substring(int8send((extract(epoch FROM clock_timestamp()) * 1000)::BIGINT) FROM 3) FROM 1 FOR 6);
+    value := set_byte(value, 6, (get_byte(value, 6) & 15) | 112);
+    RETURN encode(value, 'hex')::UUID;
+END;
+$$ LANGUAGE plpgsql VOLATILE
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(UUID_V7_FUNCTION)
+    for table in TABLES:
+        op.execute(f"ALTER TABLE IF EXISTS {table} ALTER COLUMN id SET DEFAULT uuid_generate_v7()")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in TABLES:
+        op.execute(f"ALTER TABLE IF EXISTS {table} ALTER COLUMN id SET DEFAULT uuid_generate_v4()")
+    op.execute("DROP FUNCTION IF EXISTS uuid_generate_v7()")
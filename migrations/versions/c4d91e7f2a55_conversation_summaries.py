@@ -0,0 +1,47 @@
+"""Tabla conversation_summaries para la bandeja de entrada
+
+Se mantiene incrementalmente con cada mensaje; tras aplicar la migración ejecutar
+'flask rebuild-conversations' para poblarla con el historial existente.
+
+Revision ID: c4d91e7f2a55
+Revises: 8b2e4d6a1c37
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d91e7f2a55'
+down_revision = '8b2e4d6a1c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversation_summaries',
+        sa.Column('line_id', sa.String(length=50), nullable=False, server_default=''),
+        sa.Column('phone_number', sa.String(length=20), nullable=False),
+        sa.Column('last_message_id', sa.String(length=255)),
+        sa.Column('last_message_preview', sa.String(length=255)),
+        sa.Column('last_message_type', sa.String(length=50)),
+        sa.Column('last_direction', sa.String(length=10)),
+        sa.Column('last_status', sa.String(length=20)),
+        sa.Column('last_message_at', sa.DateTime(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('line_id', 'phone_number')
+    )
+    op.create_index(
+        'idx_conversation_summaries_inbox', 'conversation_summaries',
+        ['line_id', sa.text('last_message_at DESC'), sa.text('phone_number DESC')]
+    )
+
+
+def downgrade():
+    op.drop_index('idx_conversation_summaries_inbox', table_name='conversation_summaries')
+    op.drop_table('conversation_summaries')
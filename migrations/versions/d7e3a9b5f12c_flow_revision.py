@@ -0,0 +1,31 @@
+"""Revisión global de conversation_flows para propagar recargas entre workers
+
+Revision ID: d7e3a9b5f12c
+Revises: c4d91e7f2a55
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3a9b5f12c'
+down_revision = 'c4d91e7f2a55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversation_flow_revision',
+        sa.Column('id', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('revision', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO conversation_flow_revision (id, revision) VALUES (1, 0)")
+
+
+def downgrade():
+    op.drop_table('conversation_flow_revision')
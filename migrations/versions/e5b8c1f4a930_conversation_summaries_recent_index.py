@@ -0,0 +1,30 @@
+"""Índice de la bandeja de entrada sin filtro de línea
+
+list_inbox sin line_id ordena por (last_message_at, phone_number, line_id); el índice
+idx_conversation_summaries_inbox empieza por line_id y no sirve ese orden.
+
+Revision ID: e5b8c1f4a930
+Revises: d7e3a9b5f12c
+Create Date: 2026-10-19 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c1f4a930'
+down_revision = 'd7e3a9b5f12c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_conversation_summaries_recent', 'conversation_summaries',
+        [sa.text('last_message_at DESC'), sa.text('phone_number DESC'), sa.text('line_id DESC')]
+    )
+
+
+def downgrade():
+    op.drop_index('idx_conversation_summaries_recent', table_name='conversation_summaries')
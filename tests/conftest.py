@@ -0,0 +1,36 @@
+"""
+Fixtures compartidas para los tests
+Proveen una aplicación Flask mínima con SQLite en memoria
+"""
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from database.connection import db
+
+
+class SampleItem(db.Model):
+    """Modelo mínimo para tests de repositorios (los modelos reales usan UUID de PostgreSQL)"""
+    __tablename__ = 'test_sample_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    value = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+@pytest.fixture
+def app():
+    """Aplicación Flask con SQLite en memoria y la tabla de pruebas creada"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['TESTING'] = True
+    db.init_app(app)
+
+    with app.app_context():
+        SampleItem.__table__.create(db.engine, checkfirst=True)
+        yield app
+        db.session.remove()
+        SampleItem.__table__.drop(db.engine, checkfirst=True)
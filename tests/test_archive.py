@@ -0,0 +1,51 @@
+"""
+Tests para el archivado en frío (database/archive.py)
+"""
+import os
+from datetime import datetime, timedelta
+
+from app.repositories.base_repo import BaseRepository
+from database.archive import ArchivePolicy, archive_table, iter_archive
+from database.connection import db
+from tests.conftest import SampleItem
+
+
+class TestArchive:
+    """Tests de archive_table e iter_archive"""
+
+    def test_archive_moves_old_rows_to_daily_files(self, app, tmp_path):
+        """Las filas antiguas quedan en un fichero por día y desaparecen de la tabla"""
+        now = datetime(2024, 6, 1, 12, 0)
+        rows = [{'name': f'a-{i}', 'value': i, 'created_at': datetime(2024, 1, 10, 8, i)} for i in range(5)]
+        rows += [{'name': f'b-{i}', 'value': i, 'created_at': datetime(2024, 1, 11, 9, i)} for i in range(3)]
+        rows += [{'name': 'recent', 'value': 0, 'created_at': now}]
+        BaseRepository(SampleItem).create_many(rows)
+
+        policy = ArchivePolicy(SampleItem.__tablename__, timedelta(days=90), phone_column='name')
+        result = archive_table(policy, engine=db.engine, archive_dir=str(tmp_path),
+                               chunk_size=3, throttle_ms=0, now=now)
+
+        assert result['archived'] == 8
+        assert result['files'] == 2
+        assert SampleItem.query.count() == 1
+        assert os.path.exists(tmp_path / SampleItem.__tablename__ / '2024' / '01' / '10.jsonl.gz')
+
+        archived = list(iter_archive(SampleItem.__tablename__, archive_dir=str(tmp_path)))
+        assert [row['name'] for row in archived[:5]] == [f'a-{i}' for i in range(5)]
+        assert archived[0]['created_at'] == '2024-01-10T08:00:00'
+
+    def test_reader_filters_by_day_and_phone(self, app, tmp_path):
+        """El lector solo abre los días del rango y filtra por la columna del número"""
+        rows = [{'name': f'n-{i % 2}-{i}', 'created_at': datetime(2024, 1, 10 + i, 8)} for i in range(4)]
+        BaseRepository(SampleItem).create_many(rows)
+        policy = ArchivePolicy(SampleItem.__tablename__, timedelta(days=1))
+        archive_table(policy, engine=db.engine, archive_dir=str(tmp_path), throttle_ms=0,
+                      now=datetime(2024, 2, 1))
+
+        in_range = list(iter_archive(SampleItem.__tablename__, start=datetime(2024, 1, 11).date(),
+                                     end=datetime(2024, 1, 12).date(), archive_dir=str(tmp_path)))
+        assert [row['name'] for row in in_range] == ['n-1-1', 'n-0-2']
+
+        by_phone = list(iter_archive(SampleItem.__tablename__, phone_number='n-1-3',
+                                     archive_dir=str(tmp_path), phone_column='name'))
+        assert [row['name'] for row in by_phone] == ['n-1-3']
@@ -0,0 +1,49 @@
+"""
+Tests para la caché en disco del cerebro RiveScript (app/services/brain_cache.py)
+"""
+from types import SimpleNamespace
+
+from app.services.brain_cache import LazyPatternDict, cache_key
+from app.services.rivescript_brain import compile_brain
+
+CONTENT = '+ hola\n- Hola!\n\n+ mi nombre es *\n- Mucho gusto, <star>.\n'
+
+
+def _flows(content=CONTENT):
+    return [SimpleNamespace(id='f1', name='saludo', priority=1, rivescript_content=content)]
+
+
+class TestBrainCache:
+    """Tests de guardado y carga del cerebro compilado"""
+
+    def test_second_compile_loads_from_cache(self, tmp_path):
+        """Con el mismo contenido se carga la caché y responde igual que el compilado"""
+        compiled = compile_brain(_flows(), 1, cache_dir=str(tmp_path))
+        cached = compile_brain(_flows(), 2, cache_dir=str(tmp_path))
+
+        assert compiled.source == 'compiled'
+        assert cached.source == 'cache'
+        assert cached.flow_brains[0].cache_key == compiled.flow_brains[0].cache_key
+        assert cached.trigger_count == compiled.trigger_count
+        assert [flow['id'] for flow in cached.flows] == [flow['id'] for flow in compiled.flows]
+        assert cached.reply('u1', 'mi nombre es ana').reply == 'Mucho gusto, ana.'
+        assert isinstance(cached.flow_brains[0].rs._regexc['trigger'], LazyPatternDict)
+
+    def test_content_change_invalidates_cache(self, tmp_path):
+        """Cualquier cambio en el contenido produce otra clave y se recompila"""
+        compile_brain(_flows(), 1, cache_dir=str(tmp_path))
+        changed = compile_brain(_flows(CONTENT + '\n+ adios\n- Chao\n'), 2, cache_dir=str(tmp_path))
+
+        assert cache_key(_flows()) != changed.flow_brains[0].cache_key
+        assert changed.source == 'compiled'
+        assert changed.reply('u1', 'adios').reply == 'Chao'
+
+    def test_only_changed_flow_is_recompiled(self, tmp_path):
+        """Cada flujo tiene su propia entrada: editar uno no invalida los demás"""
+        ayuda = SimpleNamespace(id='f2', name='ayuda', priority=2, rivescript_content='+ ayuda\n- Menú')
+        compile_brain(_flows() + [ayuda], 1, cache_dir=str(tmp_path))
+        ayuda.rivescript_content = '+ ayuda\n- Menú nuevo'
+        brain = compile_brain(_flows() + [ayuda], 2, cache_dir=str(tmp_path))
+
+        assert [flow['source'] for flow in brain.flows] == ['cache', 'compiled']
+        assert brain.source == 'mixed'
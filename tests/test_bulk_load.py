@@ -0,0 +1,58 @@
+"""
+Tests para la carga masiva (database/bulk_load.py)
+"""
+from datetime import datetime
+
+from database.bulk_load import CSV_EXTRA_FIELDS, _copy_field, bulk_load
+from database.connection import db
+from tests.conftest import SampleItem
+
+
+class TestBulkLoad:
+    """Tests de bulk_load con la ruta executemany (SQLite)"""
+
+    def test_load_csv_in_batches_with_type_coercion(self, app, tmp_path):
+        """El CSV se carga por lotes, convierte tipos y aplica los defaults del modelo"""
+        path = tmp_path / 'items.csv'
+        lines = ['name,value,created_at,extra']
+        lines += [f'item-{i},{i},2024-01-0{i % 9 + 1}T10:00:00,x' for i in range(7)]
+        lines += ['sin-fecha,,,x']
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        result = bulk_load('items', str(path), engine=db.engine, batch_size=3, table=SampleItem.__table__)
+
+        assert result['method'] == 'executemany'
+        assert result['loaded'] == 8
+        assert result['batches'] == 3
+        assert result['ignored_columns'] == ['extra']
+        assert SampleItem.query.filter_by(name='item-4').one().value == 4
+        assert SampleItem.query.filter_by(name='item-4').one().created_at == datetime(2024, 1, 5, 10)
+        assert SampleItem.query.filter_by(name='sin-fecha').one().created_at is not None
+
+    def test_csv_row_with_extra_fields_is_loaded(self, app, tmp_path):
+        """Los campos de más en una fila se cuentan como columnas ignoradas sin abortar la carga"""
+        path = tmp_path / 'items.csv'
+        path.write_text('name,value\na,1\nb,2,sobrante\n', encoding='utf-8')
+
+        result = bulk_load('items', str(path), engine=db.engine, table=SampleItem.__table__)
+
+        assert result['loaded'] == 2
+        assert result['ignored_columns'] == [CSV_EXTRA_FIELDS]
+        assert SampleItem.query.filter_by(name='b').one().value == 2
+
+    def test_load_jsonl(self, app, tmp_path):
+        """JSONL admite filas con columnas distintas"""
+        path = tmp_path / 'items.jsonl'
+        path.write_text('{"name": "a", "value": 1}\n\n{"name": "b"}\n', encoding='utf-8')
+
+        result = bulk_load('items', str(path), engine=db.engine, table=SampleItem.__table__)
+
+        assert result['loaded'] == 2
+        assert sorted(item.name for item in SampleItem.query.all()) == ['a', 'b']
+
+    def test_copy_field_distinguishes_null_and_empty(self):
+        """En el CSV de COPY, NULL va sin comillas y el texto vacío entre comillas"""
+        assert _copy_field(None) == ''
+        assert _copy_field('') == '""'
+        assert _copy_field('di "hola"') == '"di ""hola"""'
+        assert _copy_field({'a': 1}) == '"{""a"": 1}"'
@@ -0,0 +1,68 @@
+"""
+Tests para las inserciones masivas de BaseRepository
+Valida create_many y upsert_many con ON CONFLICT sobre SQLite
+"""
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db
+from database.unit_of_work import get_uow_stats, unit_of_work
+from tests.conftest import SampleItem
+
+
+class TestBulkRepository:
+    """Tests para create_many y upsert_many"""
+
+    def test_create_many_inserts_in_chunks(self, app):
+        """create_many inserta todas las filas respetando el tamaño de lote"""
+        repo = BaseRepository(SampleItem)
+        rows = [{'name': f'item-{i}', 'value': i} for i in range(25)]
+
+        inserted = repo.create_many(rows, chunk_size=10)
+
+        assert inserted == 25
+        assert SampleItem.query.count() == 25
+
+    def test_create_many_returning_ids(self, app):
+        """Con returning=True devuelve los IDs generados"""
+        repo = BaseRepository(SampleItem)
+
+        ids = repo.create_many([{'name': 'a'}, {'name': 'b', 'value': 5}], returning=True)
+
+        assert len(ids) == 2
+        assert {item.id for item in SampleItem.query.all()} == set(ids)
+
+    def test_upsert_many_updates_existing_rows(self, app):
+        """upsert_many actualiza las filas que ya existen por la columna única"""
+        repo = BaseRepository(SampleItem)
+        repo.create_many([{'name': 'a', 'value': 1}, {'name': 'b', 'value': 2}])
+
+        repo.upsert_many(
+            [{'name': 'a', 'value': 10}, {'name': 'c', 'value': 3}],
+            conflict_columns=['name']
+        )
+
+        db.session.expire_all()
+        values = {item.name: item.value for item in SampleItem.query.all()}
+        assert values == {'a': 10, 'b': 2, 'c': 3}
+
+    def test_upsert_many_do_nothing(self, app):
+        """Con update_columns vacío se ignoran los conflictos"""
+        repo = BaseRepository(SampleItem)
+        repo.create_many([{'name': 'a', 'value': 1}])
+
+        repo.upsert_many([{'name': 'a', 'value': 99}], conflict_columns=['name'], update_columns=[])
+
+        db.session.expire_all()
+        assert SampleItem.query.filter_by(name='a').one().value == 1
+
+    def test_create_many_joins_unit_of_work(self, app):
+        """Dentro de una unidad de trabajo la inserción masiva no hace commit propio"""
+        repo = BaseRepository(SampleItem)
+        before = get_uow_stats()
+
+        with unit_of_work('test'):
+            repo.create(name='single')
+            repo.create_many([{'name': f'bulk-{i}'} for i in range(5)])
+
+        assert get_uow_stats()['commits'] - before['commits'] == 1
+        assert SampleItem.query.count() == 6
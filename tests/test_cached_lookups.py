@@ -0,0 +1,19 @@
+"""
+Tests para las búsquedas con sentencias lambda cacheadas (BaseRepository.first_by)
+"""
+from app.repositories.base_repo import BaseRepository
+from tests.conftest import SampleItem
+
+
+class TestFirstBy:
+    """Tests de first_by"""
+
+    def test_first_by_reuses_statement_with_new_values(self, app):
+        """La sentencia cacheada devuelve el resultado correcto para cada valor y columna"""
+        repo = BaseRepository(SampleItem)
+        repo.create_many([{'name': 'a', 'value': 1}, {'name': 'b', 'value': 2}])
+
+        assert repo.first_by('name', 'a').value == 1
+        assert repo.first_by('name', 'b').value == 2
+        assert repo.first_by('value', 2).name == 'b'
+        assert repo.first_by('name', 'missing') is None
@@ -0,0 +1,111 @@
+"""
+Tests para el resumen incremental de conversaciones (bandeja de entrada)
+Usa un modelo de mensajes compatible con SQLite con las mismas columnas que Message
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.conversation_summary_repository import ConversationSummaryRepository
+from app.utils.helpers import decode_cursor, encode_cursor
+from database.connection import db
+from database.models import ConversationSummary
+from database.unit_of_work import unit_of_work
+
+
+class InboxMessage(db.Model):
+    """Mensaje mínimo para reconstruir resúmenes en SQLite"""
+    __tablename__ = 'test_inbox_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    whatsapp_message_id = db.Column(db.String(255), nullable=False)
+    line_id = db.Column(db.String(50))
+    phone_number = db.Column(db.String(20), nullable=False)
+    message_type = db.Column(db.String(50), nullable=False, default='text')
+    content = db.Column(db.Text)
+    status = db.Column(db.String(20))
+    direction = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+@pytest.fixture
+def repo(app):
+    for model in (ConversationSummary, InboxMessage):
+        model.__table__.create(db.engine, checkfirst=True)
+    yield ConversationSummaryRepository(InboxMessage)
+    db.session.remove()
+    for model in (ConversationSummary, InboxMessage):
+        model.__table__.drop(db.engine, checkfirst=True)
+
+
+def _write(repo, n, direction, phone='59170000001', minutes=0, status='received', line_id='line_1'):
+    """Crea el mensaje y actualiza el resumen en la misma unidad de trabajo"""
+    message = InboxMessage(whatsapp_message_id=f'wamid.{n}', line_id=line_id, phone_number=phone,
+                           content=f'mensaje {n}', status=status, direction=direction,
+                           created_at=datetime(2025, 1, 1) + timedelta(minutes=minutes))
+    with unit_of_work('test'):
+        db.session.add(message)
+        db.session.flush()
+        repo.record_message(message)
+    return message
+
+
+class TestConversationSummaries:
+    """Tests del mantenimiento incremental, la bandeja y la reconstrucción"""
+
+    def test_incremental_updates(self, repo):
+        """Entrantes suman sin leer, una respuesta los pone a cero y un mensaje atrasado no pisa el último"""
+        _write(repo, 1, 'inbound', minutes=1)
+        _write(repo, 2, 'inbound', minutes=2)
+        summary = ConversationSummary.query.one()
+        assert (summary.unread_count, summary.last_message_id) == (2, 'wamid.2')
+
+        _write(repo, 3, 'outbound', minutes=3, status='sent')
+        _write(repo, 4, 'inbound', minutes=0)  # llega tarde, más antiguo que el último
+        db.session.expire_all()
+        summary = ConversationSummary.query.one()
+        assert summary.last_message_id == 'wamid.3'
+        assert summary.last_direction == 'outbound'
+        assert summary.unread_count == 1
+        assert summary.message_count == 4
+
+        repo.record_status('line_1', '59170000001', 'wamid.3', 'read')
+        db.session.expire_all()
+        assert ConversationSummary.query.one().last_status == 'read'
+
+    def test_inbox_pagination_and_rebuild(self, repo):
+        """La bandeja pagina por cursor y la reconstrucción reproduce el estado incremental"""
+        for i in range(5):
+            _write(repo, i, 'inbound', phone=f'5917000000{i}', minutes=i)
+        _write(repo, 9, 'outbound', phone='59170000003', minutes=10, status='sent')
+
+        page, has_next = repo.list_inbox(line_id='line_1', limit=2)
+        assert [s.phone_number for s in page] == ['59170000003', '59170000004']
+        assert has_next
+        after = (page[-1].last_message_at, page[-1].phone_number, page[-1].line_id)
+        page, _ = repo.list_inbox(line_id='line_1', limit=2, after=after)
+        assert [s.phone_number for s in page] == ['59170000002', '59170000001']
+
+        incremental = {s.phone_number: s.to_dict() for s in ConversationSummary.query.all()}
+        assert repo.rebuild() == 5
+        db.session.expire_all()
+        rebuilt = {s.phone_number: s.to_dict() for s in ConversationSummary.query.all()}
+        assert rebuilt == incremental
+        assert len(repo.list_inbox(unread_only=True)[0]) == 4
+
+    def test_inbox_cursor_unique_across_lines(self, repo):
+        """Sin línea, el mismo número en dos líneas a la misma hora no se salta entre páginas"""
+        for n, line_id in enumerate(['line_1', 'line_2', 'line_3']):
+            _write(repo, n, 'inbound', minutes=5, line_id=line_id)
+
+        seen, after = [], None
+        while True:
+            page, has_next = repo.list_inbox(limit=1, after=after)
+            seen += [s.line_id for s in page]
+            if not has_next:
+                break
+            last = page[-1]
+            after = decode_cursor(encode_cursor(last.last_message_at, last.phone_number, last.line_id))
+
+        assert seen == ['line_3', 'line_2', 'line_1']
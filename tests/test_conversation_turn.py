@@ -0,0 +1,72 @@
+"""
+Tests para el turno de conversación (app/services/conversation_turn.py)
+Valida que el contexto se cargue una vez y las escrituras del turno usen un solo commit
+"""
+from datetime import datetime
+
+import pytest
+
+from app.repositories.conversation_repository import ConversationRepository
+from app.services.conversation_turn import ConversationTurn
+from database.connection import db
+from database.unit_of_work import get_uow_stats
+
+
+class SampleContext(db.Model):
+    """Contexto mínimo con las columnas que usa ConversationRepository"""
+    __tablename__ = 'test_sample_contexts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20), nullable=False, unique=True)
+    current_topic = db.Column(db.String(100))
+    context_data = db.Column(db.JSON)
+    last_interaction = db.Column(db.DateTime, default=datetime.utcnow)
+    flow_id = db.Column(db.Integer)
+
+
+class CountingRepository(ConversationRepository):
+    """ConversationRepository sobre SampleContext que cuenta las cargas de contexto"""
+
+    def __init__(self):
+        super().__init__()
+        self.model_class = SampleContext
+        self.loads = 0
+
+    def get_or_create_context(self, phone_number):
+        self.loads += 1
+        return super().get_or_create_context(phone_number)
+
+
+@pytest.fixture
+def repo(app):
+    SampleContext.__table__.create(db.engine, checkfirst=True)
+    yield CountingRepository()
+    db.session.remove()
+    SampleContext.__table__.drop(db.engine, checkfirst=True)
+
+
+class TestConversationTurn:
+    """Tests de ConversationTurn"""
+
+    def test_context_loaded_once_and_single_commit(self, repo):
+        """El contexto se carga una vez y contexto y flujo asignado se confirman juntos"""
+        before = get_uow_stats()
+
+        with ConversationTurn(repo, '+591700', 'hola') as turn:
+            assert turn.flow_id is None
+            assert turn.assign_flow(7) is True
+            assert turn.assign_flow(7) is False
+
+        assert repo.loads == 1
+        assert get_uow_stats()['commits'] - before['commits'] == 1
+        db.session.expire_all()
+        assert SampleContext.query.filter_by(phone_number='+591700').one().flow_id == 7
+
+    def test_exception_rolls_back_turn(self, repo):
+        """Si el pipeline falla no queda ninguna escritura del turno"""
+        with pytest.raises(RuntimeError):
+            with ConversationTurn(repo, '+591700', 'hola') as turn:
+                turn.assign_flow(3)
+                raise RuntimeError('fallo generando respuesta')
+
+        assert SampleContext.query.count() == 0
@@ -0,0 +1,50 @@
+"""
+Tests para el registro compartido de engines SQLAlchemy
+Valida que se reutilice un único engine por URL y que se expongan métricas del pool
+"""
+
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+
+from database.connection import (
+    TimedQueuePool, db, get_db_session, get_engine, get_pool_metrics
+)
+
+
+class TestEngineRegistry:
+    """Tests para get_engine y get_db_session"""
+
+    def test_same_url_returns_same_engine(self, tmp_path):
+        """La misma URL debe devolver siempre el mismo engine"""
+        url = f"sqlite:///{tmp_path / 'registry.db'}"
+
+        assert get_engine(url) is get_engine(url)
+        assert isinstance(get_engine(url).pool, TimedQueuePool)
+
+    def test_memory_sqlite_drops_pool_size_options(self):
+        """SQLite en memoria usa StaticPool e ignora opciones de tamaño"""
+        engine = get_engine('sqlite://', {'pool_size': 5, 'max_overflow': 10})
+
+        assert isinstance(engine.pool, StaticPool)
+
+    def test_db_session_reuses_flask_engine(self, tmp_path):
+        """get_db_session debe usar el engine de Flask-SQLAlchemy sin crear pools nuevos"""
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'app.db'}"
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 2, 'max_overflow': 1}
+        db.init_app(app)
+
+        with app.app_context():
+            first = get_db_session()
+            second = get_db_session()
+            assert first.get_bind() is db.engine
+            assert second.get_bind() is db.engine
+
+            first.execute(text('SELECT 1'))
+            first.close()
+            second.close()
+
+            metrics = [m for m in get_pool_metrics() if m['url'] == db.engine.url.render_as_string()]
+            assert metrics[0]['checkouts'] >= 1
+            assert metrics[0]['size'] == 2
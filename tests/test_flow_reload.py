@@ -0,0 +1,74 @@
+"""
+Tests para la propagación de recargas de flujos (app/services/flow_reload.py)
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.flow_repository import FlowRepository
+from app.services import flow_reload
+from app.services.flow_reload import FlowReloadWatcher
+from app.services.rivescript_brain import BrainRegistry
+from database.connection import db
+from database.models import FlowRevision
+
+
+@pytest.fixture
+def revision_table(app):
+    FlowRevision.__table__.create(db.engine, checkfirst=True)
+    yield
+    db.session.remove()
+    FlowRevision.__table__.drop(db.engine, checkfirst=True)
+
+
+class TestFlowReload:
+    """Tests de la revisión global y del vigilante"""
+
+    def test_bump_revision_is_monotonic(self, revision_table):
+        """Cada cambio confirmado sube la revisión global"""
+        repo = FlowRepository()
+        assert repo.get_revision() == (0, None)
+
+        repo.bump_revision(commit=True)
+        repo.bump_revision(commit=True)
+
+        revision, changed_at = repo.get_revision()
+        assert revision == 2
+        assert changed_at is not None
+
+    def test_watcher_recompiles_only_on_new_revision(self, app, revision_table, monkeypatch):
+        """El vigilante publica un cerebro nuevo solo cuando la revisión supera la compilada"""
+        registry = BrainRegistry()
+        monkeypatch.setattr(flow_reload, 'brain_registry', registry)
+        content = {'value': '+ hola\n- Hola!'}
+        monkeypatch.setattr(FlowRepository, 'get_active_flows', lambda self: [
+            SimpleNamespace(id='f1', name='saludo', priority=1, rivescript_content=content['value'])
+        ])
+        watcher = FlowReloadWatcher(app)
+
+        assert watcher.check() is True
+        assert watcher.check() is False
+        assert registry.current().revision == 0
+
+        content['value'] = '+ hola\n- Buenas!'
+        FlowRepository().bump_revision(commit=True)
+
+        assert watcher.check() is True
+        assert registry.current().revision == 1
+        assert registry.current().reply('u1', 'hola').reply == 'Buenas!'
+        assert watcher.status()['propagations'] == 1
+        assert watcher.status()['last_propagation_ms'] is not None
+
+    def test_watcher_starts_with_first_request(self, app, revision_table, monkeypatch):
+        """Los hilos no arrancan al crear el vigilante sino con el primer request del proceso"""
+        watcher = FlowReloadWatcher(app, poll_seconds=60)
+        monkeypatch.setattr(watcher, 'check', lambda: False)
+        app.before_request(watcher.ensure_started)
+        assert not watcher.is_running()
+
+        with app.test_request_context():
+            app.preprocess_request()
+        try:
+            assert watcher.is_running()
+        finally:
+            watcher.stop()
@@ -0,0 +1,57 @@
+"""
+Tests para los contadores de uso de flujos en memoria (app/services/flow_usage.py)
+"""
+from app.services.flow_usage import FlowUsageCounter
+
+
+class TestFlowUsageCounter:
+    """Tests de la agregación por flujo y de la escritura periódica"""
+
+    def test_without_thread_writes_each_use(self):
+        """Sin el hilo en marcha cada uso se escribe al momento"""
+        writes = []
+        counter = FlowUsageCounter(writes.append)
+
+        counter.record('ventas')
+
+        assert len(writes) == 1
+        assert writes[0]['ventas'][0] == 1
+
+    def test_uses_aggregated_into_one_update_per_flow(self, app):
+        """Los usos se suman por flujo y se escriben juntos con el último uso de cada uno"""
+        writes = []
+        counter = FlowUsageCounter(writes.append, interval=60)
+        counter.start(app)
+
+        for flow_id in ['ventas', 'soporte', 'ventas', 'ventas']:
+            counter.record(flow_id)
+        assert counter.pending('ventas') == 3
+        counter.shutdown()
+
+        assert len(writes) == 1
+        assert {flow_id: count for flow_id, (count, _) in writes[0].items()} == {'ventas': 3, 'soporte': 1}
+        stats = counter.get_stats()
+        assert stats['written'] == 4
+        assert stats['updates'] == 2
+        assert stats['pending'] == 0
+
+    def test_failed_flush_keeps_uses_for_next_cycle(self, app):
+        """Si la escritura falla los usos vuelven al contador y se suman a los nuevos"""
+        writes = []
+
+        def writer(usage):
+            if not writes:
+                writes.append(None)
+                raise RuntimeError('base de datos caída')
+            writes.append(dict(usage))
+
+        counter = FlowUsageCounter(writer, interval=60)
+        counter.start(app)
+        counter.record('ventas', 2)
+        with app.app_context():
+            assert counter.flush() == 0
+        counter.record('ventas')
+        counter.shutdown()
+
+        assert writes[1]['ventas'][0] == 3
+        assert counter.get_stats()['failed_flushes'] == 1
@@ -0,0 +1,33 @@
+"""
+Tests para el generador de UUIDv7 (database/ids.py)
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.ids import uuid7, uuid7_datetime
+
+
+class TestUUID7:
+    """Tests de formato y orden de los UUIDv7"""
+
+    def test_version_variant_and_timestamp(self):
+        """Versión 7, variante RFC y timestamp del momento de creación"""
+        value = uuid7()
+
+        assert value.version == 7
+        assert value.variant == 'specified in RFC 4122'
+        assert abs(uuid7_datetime(value) - datetime.now(timezone.utc)) < timedelta(seconds=5)
+
+    def test_ids_are_monotonic_and_unique(self):
+        """IDs consecutivos del proceso son únicos y crecientes aunque compartan milisegundo"""
+        values = [uuid7() for _ in range(10000)]
+
+        assert len(set(values)) == len(values)
+        assert values == sorted(values)
+
+    def test_rejects_other_versions(self):
+        """uuid7_datetime no acepta UUIDs aleatorios"""
+        with pytest.raises(ValueError):
+            uuid7_datetime(uuid.uuid4())
@@ -0,0 +1,107 @@
+"""
+Tests para el registro asíncrono de interacciones (app/services/interaction_log.py)
+"""
+import pytest
+
+from app.services.interaction_log import InteractionLogBuffer
+from database.unit_of_work import unit_of_work
+
+
+def _fields(index):
+    return {'phone_number': '+591700', 'user_message': f'mensaje {index}',
+            'bot_response': 'ok', 'intent': 'flow', 'processing_time_ms': 5}
+
+
+class TestInteractionLogBuffer:
+    """Tests del buffer acotado y de la escritura por lotes"""
+
+    def test_without_thread_writes_immediately(self):
+        """Sin el hilo en marcha cada interacción se escribe al momento"""
+        batches = []
+        buffer = InteractionLogBuffer(batches.append)
+
+        buffer.log(**_fields(1))
+
+        assert len(batches) == 1
+        assert batches[0][0]['user_message'] == 'mensaje 1'
+        assert batches[0][0]['id'] is not None
+
+    def test_batches_overflow_and_flush_on_shutdown(self, app):
+        """Encola sin escribir, descarta las más antiguas al llenarse y escribe por lotes al apagar"""
+        batches = []
+        buffer = InteractionLogBuffer(batches.append, max_size=5, batch_size=2, interval=60)
+        buffer.start(app)
+
+        for index in range(7):
+            buffer.log(**_fields(index))
+        buffer.shutdown()
+
+        stats = buffer.get_stats()
+        written = [row['user_message'] for batch in batches for row in batch]
+        assert written == [f'mensaje {index}' for index in range(2, 7)]
+        assert all(len(batch) <= 2 for batch in batches)
+        assert stats['overflow'] == 2
+        assert stats['written'] == 5
+        assert stats['pending'] == 0
+
+    def test_failed_batch_retried_once_then_dropped(self, app):
+        """Un lote que falla se reintenta una vez y después se cuenta como descartado"""
+        calls = []
+
+        def writer(rows):
+            calls.append(len(rows))
+            raise RuntimeError('base de datos caída')
+
+        buffer = InteractionLogBuffer(writer, batch_size=10, interval=60)
+        buffer.start(app)
+        for index in range(3):
+            buffer.log(**_fields(index))
+        buffer.shutdown()
+
+        stats = buffer.get_stats()
+        assert calls[:2] == [3, 3]
+        assert stats['dropped'] == 3
+        assert stats['written'] == 0
+        assert stats['pending'] == 0
+
+    def test_retry_drops_only_failing_rows(self, app):
+        """En el reintento el lote se parte y solo se descartan las filas que fallan"""
+        batches = []
+
+        def writer(rows):
+            if any(row['user_message'] == 'mensaje 5' for row in rows):
+                raise RuntimeError('fila inválida')
+            batches.append([row['user_message'] for row in rows])
+
+        buffer = InteractionLogBuffer(writer, batch_size=8, interval=60)
+        buffer.start(app)
+        for index in range(8):
+            buffer.log(**_fields(index))
+        buffer.shutdown()
+
+        stats = buffer.get_stats()
+        written = sorted(message for batch in batches for message in batch)
+        assert written == [f'mensaje {index}' for index in range(8) if index != 5]
+        assert stats['dropped'] == 1
+        assert stats['written'] == 7
+        assert len(batches) < 7
+
+    def test_rows_enqueued_only_when_unit_commits(self, app):
+        """Dentro de una unidad la fila se encola al confirmarse y se descarta si se revierte"""
+        batches = []
+        buffer = InteractionLogBuffer(batches.append, batch_size=10, interval=60)
+        buffer.start(app)
+
+        with unit_of_work('turn'):
+            buffer.log(**_fields('confirmado'))
+            assert buffer.get_stats()['pending'] == 0
+        assert buffer.get_stats()['pending'] == 1
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work('turn'):
+                buffer.log(**_fields('revertido'))
+                raise RuntimeError('fallo en el turno')
+        buffer.shutdown()
+
+        written = [row['user_message'] for batch in batches for row in batch]
+        assert written == ['mensaje confirmado']
@@ -0,0 +1,60 @@
+"""
+Tests para la paginación keyset de repositorios
+Valida el recorrido por cursor (created_at, id) y la codificación del cursor
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.repositories.base_repo import BaseRepository
+from app.utils.exceptions import ValidationError
+from app.utils.helpers import decode_cursor, encode_cursor
+from tests.conftest import SampleItem
+
+
+class TestKeysetPagination:
+    """Tests para paginate_keyset, count_filtered y los cursores"""
+
+    def _seed(self, repo, count=7):
+        base = datetime(2024, 1, 1)
+        # Dos elementos comparten created_at para validar el desempate por id
+        repo.create_many([
+            {'name': f'item-{i}', 'value': i % 2, 'created_at': base + timedelta(minutes=min(i, 5))}
+            for i in range(count)
+        ])
+
+    def test_walks_all_pages_without_gaps(self, app):
+        """Recorrer con cursor devuelve todos los elementos una sola vez y en orden"""
+        repo = BaseRepository(SampleItem)
+        self._seed(repo)
+
+        seen, after = [], None
+        while True:
+            items, has_next = repo.paginate_keyset(limit=3, after=after)
+            seen.extend(items)
+            if not has_next:
+                break
+            cursor = encode_cursor(items[-1].created_at, items[-1].id)
+            after = decode_cursor(cursor)
+
+        assert len(seen) == 7
+        assert len({item.id for item in seen}) == 7
+        keys = [(item.created_at, item.id) for item in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_filters_and_count(self, app):
+        """Los filtros se aplican en la consulta y el conteo exacto coincide"""
+        repo = BaseRepository(SampleItem)
+        self._seed(repo)
+
+        items, has_next = repo.paginate_keyset(filters={'value': 1}, limit=10)
+
+        assert {item.value for item in items} == {1}
+        assert not has_next
+        assert repo.count_filtered({'value': 1}, approximate=True) == (len(items), False)
+
+    def test_invalid_cursor_raises_validation_error(self):
+        """Un cursor manipulado genera ValidationError"""
+        with pytest.raises(ValidationError):
+            decode_cursor('no-es-un-cursor')
@@ -0,0 +1,42 @@
+"""
+Tests para el buscador de palabras clave (app/utils/keyword_matcher.py)
+"""
+from app.utils.keyword_matcher import DEFAULT_KEYWORDS, KeywordMatcher, load_keyword_table
+
+
+def _linear(table, message):
+    message_lower = message.lower()
+    return {category for category, words in table.items() if any(word in message_lower for word in words)}
+
+
+class TestKeywordMatcher:
+    """Tests del autómata y de la tabla configurable"""
+
+    def test_all_categories_in_one_pass(self):
+        """Devuelve todas las categorías presentes, también con palabras solapadas"""
+        matcher = KeywordMatcher({'a': ['she', 'hers'], 'b': ['he'], 'c': ['his']})
+
+        assert matcher.categories('USHERS') == {'a', 'b'}
+        assert matcher.categories('this') == {'c'}
+        assert matcher.categories('nada') == set()
+        assert matcher.matches('ushers', 'b')
+
+    def test_same_result_as_substring_scan(self):
+        """Mismo resultado que any(palabra in mensaje) por lista con la tabla por defecto"""
+        matcher = KeywordMatcher(DEFAULT_KEYWORDS)
+        messages = [
+            'Hola, buenos días', 'BUENAS NOCHES', 'gracias, adiós', '¿a qué hora abren?',
+            'cuanto cuesta', 'necesito ayuda', 'cerrar conversación', 'chiste', 'weekend', '', 'ok'
+        ]
+
+        for message in messages:
+            assert matcher.categories(message) == _linear(DEFAULT_KEYWORDS, message)
+
+    def test_custom_table_overrides_categories(self):
+        """CHATBOT_KEYWORDS sustituye o añade categorías; un JSON inválido deja la tabla por defecto"""
+        table = load_keyword_table('{"greeting": ["que tal"], "urgent": ["urgente"]}')
+
+        assert table['greeting'] == ['que tal']
+        assert table['urgent'] == ['urgente']
+        assert table['close'] == DEFAULT_KEYWORDS['close']
+        assert load_keyword_table('{no es json') == DEFAULT_KEYWORDS
@@ -0,0 +1,81 @@
+"""
+Tests para el atajo de triggers literales (app/services/literal_triggers.py)
+"""
+import random
+
+import rivescript
+
+from app.services.literal_triggers import build_literal_table, literal_reply
+
+CONTENT = """
++ hola
+- Hola <get name>!
+
++ (1|uno)
+- Opción <star> {topic=ventas}
+
++ [*] ayuda [*]
+- Menú de ayuda
+
++ menu
+* <get vip> == si => Menú VIP
+- Menú
+
++ * precio{weight=5}
+- Precio de <star>
+
++ el precio
+- Nunca se elige: "* precio" tiene más peso
+
+> topic ventas
+  + hola
+  - Hola desde ventas<br>¿Qué producto? {topic=random}
+< topic
+"""
+
+
+def _rs():
+    rs = rivescript.RiveScript(utf8=True)
+    rs.stream(CONTENT)
+    rs.sort_replies()
+    return rs
+
+
+class TestLiteralTriggers:
+    """Tests de la tabla literal y de su equivalencia con el motor"""
+
+    def test_table_only_has_unambiguous_literals(self):
+        """Se indexan literales y alternativas; no condiciones ni textos que otro trigger gana antes"""
+        table = build_literal_table(_rs())
+
+        assert sorted(table['random']) == ['1', 'hola', 'uno']
+        assert table['random']['uno'][1] == ('uno',)
+        assert sorted(table['ventas']) == ['hola']
+
+    def test_same_replies_and_state_as_engine(self):
+        """Respuestas, tema, __lastmatch__ e historial iguales a los del motor"""
+        fast, engine = _rs(), _rs()
+        table = build_literal_table(fast)
+        fast.set_uservar('u1', 'name', 'Ana')
+        engine.set_uservar('u1', 'name', 'Ana')
+
+        hits = 0
+        for index, message in enumerate(['Hola!', 'uno', 'hola', 'hola', 'menu', 'el precio', '1']):
+            random.seed(index)
+            reply = literal_reply(fast, table, 'u1', message)
+            hits += reply is not None
+            if reply is None:
+                reply = fast.reply('u1', message)
+            random.seed(index)
+
+            assert reply == engine.reply('u1', message)
+            assert fast.get_uservars('u1') == engine.get_uservars('u1')
+        assert hits == 5
+
+    def test_begin_block_disables_table(self):
+        """Con bloque BEGIN todas las respuestas van por el motor"""
+        rs = rivescript.RiveScript(utf8=True)
+        rs.stream('> begin\n  + request\n  - {ok}\n< begin\n\n+ hola\n- Hola!')
+        rs.sort_replies()
+
+        assert build_literal_table(rs) == {}
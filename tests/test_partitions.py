@@ -0,0 +1,31 @@
+"""
+Tests de los helpers de particionado mensual (fechas y DDL)
+"""
+from datetime import date
+
+from database.partitions import apply_partition_retention, ensure_partitions, month_start, partition_ddl, partition_name
+
+
+class TestPartitionHelpers:
+    """Tests de nombres, rangos y DDL de particiones"""
+
+    def test_month_start_crosses_years(self):
+        """Desplazar meses cruza correctamente el cambio de año"""
+        assert month_start(date(2025, 11, 17), 2) == date(2026, 1, 1)
+        assert month_start(date(2025, 1, 31), -1) == date(2024, 12, 1)
+
+    def test_partition_ddl_covers_one_month(self):
+        """La partición cubre [primer día del mes, primer día del mes siguiente)"""
+        month = date(2025, 12, 1)
+        assert partition_name('messages', month) == 'messages_p2025_12'
+        ddl = partition_ddl('messages', month)
+        assert 'PARTITION OF messages' in ddl
+        assert "FROM ('2025-12-01') TO ('2026-01-01')" in ddl
+
+    def test_non_postgresql_is_noop(self, app):
+        """En SQLite el mantenimiento de particiones no hace nada"""
+        from database.connection import db
+
+        with app.app_context():
+            assert ensure_partitions(db.engine) == []
+            assert apply_partition_retention(db.engine, dry_run=True) == []
@@ -0,0 +1,58 @@
+"""
+Tests para la instrumentación de SQL (database/query_stats.py)
+"""
+from sqlalchemy import text
+
+from app.repositories.base_repo import BaseRepository
+from config.default import DefaultConfig
+from database.connection import db
+from database import query_stats
+from database.query_stats import get_query_metrics, query_scope, reset_query_metrics
+from tests.conftest import SampleItem
+
+
+class TestQueryStats:
+    """Tests de conteo de consultas, N+1 y consultas lentas"""
+
+    def test_scope_counts_queries_and_flags_repeats(self, app):
+        """Sentencias idénticas repetidas se marcan como posible N+1"""
+        reset_query_metrics()
+        repo = BaseRepository(SampleItem)
+        ids = repo.create_many([{'name': f'item-{i}'} for i in range(6)], returning=True)
+
+        with query_scope('test_endpoint', 'req-1') as scope:
+            for item_id in ids:
+                db.session.execute(text('SELECT name FROM test_sample_items WHERE id = :id'), {'id': item_id})
+
+        assert scope.queries == 6
+        repeated = scope.repeated(DefaultConfig.SQL_N_PLUS_ONE_THRESHOLD)
+        assert repeated[0]['count'] == 6
+
+        metrics = get_query_metrics()
+        assert metrics['scopes']['test_endpoint']['n_plus_one'] == 1
+        assert metrics['n_plus_one'][0]['max_repeats'] == 6
+
+    def test_slow_queries_record_param_shapes(self, app, monkeypatch):
+        """Las consultas lentas guardan los tipos de los parámetros, no sus valores"""
+        reset_query_metrics()
+        monkeypatch.setattr(DefaultConfig, 'SQL_SLOW_QUERY_MS', 0.0)
+
+        with query_scope('slow_endpoint'):
+            db.session.execute(text('SELECT :name, :value'), {'name': 'secret', 'value': 3})
+
+        sample = get_query_metrics()['slow_queries'][-1]
+        assert sample['params'] == {'name': 'str', 'value': 'int'}
+        assert 'secret' not in str(sample)
+
+    def test_n_plus_one_statements_are_bounded(self, app, monkeypatch):
+        """Las sentencias N+1 guardadas no pasan del máximo; sale la vista hace más tiempo"""
+        reset_query_metrics()
+        monkeypatch.setattr(query_stats, '_N_PLUS_ONE_MAX', 3)
+
+        for n in range(5):
+            with query_scope('bounded_endpoint'):
+                for _ in range(DefaultConfig.SQL_N_PLUS_ONE_THRESHOLD):
+                    db.session.execute(text(f'SELECT {n}'))
+
+        statements = [item['statement'] for item in get_query_metrics()['n_plus_one']]
+        assert sorted(statements) == ['SELECT 2', 'SELECT 3', 'SELECT 4']
@@ -0,0 +1,81 @@
+"""
+Tests para la cola diferida de confirmaciones de lectura
+Valida la agrupación por conversación y el envío en segundo plano
+"""
+
+import time
+from unittest.mock import Mock
+
+from app.services.read_receipts import ReadReceiptQueue
+
+
+class TestReadReceiptQueue:
+    """Tests para ReadReceiptQueue"""
+
+    def test_coalesces_to_latest_message_per_conversation(self):
+        """Solo debe enviarse el último message_id de cada conversación"""
+        sender = Mock()
+        queue = ReadReceiptQueue(sender, window_ms=60000)
+
+        queue.enqueue('wamid.1', 'pnid', '5911', timestamp=100)
+        queue.enqueue('wamid.2', 'pnid', '5911', timestamp=101)
+        queue.enqueue('wamid.3', 'pnid', '5911', timestamp=102)
+
+        assert queue.flush() == 1
+        sender.assert_called_once_with('wamid.3', 'pnid')
+
+        stats = queue.get_stats()
+        assert stats['enqueued'] == 3
+        assert stats['coalesced'] == 2
+        assert stats['sent'] == 1
+        queue.shutdown()
+
+    def test_older_message_does_not_replace_newer(self):
+        """Un mensaje que llega desordenado no debe reemplazar al más reciente"""
+        sender = Mock()
+        queue = ReadReceiptQueue(sender, window_ms=60000)
+
+        queue.enqueue('wamid.new', 'pnid', '5911', timestamp=200)
+        queue.enqueue('wamid.old', 'pnid', '5911', timestamp=150)
+        queue.flush()
+
+        sender.assert_called_once_with('wamid.new', 'pnid')
+        queue.shutdown()
+
+    def test_separate_conversations_are_sent_separately(self):
+        """Conversaciones distintas generan confirmaciones distintas"""
+        sender = Mock()
+        queue = ReadReceiptQueue(sender, window_ms=60000)
+
+        queue.enqueue('wamid.a', 'pnid', '5911', timestamp=1)
+        queue.enqueue('wamid.b', 'pnid', '5922', timestamp=1)
+        queue.enqueue('wamid.c', 'other', '5911', timestamp=1)
+
+        assert queue.flush() == 3
+        assert sender.call_count == 3
+        queue.shutdown()
+
+    def test_background_worker_sends_after_window(self):
+        """El worker debe enviar la confirmación al vencer la ventana"""
+        sender = Mock()
+        queue = ReadReceiptQueue(sender, window_ms=20)
+
+        queue.enqueue('wamid.1', 'pnid', '5911', timestamp=1)
+
+        deadline = time.time() + 2
+        while not sender.called and time.time() < deadline:
+            time.sleep(0.01)
+
+        sender.assert_called_once_with('wamid.1', 'pnid')
+        assert queue.get_stats()['pending'] == 0
+        queue.shutdown()
+
+    def test_sender_errors_are_counted(self):
+        """Los fallos de Graph API se cuentan y no se propagan"""
+        sender = Mock(side_effect=Exception('Graph API caído'))
+        queue = ReadReceiptQueue(sender, window_ms=60000)
+
+        queue.enqueue('wamid.1', 'pnid', '5911')
+        assert queue.flush() == 0
+        assert queue.get_stats()['failed'] == 1
+        queue.shutdown()
@@ -0,0 +1,67 @@
+"""
+Tests para el enrutado de lecturas a la réplica (database/replica.py)
+La "réplica" es otra base SQLite con datos distintos para distinguir el origen de cada lectura
+"""
+import pytest
+from flask import g
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db, get_engine
+from database.replica import get_replica_status
+from database.unit_of_work import unit_of_work
+from tests.conftest import SampleItem
+
+
+@pytest.fixture
+def replica_app(app, tmp_path):
+    """Aplicación con una réplica SQLite que contiene una sola fila"""
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    app.config['SQLALCHEMY_REPLICA_URI'] = url
+    engine = get_engine(url)
+    SampleItem.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(SampleItem.__table__.insert(), {'name': 'replica-only', 'value': 1})
+    yield app
+    engine.dispose()
+
+
+class TestReplicaRouting:
+    """Tests de lecturas en réplica con read-your-writes"""
+
+    def test_reads_go_to_replica(self, replica_app):
+        """Sin escrituras previas, los listados de solo lectura se leen de la réplica"""
+        repo = BaseRepository(SampleItem)
+
+        items, _ = repo.paginate_keyset(replica=True)
+        assert [item.name for item in items] == ['replica-only']
+        assert repo.count_filtered(replica=True) == (1, False)
+        assert get_replica_status()['lag_seconds'] == 0.0
+
+    def test_generic_reads_can_be_saved(self, replica_app):
+        """find_by/get_all leen del primario: la instancia se puede modificar y guardar"""
+        db.session.add(SampleItem(name='line', value=0))
+        db.session.commit()
+        db.session.remove()
+        # Contexto nuevo: sin escrituras previas que fijen las lecturas al primario
+        g.pop('_replica_sticky', None)
+        repo = BaseRepository(SampleItem)
+
+        item = repo.find_by(name='line')[0]
+        item.value = 5
+        db.session.add(item)
+        db.session.commit()
+
+        db.session.remove()
+        assert [(item.name, item.value) for item in repo.get_all()] == [('line', 5)]
+        assert repo.paginate_keyset()[0][0].value == 5
+
+    def test_unit_of_work_and_writes_stick_to_primary(self, replica_app):
+        """Dentro de una unidad de trabajo y tras un commit se lee del primario"""
+        repo = BaseRepository(SampleItem)
+
+        with unit_of_work('test'):
+            repo.create(name='primary-only')
+            assert [item.name for item in repo.find_by()] == ['primary-only']
+
+        assert repo.count() == 1
+        assert [item.name for item in repo.get_all()] == ['primary-only']
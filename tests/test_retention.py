@@ -0,0 +1,82 @@
+"""
+Tests para la retención en bloques (database/retention.py)
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db
+from database.retention import RetentionPolicy, purge_table
+from tests.conftest import SampleItem
+
+
+class SampleRef(db.Model):
+    """Fila que apunta a SampleItem sin ON DELETE (como chatbot_interactions.context_id)"""
+    __tablename__ = 'test_retention_refs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('test_sample_items.id'))
+
+
+def _seed(old, recent):
+    now = datetime.utcnow()
+    rows = [{'name': f'old-{i}', 'created_at': now - timedelta(days=40)} for i in range(old)]
+    rows += [{'name': f'new-{i}', 'created_at': now} for i in range(recent)]
+    BaseRepository(SampleItem).create_many(rows)
+
+
+class TestRetention:
+    """Tests de purge_table"""
+
+    def test_purge_deletes_expired_rows_in_chunks(self, app):
+        """Solo se eliminan las filas anteriores a la fecha límite, en bloques acotados"""
+        _seed(old=10, recent=5)
+        policy = RetentionPolicy(SampleItem.__tablename__, timedelta(days=30))
+
+        result = purge_table(policy, engine=db.engine, chunk_size=3, throttle_ms=0)
+
+        assert result['deleted'] == 10
+        assert result['chunks'] == 4
+        assert SampleItem.query.count() == 5
+        assert result['rows_per_second'] > 0
+
+    def test_purge_respects_max_rows_and_dry_run(self, app):
+        """max_rows acota la ejecución y dry_run solo cuenta"""
+        _seed(old=10, recent=0)
+        policy = RetentionPolicy(SampleItem.__tablename__, timedelta(days=30))
+
+        assert purge_table(policy, engine=db.engine, dry_run=True)['expired'] == 10
+
+        result = purge_table(policy, engine=db.engine, chunk_size=4, throttle_ms=0, max_rows=6)
+
+        assert result['deleted'] == 6
+        assert SampleItem.query.count() == 4
+
+    def test_purge_releases_references_in_same_chunk(self, app):
+        """Las filas que apuntan a las purgadas quedan con NULL y el borrado no viola la clave foránea"""
+        SampleRef.__table__.create(db.engine, checkfirst=True)
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA foreign_keys=ON')
+        try:
+            _seed(old=3, recent=1)
+            old_id = SampleItem.query.filter_by(name='old-1').one().id
+            db.session.add(SampleRef(item_id=old_id))
+            db.session.commit()
+            policy = RetentionPolicy(SampleItem.__tablename__, timedelta(days=30))
+
+            with pytest.raises(IntegrityError):
+                purge_table(policy, engine=db.engine, throttle_ms=0)
+
+            policy.references = (('test_retention_refs', 'item_id'),)
+            result = purge_table(policy, engine=db.engine, chunk_size=2, throttle_ms=0)
+
+            assert result['deleted'] == 3
+            db.session.expire_all()
+            assert SampleRef.query.one().item_id is None
+        finally:
+            db.session.remove()
+            with db.engine.connect() as conn:
+                conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            SampleRef.__table__.drop(db.engine, checkfirst=True)
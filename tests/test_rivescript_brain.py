@@ -0,0 +1,91 @@
+"""
+Tests para el cerebro RiveScript compartido (app/services/rivescript_brain.py)
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.rivescript_brain import BrainRegistry, brain_registry, compile_brain, is_valid_reply
+
+
+def _flow(name, content, priority=1, is_default=False):
+    return SimpleNamespace(id=name, name=name, priority=priority, rivescript_content=content,
+                           is_default=is_default)
+
+
+class TestBrainRegistry:
+    """Tests de compilación y publicación del cerebro"""
+
+    def test_reload_publishes_new_version(self):
+        """Cada recarga publica un cerebro nuevo sin modificar el anterior"""
+        registry = BrainRegistry()
+        first = registry.reload([_flow('saludo', '+ hola\n- Hola!')])
+
+        assert first.version == 1
+        assert first.trigger_count == 1
+        assert first.reply('u1', 'hola').reply == 'Hola!'
+
+        second = registry.reload([_flow('saludo', '+ hola\n- Buenas!'), _flow('ayuda', '+ ayuda\n- Menú')])
+
+        assert registry.current() is second
+        assert second.version == 2
+        assert second.trigger_count == 2
+        assert second.reply('u1', 'hola').reply == 'Buenas!'
+        assert first.reply('u1', 'hola').reply == 'Hola!'
+        assert registry.status()['flow_count'] == 2
+
+    def test_failed_compile_keeps_current_brain(self):
+        """Si la compilación falla, sigue publicado el cerebro anterior"""
+        registry = BrainRegistry()
+        brain = registry.reload([_flow('saludo', '+ hola\n- Hola!')])
+
+        assert registry.reload([SimpleNamespace(name='roto')]) is brain
+        assert registry.current().version == 1
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='requiere fork')
+    def test_fork_during_compile_frees_child_lock(self):
+        """Un worker creado a mitad de una compilación no hereda el lock tomado"""
+        with brain_registry._compile_lock:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if brain_registry._compile_lock.acquire(timeout=1) else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.WEXITSTATUS(status) == 0
+
+
+class TestFlowRouting:
+    """Tests del enrutado de usuarios a los cerebros por flujo"""
+
+    def test_same_trigger_resolved_by_route(self):
+        """Un trigger repetido responde el flujo del usuario, o el de mayor prioridad"""
+        brain = compile_brain([
+            _flow('soporte', '+ hola\n- Hola, soporte', priority=2),
+            _flow('ventas', '+ hola\n- Hola, ventas', priority=1)
+        ], 1)
+
+        assert [flow['id'] for flow in brain.flows] == ['ventas', 'soporte']
+        assert brain.reply('u1', 'hola').flow_brain.key == 'ventas'
+        assert brain.reply('u2', 'hola', flow_id='soporte').reply == 'Hola, soporte'
+
+    def test_fallthrough_and_default_flow(self):
+        """Sin match en el flujo del usuario se prueban los demás; sin flujo, el de por defecto"""
+        brain = compile_brain([
+            _flow('ventas', '+ precio\n- Cuesta 10', priority=1),
+            _flow('general', '+ hola\n- Hola!', priority=5, is_default=True)
+        ], 1)
+
+        assert brain.route()[0].key == 'general'
+        result = brain.reply('u1', 'precio', flow_id='general')
+        assert result.reply == 'Cuesta 10'
+        assert result.flow_brain.key == 'ventas'
+        assert brain.reply('u1', 'nada que ver') is None
+
+    def test_is_valid_reply(self):
+        """Los errores de RiveScript y los ecos no cuentan como respuesta"""
+        assert is_valid_reply('Hola!', 'hola')
+        assert not is_valid_reply('[ERR: No Reply Matched]', 'hola')
+        assert not is_valid_reply('ERR: Deep Recursion Detected', 'hola')
+        assert not is_valid_reply('hola', 'hola')
+        assert not is_valid_reply(None, 'hola')
@@ -0,0 +1,120 @@
+"""
+Tests para las sesiones RiveScript con escritura diferida (app/services/rivescript_sessions.py)
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.rivescript_brain import compile_brain
+from app.services.rivescript_sessions import LRUSessionManager
+
+
+class FakeStore:
+    """Almacén en memoria que registra cada lote escrito"""
+
+    name = 'fake'
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.loads = 0
+        self.batches = []
+
+    def load(self, username):
+        self.loads += 1
+        return dict(self.data[username]) if username in self.data else None
+
+    def save_many(self, sessions):
+        self.batches.append(sorted(sessions))
+        self.data.update(sessions)
+
+    def delete(self, username):
+        self.data.pop(username, None)
+
+
+class TestLRUSessionManager:
+    """Tests del LRU, la expulsión y la escritura por lotes"""
+
+    def test_loads_once_and_flushes_only_changed_users(self):
+        """Cada usuario se carga una vez y solo los cambiados se escriben, en un lote"""
+        store = FakeStore({'u1': {'topic': 'random', 'name': 'Ana'}})
+        sessions = LRUSessionManager(store)
+
+        assert sessions.get('u1', 'name') == 'Ana'
+        assert sessions.get('u1', 'topic') == 'random'
+        sessions.set('u2', {'name': 'Luis'})
+        sessions.get('u3', 'topic')
+
+        assert store.loads == 3
+        assert sessions.flush() == 1
+        assert store.batches == [['u2']]
+        assert sessions.flush() == 0
+
+    def test_evicted_dirty_user_is_flushed_and_reloaded(self):
+        """Un usuario expulsado con cambios se escribe en el siguiente lote y se recupera sin perderlos"""
+        store = FakeStore()
+        sessions = LRUSessionManager(store, max_users=2)
+        sessions.set('u1', {'name': 'Ana'})
+        sessions.set('u2', {'name': 'Luis'})
+        sessions.set('u3', {'name': 'Eva'})
+
+        assert sessions.status()['users'] == 2
+        assert sessions.status()['pending'] == 1
+        assert sessions.get('u1', 'name') == 'Ana'
+
+        sessions.flush()
+        assert store.data['u1']['name'] == 'Ana'
+        assert store.batches == [['u1', 'u2', 'u3']]
+
+    def test_sessions_shared_across_flow_brains(self):
+        """Las variables se comparten entre flujos y un intento sin match no las modifica"""
+        sessions = LRUSessionManager(FakeStore())
+        brain = compile_brain([
+            SimpleNamespace(id='ventas', name='ventas', priority=1,
+                            rivescript_content='+ me llamo *\n- <set name=<star>>Hola <star>'),
+            SimpleNamespace(id='general', name='general', priority=2,
+                            rivescript_content='+ quien soy\n- Eres <get name>')
+        ], 1, session_manager=sessions)
+
+        brain.reply('u1', 'me llamo ana')
+        result = brain.reply('u1', 'quien soy')
+
+        assert result.reply == 'Eres ana'
+        assert result.flow_brain.key == 'general'
+        assert sessions.get('u1', '__history__')['input'][:2] == ['quien soy', 'me llamo ana']
+
+    def test_shared_store_is_source_of_truth_across_workers(self):
+        """Con un almacén compartido cada respuesta relee la sesión y la escribe al terminar"""
+        store = FakeStore()
+        store.shared = True
+        worker_a, worker_b = LRUSessionManager(store), LRUSessionManager(store)
+
+        with worker_a.turn('u1'):
+            worker_a.set('u1', {'name': 'Ana'})
+        assert store.data['u1']['name'] == 'Ana'
+        assert not worker_a.is_dirty('u1')
+
+        with worker_b.turn('u1'):
+            assert worker_b.get('u1', 'name') == 'Ana'
+            worker_b.set('u1', {'name': 'Eva'})
+
+        with worker_a.turn('u1'):
+            assert worker_a.get('u1', 'name') == 'Eva'
+        assert worker_a.flush() == 0
+        assert store.data['u1']['name'] == 'Eva'
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='requiere fork')
+    def test_fork_during_flush_frees_child_locks(self):
+        """Un worker creado mientras el padre escribe un lote no hereda los locks tomados"""
+        sessions = LRUSessionManager(FakeStore())
+        sessions.set('u1', {'name': 'Ana'})
+
+        with sessions._flush_lock, sessions._lock:
+            pid = os.fork()
+            if pid == 0:
+                sessions._restart_after_fork()
+                free = sessions._lock.acquire(timeout=1) and sessions._flush_lock.acquire(timeout=1)
+                os._exit(0 if free and not sessions.is_dirty('u1') else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.WEXITSTATUS(status) == 0
@@ -0,0 +1,84 @@
+"""
+Tests para la búsqueda de texto completo
+Valida el índice FTS5 de SQLite, su mantenimiento por triggers y el ranking
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.repositories.base_repo import BaseRepository
+from app.utils.exceptions import DatabaseError
+from database.connection import db
+from database.search import SEARCH_INDEXES, search_ranked, setup_search_indexes
+
+
+class SearchDoc(db.Model):
+    """Modelo mínimo con contenido indexable"""
+    __tablename__ = 'test_search_docs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20))
+    content = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+@pytest.fixture
+def search_app(app, monkeypatch):
+    """Aplicación con la tabla de prueba indexada en FTS5"""
+    monkeypatch.setitem(SEARCH_INDEXES, 'test_search_docs', ['content'])
+    SearchDoc.__table__.create(db.engine, checkfirst=True)
+    BaseRepository(SearchDoc).create_many([
+        {'phone_number': '59111111', 'content': 'Quiero cambiar mi plan de internet'},
+        {'phone_number': '59122222', 'content': 'El internet está lento, internet caído'},
+        {'phone_number': '59111111', 'content': 'Gracias por la atención'}
+    ])
+    setup_search_indexes(tables=['test_search_docs'])
+    yield app
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP TABLE IF EXISTS test_search_docs_fts')
+    SearchDoc.__table__.drop(db.engine, checkfirst=True)
+
+
+class TestFullTextSearch:
+    """Tests para setup_search_indexes y search_ranked"""
+
+    def test_existing_rows_are_indexed_and_ranked(self, search_app):
+        """Las filas previas se indexan y la más relevante aparece primero"""
+        results = search_ranked(SearchDoc, 'internet')
+
+        assert len(results) == 2
+        assert results[0][0].phone_number == '59122222'
+        assert results[0][1] >= results[1][1]
+
+    def test_phone_filter_and_accent_insensitive(self, search_app):
+        """Filtra por teléfono e ignora acentos"""
+        results = search_ranked(SearchDoc, 'atencion', phone_number='59111111')
+
+        assert [doc.content for doc, _ in results] == ['Gracias por la atención']
+
+    def test_index_follows_inserts_updates_and_deletes(self, search_app):
+        """Los triggers mantienen el índice al escribir"""
+        repo = BaseRepository(SearchDoc)
+        doc = repo.create(phone_number='59133333', content='factura pendiente')
+        assert len(search_ranked(SearchDoc, 'factura')) == 1
+
+        repo.update(doc.id, content='pago realizado')
+        assert search_ranked(SearchDoc, 'factura') == []
+        assert len(search_ranked(SearchDoc, 'pago')) == 1
+
+        repo.delete(doc.id)
+        assert search_ranked(SearchDoc, 'pago') == []
+
+    def test_query_syntax_is_escaped(self, search_app):
+        """Los operadores de FTS5 en la entrada del usuario no rompen la consulta"""
+        assert len(search_ranked(SearchDoc, 'internet" *')) == 2
+        assert search_ranked(SearchDoc, '"*') == []
+
+    def test_unsupported_dialect_raises_database_error(self, app, monkeypatch):
+        """Un dialecto sin búsqueda de texto completo genera DatabaseError"""
+        monkeypatch.setattr(db.engine.dialect, 'name', 'mysql')
+
+        with pytest.raises(DatabaseError):
+            setup_search_indexes(tables=['messages'])
@@ -0,0 +1,92 @@
+"""
+Tests para la unidad de trabajo de repositorios
+Valida que las escrituras se agrupen en un solo commit y se reviertan juntas
+"""
+
+import pytest
+
+from app.repositories.base_repo import BaseRepository
+from database.connection import db
+from database.unit_of_work import get_current_uow, get_uow_stats, unit_of_work
+from tests.conftest import SampleItem
+
+
+class TestUnitOfWork:
+    """Tests para unit_of_work y BaseRepository"""
+
+    def test_writes_share_single_commit(self, app):
+        """Varias escrituras dentro de la unidad generan un único commit"""
+        repo = BaseRepository(SampleItem)
+        before = get_uow_stats()
+
+        with unit_of_work('test'):
+            first = repo.create(name='a', value=1)
+            repo.create(name='b', value=2)
+            repo.update(first.id, value=10)
+
+        after = get_uow_stats()
+        assert after['commits'] - before['commits'] == 1
+        assert after['writes'] - before['writes'] == 3
+        assert after['commits_saved'] - before['commits_saved'] == 2
+
+        db.session.expire_all()
+        assert SampleItem.query.filter_by(name='a').one().value == 10
+        assert SampleItem.query.count() == 2
+
+    def test_exception_rolls_back_all_writes(self, app):
+        """Una excepción dentro de la unidad revierte todas las escrituras"""
+        repo = BaseRepository(SampleItem)
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work('test'):
+                repo.create(name='a')
+                repo.create(name='b')
+                raise RuntimeError('fallo en la respuesta')
+
+        assert SampleItem.query.count() == 0
+
+    def test_database_error_marks_unit_failed(self, app):
+        """Un error de base de datos capturado también revierte la unidad completa"""
+        repo = BaseRepository(SampleItem)
+
+        with unit_of_work('test') as uow:
+            repo.create(name='a')
+            try:
+                repo.create(name='a')
+            except Exception:
+                pass
+            assert uow.error is not None
+
+        assert SampleItem.query.count() == 0
+
+    def test_nested_units_join_outer(self, app):
+        """Las unidades anidadas se unen a la exterior"""
+        repo = BaseRepository(SampleItem)
+
+        with unit_of_work('outer') as outer:
+            with unit_of_work('inner') as inner:
+                assert inner is outer
+                repo.create(name='a')
+            assert get_current_uow() is outer
+
+        assert get_current_uow() is None
+        assert SampleItem.query.count() == 1
+
+    def test_savepoint_isolates_failed_block(self, app):
+        """Un error dentro de un savepoint revierte solo ese bloque y la unidad se confirma"""
+        repo = BaseRepository(SampleItem)
+
+        with unit_of_work('test') as uow:
+            repo.create(name='a')
+            with uow.savepoint():
+                repo.create(name='b')
+            try:
+                with uow.savepoint():
+                    repo.create(name='c')
+                    repo.update(1, name='b')  # viola el UNIQUE al volcar el savepoint
+            except Exception:
+                pass
+            assert uow.error is None
+
+        db.session.expire_all()
+        assert sorted(item.name for item in SampleItem.query.all()) == ['a', 'b']
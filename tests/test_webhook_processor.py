@@ -0,0 +1,119 @@
+"""
+Tests de las transacciones del procesador de webhooks (app/services/webhook_processor.py)
+Usa un modelo de mensajes compatible con SQLite y dobles del chatbot y de la API de WhatsApp
+"""
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.repositories.base_repo import BaseRepository
+from app.services.webhook_processor import WebhookProcessor
+from database.connection import db
+from database.unit_of_work import unit_of_work
+
+
+class WebhookMessage(db.Model):
+    """Mensaje mínimo con las columnas que usa el procesador"""
+    __tablename__ = 'test_webhook_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    whatsapp_message_id = db.Column(db.String(255), nullable=False, unique=True)
+    line_id = db.Column(db.String(50))
+    phone_number = db.Column(db.String(20), nullable=False)
+    message_type = db.Column(db.String(50), nullable=False)
+    content = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False)
+    direction = db.Column(db.String(10), nullable=False)
+
+
+class MessageRepo(BaseRepository):
+    def __init__(self):
+        super().__init__(WebhookMessage)
+
+    def get_by_whatsapp_id(self, whatsapp_message_id):
+        return self.first_by('whatsapp_message_id', whatsapp_message_id)
+
+    def update_status(self, message_id, new_status):
+        return self.update(message_id, status=new_status) is not None
+
+
+class FakeWhatsApp:
+    """Registra si había una transacción abierta en cada envío"""
+
+    def __init__(self):
+        self.in_transaction = []
+
+    def send_text_message(self, phone_number, text, phone_number_id):
+        self.in_transaction.append(db.session().in_transaction())
+        return {'messages': [{'id': f'wamid.out{len(self.in_transaction)}'}]}
+
+    def mark_message_as_read(self, message_id, phone_number_id):
+        pass
+
+
+class FailingChatbot:
+    """Responde, pero su escritura en base de datos falla (clave duplicada)"""
+
+    def __init__(self, repo):
+        self.repo = repo
+
+    def process_message(self, phone_number, message, message_record=None):
+        with unit_of_work('chatbot_message'):
+            try:
+                self.repo.create(whatsapp_message_id='wamid.in', phone_number=phone_number,
+                                 message_type='text', status='received', direction='inbound')
+            except Exception:
+                pass
+        return {'response': 'Hola', 'type': 'flow'}
+
+
+@pytest.fixture
+def processor(app):
+    WebhookMessage.__table__.create(db.engine, checkfirst=True)
+    processor = WebhookProcessor.__new__(WebhookProcessor)
+    processor.logger = logging.getLogger('test_webhook_processor')
+    processor.msg_repo = MessageRepo()
+    processor.line_repo = SimpleNamespace(
+        get_by_phone_number_id=lambda _: SimpleNamespace(line_id='line_1', phone_number_id='pnid'))
+    processor.whatsapp_api = FakeWhatsApp()
+    processor.read_receipts = None
+    processor.chatbot = FailingChatbot(processor.msg_repo)
+    processor._processed_messages = set()
+    processor._handle_business_logic = lambda *args: None
+    yield processor
+    db.session.remove()
+    WebhookMessage.__table__.drop(db.engine, checkfirst=True)
+
+
+class TestWebhookTransactions:
+    """El mensaje entrante no depende del chatbot ni de otros estados del lote"""
+
+    def test_chatbot_db_error_keeps_inbound_message(self, processor):
+        """Un error de base de datos del chatbot no revierte el entrante ni se envía con transacción abierta"""
+        processor._process_messages({
+            'metadata': {'phone_number_id': 'pnid'},
+            'messages': [{'id': 'wamid.in', 'from': '59170000001', 'type': 'text', 'text': {'body': 'hola'}}]
+        })
+
+        db.session.expire_all()
+        stored = {m.whatsapp_message_id: m.direction for m in WebhookMessage.query.all()}
+        assert stored == {'wamid.in': 'inbound', 'wamid.out1': 'outbound'}
+        assert processor.whatsapp_api.in_transaction == [False]
+
+    def test_bad_status_does_not_roll_back_batch(self, processor):
+        """Un estado que falla al escribirse solo revierte su savepoint"""
+        with unit_of_work('seed'):
+            for wamid in ('wamid.a', 'wamid.b'):
+                processor.msg_repo.create(whatsapp_message_id=wamid, phone_number='59170000001',
+                                          message_type='text', status='sent', direction='outbound')
+
+        processor._process_message_status({'statuses': [
+            {'id': 'wamid.a', 'status': 'read'},
+            {'id': 'wamid.b', 'status': None}  # viola NOT NULL
+        ]})
+
+        db.session.expire_all()
+        assert {m.whatsapp_message_id: m.status for m in WebhookMessage.query.all()} == {
+            'wamid.a': 'read', 'wamid.b': 'sent'
+        }